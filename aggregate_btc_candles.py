@@ -1,29 +1,44 @@
 import pandas as pd
+import numpy as np
+import io
 import os
-import glob
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from bucket_reducer import FREQUENCIES, reduce_frequency
+from bucket_reducer import bucket_ids as _bucket_ids
+from candle_csv import format_timestamps, read_candles, tail_offset
+from candle_index import iter_range, refresh_index
+from candle_store import MAX_TIMESTAMP, MIN_TIMESTAMP, load_candles
+from data_layout import list_shards, yearly_path
+from data_layout import time_shards as _time_shards
+from day_merkle import changed_since, mark_consumed
+from export_parquet import ParquetPartitionWriter, month_keys, pa
 
 # Path to the BTC data folder
 path = 'data/btc/'
+SYMBOL = 'BTCUSD'
 
-# Get all minute candle files
-files = glob.glob(os.path.join(path, 'BTCUSD_1m_candles_*.csv'))
+# Also write data/parquet/symbol=BTCUSD/interval=*/year=* partitions when pyarrow is available
+EXPORT_PARQUET = pa is not None
 
-# Combine all data
-df_list = []
-for file in files:
-    df = pd.read_csv(file)
-    df_list.append(df)
+# 1-minute rows read per step; memory stays flat no matter how many years exist
+CHUNK_ROWS = 262144
 
-df_all = pd.concat(df_list, ignore_index=True)
+# Name under which the rollups record which 1m days they were built from (see day_merkle)
+MERKLE_CONSUMER = 'rollups'
 
-# Convert timestamp to datetime and sort
-df_all['timestamp'] = pd.to_datetime(df_all['timestamp'])
-df_all = df_all.sort_values('unix_timestamp').reset_index(drop=True)
+# Processes for a full rebuild (one yearly 1m shard per task); 1 runs the serial cascade
+WORKERS = os.cpu_count() or 1
 
-# Set timestamp as index
-df_all.set_index('timestamp', inplace=True)
+# Timeframes whose buckets can straddle a shard boundary. Shards are whole days,
+# so only weekly bars do; they are rebuilt in the parent from the daily bars.
+STITCHED_TIMEFRAMES = ['weekly']
 
-# Define timeframes and filenames
+OUTPUT_COLUMNS = ['timestamp', 'open', 'close', 'volume', 'unix_timestamp', 'high', 'low']
+
+# Define timeframes and filenames (ascending: each level is rolled up from the one before it)
 timeframes = {
     '5min': '5min',
     '30min': '30min',
@@ -32,6 +47,14 @@ timeframes = {
     'weekly': 'W'
 }
 
+intervals = {
+    '5min': '5m',
+    '30min': '30m',
+    'hourly': '1h',
+    'daily': '1d',
+    'weekly': '1w'
+}
+
 filenames = {
     '5min': 'BTCUSD_5m_candles_full.csv',
     '30min': 'BTCUSD_30m_candles_full.csv',
@@ -40,29 +63,387 @@ filenames = {
     'weekly': 'BTCUSD_1w_candles_full.csv'
 }
 
-# Aggregate for each timeframe
-for tf, freq in timeframes.items():
-    folder = os.path.join(path, tf)
-    os.makedirs(folder, exist_ok=True)
-    
-    df_resampled = df_all.resample(freq).agg({
-        'open': 'first',
-        'high': 'max',
-        'low': 'min',
-        'close': 'last',
-        'volume': 'sum'
-    }).dropna()
-    
-    # Add unix_timestamp
-    df_resampled['unix_timestamp'] = (df_resampled.index.astype('int64') // 10**9)
-    
+# Columns handed from one level to the next
+BAR_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'unix_timestamp']
+
+def week_start(unix_ts):
+    """Monday 00:00 of the pandas 'W' bucket holding unix_ts"""
+    step, offset, _ = FREQUENCIES['W']
+    return (unix_ts - offset) // step * step + offset
+
+def bucket_ids(unix_timestamps, freq):
+    step, offset, _ = FREQUENCIES[freq]
+    return _bucket_ids(unix_timestamps, step, offset)
+
+def resample_frame(df, freq):
+    """
+    OHLCV rollup of a sorted frame in the output column order.
+    Same bars (bit for bit) as df.resample(freq).agg(...).dropna(), computed with
+    the NumPy bucket reducer.
+    """
+    bars = reduce_frequency({name: df[name].to_numpy() for name in BAR_COLUMNS}, freq)
+    df_resampled = pd.DataFrame(bars)
+
     # Format timestamp
-    df_resampled['timestamp'] = df_resampled.index.strftime('%Y-%m-%d %H:%M:%S')
-    
+    df_resampled['timestamp'] = format_timestamps(bars['unix_timestamp'])
+
     # Reorder columns
-    df_resampled = df_resampled[['timestamp', 'open', 'close', 'volume', 'unix_timestamp', 'high', 'low']]
-    
-    # Save to CSV
-    df_resampled.to_csv(os.path.join(folder, filenames[tf]), index=False)
+    return df_resampled[OUTPUT_COLUMNS]
+
+def shard_years(unix_timestamps):
+    return month_keys(unix_timestamps) // 12 + 1970
+
+def time_shards(tf):
+    """Yearly shard files of a timeframe as (start, end, path), in time order"""
+    return _time_shards(SYMBOL, intervals[tf])
+
+def has_yearly_shards(tf):
+    """True when a timeframe's yearly shards exist and cover its _full file"""
+    shards = list_shards(SYMBOL, intervals[tf])
+    return bool(shards) and shards[0][0] is not None
+
+def assemble_full(tf):
+    """
+    Concatenate the yearly shards of a timeframe into its _full file (one header)
+    and bring the sidecar indexes of the shards and the _full file up to date
+    """
+    full_file = os.path.join(path, tf, filenames[tf])
+    shard_files = [shard_file for _, _, shard_file in time_shards(tf)]
+    with open(full_file, 'wb') as out:
+        for i, shard_file in enumerate(shard_files):
+            with open(shard_file, 'rb') as f:
+                header = f.readline()
+                if i == 0:
+                    out.write(header)
+                shutil.copyfileobj(f, out)
+    for csv_file in shard_files + [full_file]:
+        refresh_index(csv_file)
+    return full_file
+
+class YearlyShardWriter:
+    """CSV output of one timeframe split into BTCUSD_<interval>_candles_<year>.csv files"""
+
+    def __init__(self, tf):
+        self.tf = tf
+        self.year = None
+        self.file = None
+        self.header = True
+
+    def append_to(self, year):
+        """Continue an existing shard instead of starting it over"""
+        self._close_file()
+        self.year = year
+        self.file = open(yearly_path(SYMBOL, intervals[self.tf], year), 'a', newline='')
+        self.header = False
+
+    def write(self, df):
+        years = shard_years(df['unix_timestamp'].to_numpy())
+        splits = np.concatenate([[0], np.flatnonzero(np.diff(years)) + 1, [len(years)]])
+        for start, end in zip(splits[:-1].tolist(), splits[1:].tolist()):
+            year = int(years[start])
+            if year != self.year:
+                self._close_file()
+                self.year = year
+                self.file = open(yearly_path(SYMBOL, intervals[self.tf], year), 'w', newline='')
+                self.header = True
+            df.iloc[start:end].to_csv(self.file, index=False, header=self.header)
+            self.header = False
+
+    def _close_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def close(self):
+        self._close_file()
+
+class TimeframeStream:
+    """
+    Incremental rollup of one timeframe.
+    Rows of the newest (possibly still open) bucket are carried over to the next
+    chunk, so buckets spanning chunk or file boundaries - including weeks that
+    cross New Year - are aggregated from exactly the same rows as a full resample.
+    Completed bars are passed on to `coarser`, the next timeframe up, so the
+    whole cascade runs in one pass over the 1-minute data. Bars are written to
+    yearly shards as they are produced; close() assembles the _full file from them.
+    """
+
+    def __init__(self, tf, freq, coarser=None, resume_from=None, file=None):
+        self.tf = tf
+        self.freq = freq
+        self.coarser = coarser
+        folder = os.path.join(path, tf)
+        os.makedirs(folder, exist_ok=True)
+        self.filename = os.path.join(folder, filenames[tf])
+        self.rows = 0
+        self.carry = None
+        self.parquet = ParquetPartitionWriter(SYMBOL, intervals[tf]) if EXPORT_PARQUET else None
+        self.file = file
+        if file is not None:
+            # Caller-provided sink (e.g. a worker's buffer): rows only, no header, no shards
+            self.shards = None
+            return
+        self.shards = YearlyShardWriter(tf)
+        if resume_from is not None:
+            self._resume(resume_from)
+        else:
+            # Full rebuild: drop shards of years that may no longer have data
+            for _, _, shard_file in time_shards(tf):
+                os.remove(shard_file)
+
+    def _resume(self, resume_from):
+        """
+        Keep every bar before the bucket starting at resume_from and append after it.
+        Shards of later years are removed and the cut year's shard is truncated; its
+        kept rows are replayed into the Parquet writer so that year's partition is
+        rewritten complete.
+        """
+        cut_ts = resume_from + FREQUENCIES[self.freq][2]
+        cut_year = int(shard_years([cut_ts])[0])
+        for shard_start, _, shard_file in time_shards(self.tf):
+            if int(shard_years([shard_start])[0]) > cut_year:
+                os.remove(shard_file)
+        shard_file = yearly_path(SYMBOL, intervals[self.tf], cut_year)
+        if not os.path.exists(shard_file):
+            return
+        cut = tail_offset(shard_file, cut_ts)
+        if self.parquet is not None:
+            with open(shard_file, 'rb') as f:
+                kept = f.read(cut)
+            kept_rows = read_candles(kept)
+            if len(kept_rows['unix_timestamp']):
+                self.parquet.write(kept_rows)
+        with open(shard_file, 'r+b') as f:
+            f.truncate(cut)
+        self.shards.append_to(cut_year)
+
+    def push(self, df):
+        if self.carry is not None:
+            df = pd.concat([self.carry, df])
+        ids = bucket_ids(df['unix_timestamp'].to_numpy(), self.freq)
+        # Everything before the newest bucket is complete
+        split = int(np.searchsorted(ids, ids[-1], side='left'))
+        self.carry = df.iloc[split:]
+        if split:
+            self._emit(df.iloc[:split])
+
+    def close(self):
+        if self.carry is not None and len(self.carry):
+            self._emit(self.carry)
+        self.carry = None
+        if self.parquet is not None:
+            self.parquet.close()
+        if self.shards is not None:
+            self.shards.close()
+            assemble_full(self.tf)
+
+    def _emit(self, df):
+        df_resampled = resample_frame(df, self.freq)
+        if not len(df_resampled):
+            return
+        if self.shards is not None:
+            self.shards.write(df_resampled)
+        else:
+            df_resampled.to_csv(self.file, index=False, header=False)
+        self.rows += len(df_resampled)
+
+        # Save yearly Parquet partitions with monthly row groups
+        if self.parquet is not None:
+            self.parquet.write({name: df_resampled[name].to_numpy() for name in ['unix_timestamp', 'open', 'close', 'volume', 'high', 'low']})
+
+        if self.coarser is not None:
+            self.coarser.push(df_resampled[BAR_COLUMNS])
+
+def ordered_frames(chunks, bounds=None):
+    """
+    Frames of 1m column chunks, each sorted by time. Raises ValueError when a
+    chunk starts before the previous one ended (overlapping files) or, with
+    bounds=(start, end), when a candle falls outside [start, end).
+    Shared by the serial cascade and the parallel workers so both accept the same input.
+    """
+    last_ts = None
+    for columns in chunks:
+        df = pd.DataFrame(columns)
+        if not df['unix_timestamp'].is_monotonic_increasing:
+            df = df.sort_values('unix_timestamp', kind='stable')
+        first_ts = int(df['unix_timestamp'].iloc[0])
+        if last_ts is not None and first_ts < last_ts:
+            raise ValueError(f"1m candles overlap or are out of order at {first_ts}; run the dedupe/merge tools first")
+        last_ts = int(df['unix_timestamp'].iloc[-1])
+        if bounds is not None and (first_ts < bounds[0] or last_ts >= bounds[1]):
+            outside = first_ts if first_ts < bounds[0] else last_ts
+            raise ValueError(f"1m candle at {outside} lies outside its yearly file; run the dedupe/merge tools first")
+        yield df
+
+def iter_minute_frames(chunk_rows=CHUNK_ROWS, start=None):
+    """1-minute candles in time order as frames, one chunk at a time"""
+    return ordered_frames(load_candles(SYMBOL, '1m', start=start, chunk_rows=chunk_rows))
+
+def build_cascade(resume_from=None):
+    """Streams from finest to coarsest, each feeding the next: 5m → 30m → 1h → 1d → 1w"""
+    streams = []
+    coarser = None
+    for tf, freq in reversed(list(timeframes.items())):
+        coarser = TimeframeStream(tf, freq, coarser, resume_from)
+        streams.insert(0, coarser)
+    return streams
+
+def run_cascade(chunk_rows=CHUNK_ROWS, resume_from=None):
+    minute_files = [shard_path for _, _, shard_path in list_shards(SYMBOL, '1m')]
+    streams = build_cascade(resume_from)
+    try:
+        for df in iter_minute_frames(chunk_rows, start=resume_from):
+            streams[0].push(df)
+    finally:
+        # Finest first, so each flush reaches the coarser level before it closes
+        for stream in streams:
+            stream.close()
+    for stream in streams:
+        verb = "appended to" if resume_from is not None else "written to"
+        print(f"💾 {stream.rows:,} candles {verb} {stream.filename}")
+
+    # Remember which 1m contents the rollups now reflect
+    for minute_file in minute_files:
+        mark_consumed(minute_file, MERKLE_CONSUMER)
+
+class BarCollector:
+    """Stand-in for a coarser stream that just keeps the bars pushed into it"""
+
+    def __init__(self):
+        self.frames = []
+
+    def push(self, df):
+        self.frames.append(df)
+
+    def close(self):
+        pass
+
+def aggregate_shard(shard, chunk_rows=CHUNK_ROWS):
+    """
+    Worker: roll one day-aligned (start, end, path) 1m shard up to every unstitched timeframe.
+    Returns ({tf: (csv_rows_text, rows)}, bars of the finest stitched level's source).
+    Parquet partitions of the shard's year are written by the worker itself.
+    """
+    shard_start, shard_end, minute_file = shard
+    collector = BarCollector()
+    buffers = {}
+    streams = []
+    coarser = collector
+    for tf, freq in reversed(list(timeframes.items())):
+        if tf in STITCHED_TIMEFRAMES:
+            continue
+        buffers[tf] = io.StringIO()
+        coarser = TimeframeStream(tf, freq, coarser, file=buffers[tf])
+        streams.insert(0, coarser)
+
+    # The whole file is read, not just its year, so stray rows are reported instead of dropped
+    chunks = iter_range(minute_file, MIN_TIMESTAMP, MAX_TIMESTAMP, chunk_rows)
+    for df in ordered_frames(chunks, bounds=(shard_start, shard_end)):
+        streams[0].push(df)
+    for stream in streams:
+        stream.close()
+
+    outputs = {stream.tf: (buffers[stream.tf].getvalue(), stream.rows) for stream in streams}
+    bars = pd.concat(collector.frames) if collector.frames else None
+    return outputs, bars
+
+def aggregate_parallel(workers=WORKERS, chunk_rows=CHUNK_ROWS):
+    """
+    Full rebuild with one process per yearly 1m shard.
+    Each worker's output becomes that year's shard of every timeframe and weekly bars, which can
+    straddle New Year, are rolled up in this process from the daily bars of all
+    shards - the same rows in the same order as the serial cascade, so the
+    files come out byte-identical.
+    """
+    shards = list_shards(SYMBOL, '1m')
+    if any(shard_start is None for shard_start, _, _ in shards):
+        raise ValueError("parallel aggregation needs yearly 1m shards")
+    minute_files = [minute_file for _, _, minute_file in shards]
+
+    stitched = None
+    for tf, freq in reversed(list(timeframes.items())):
+        if tf in STITCHED_TIMEFRAMES:
+            stitched = TimeframeStream(tf, freq, stitched)
+    unstitched = [tf for tf in timeframes if tf not in STITCHED_TIMEFRAMES]
+    for tf in unstitched:
+        for _, _, shard_file in time_shards(tf):
+            os.remove(shard_file)
+    rows = dict.fromkeys(unstitched, 0)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map() yields results in shard order while later shards are still running
+            for shard, (outputs, bars) in zip(shards, executor.map(aggregate_shard, shards, [chunk_rows] * len(shards))):
+                year = int(shard_years([shard[0]])[0])
+                for tf, (text, count) in outputs.items():
+                    if not count:
+                        continue
+                    with open(yearly_path(SYMBOL, intervals[tf], year), 'w', newline='') as f:
+                        # Same header line DataFrame.to_csv writes
+                        f.write(','.join(OUTPUT_COLUMNS) + os.linesep)
+                        f.write(text)
+                    rows[tf] += count
+                if stitched is not None and bars is not None:
+                    stitched.push(bars)
+    finally:
+        while stitched is not None:
+            stitched.close()
+            rows[stitched.tf] = stitched.rows
+            stitched = stitched.coarser
+    for tf in unstitched:
+        assemble_full(tf)
+
+    for tf in timeframes:
+        print(f"💾 {rows.get(tf, 0):,} candles written to {os.path.join(path, tf, filenames[tf])}")
+    for minute_file in minute_files:
+        mark_consumed(minute_file, MERKLE_CONSUMER)
+
+def aggregate_all(chunk_rows=CHUNK_ROWS, workers=WORKERS):
+    shards = list_shards(SYMBOL, '1m')
+    if workers > 1 and len(shards) > 1 and all(shard_start is not None for shard_start, _, _ in shards):
+        aggregate_parallel(workers, chunk_rows)
+    else:
+        run_cascade(chunk_rows)
+
+def aggregate_incremental(chunk_rows=CHUNK_ROWS):
+    """
+    Recompute only the buckets touched by new or changed 1m days.
+    Changed days come from the per-day Merkle trees; every rollup is cut back
+    to the start of the week holding the earliest change and regenerated from
+    there. Falls back to a full rebuild when a timeframe has no complete set of
+    yearly shards yet (list_shards falls back to the _full file).
+    """
+    if not all(has_yearly_shards(tf) for tf in timeframes):
+        print("⚠️  Rollup files missing - running a full aggregation")
+        aggregate_all(chunk_rows)
+        return
+
+    changed_days = []
+    for _, _, minute_file in list_shards(SYMBOL, '1m'):
+        days = changed_since(minute_file, MERKLE_CONSUMER)
+        if days:
+            print(f"🔎 {minute_file}: {len(days)} changed days")
+            changed_days.append(days[0])
+    if not changed_days:
+        print("✅ Rollups are already up to date")
+        return
+
+    resume_from = week_start(min(changed_days))
+    print(f"🔄 Rebuilding rollups from {datetime.fromtimestamp(resume_from, timezone.utc)}")
+    run_cascade(chunk_rows, resume_from)
 
-print("Aggregation complete!")
\ No newline at end of file
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    workers = WORKERS
+    if '--workers' in args:
+        position = args.index('--workers')
+        value = args[position + 1] if position + 1 < len(args) else ''
+        if not value.isdigit() or int(value) < 1:
+            print("Usage: python aggregate_btc_candles.py [--incremental] [--workers N]")
+            sys.exit(1)
+        workers = int(value)
+    if '--incremental' in args:
+        aggregate_incremental()
+    else:
+        aggregate_all(workers=workers)
+    print("Aggregation complete!")
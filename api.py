@@ -1,6 +1,11 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, Response
 import psycopg2
+import threading
+import time
 from datetime import datetime
+import numpy as np
+from metrics import REGISTRY
+import candle_formats
 
 app = Flask(__name__)
 
@@ -11,27 +16,100 @@ DB_NAME = 'binance_data'
 DB_USER = 'postgres'
 DB_PASSWORD = 'kurwa'
 
-@app.route('/price', methods=['GET'])
-def get_price():
-    unix_ts = request.args.get('timestamp')
-    if not unix_ts:
-        return jsonify({"error": "Missing timestamp parameter"}), 400
+# Largest range served by /candles (one month of 1-second candles)
+MAX_CANDLES_PER_RESPONSE = 31 * 24 * 60 * 60
+# Rows pulled per round trip from the server-side cursor behind /candles
+FETCH_BATCH_ROWS = 10000
 
-    try:
-        unix_ts = int(unix_ts)
-        # Convert Unix timestamp to datetime
-        dt = datetime.utcfromtimestamp(unix_ts)
-    except ValueError:
-        return jsonify({"error": "Invalid timestamp"}), 400
+# Metrics exposed on /metrics
+REQUEST_LATENCY = REGISTRY.histogram('api_request_duration_seconds', 'HTTP request latency by endpoint and status')
+DB_LATENCY = REGISTRY.histogram('api_db_query_duration_seconds', 'Time spent connecting to and querying Postgres')
+LOOKUPS = REGISTRY.counter('api_lookups_total', 'Lookups by result: miss ran a DB read, hit shared an in-flight one')
+COALESCED_RATIO = REGISTRY.gauge('api_singleflight_coalesced_ratio', 'Share of lookups that shared an in-flight DB read')
+IN_FLIGHT = REGISTRY.gauge('api_singleflight_in_flight', 'Distinct lookups currently in flight')
+WAITING = REGISTRY.gauge('api_singleflight_waiting', 'Requests currently waiting on an in-flight lookup')
+MAX_WAITERS = REGISTRY.gauge('api_singleflight_max_waiters', 'Largest pile-up seen on a single lookup')
+
+class SingleFlight:
+    """
+    Collapse concurrent identical lookups into one in-flight call.
+    The first caller for a key runs the function, every caller that arrives
+    while it is still running waits for and shares the same result (or error).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {
+            'calls': 0,          # Lookups that actually ran
+            'coalesced': 0,      # Lookups that piggybacked on an in-flight call
+            'errors': 0,         # Lookups that raised
+            'max_waiters': 0     # Largest pile-up seen on a single key
+        }
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call['waiters'] += 1
+                self._stats['coalesced'] += 1
+                self._stats['max_waiters'] = max(self._stats['max_waiters'], call['waiters'])
+                leader = False
+                LOOKUPS.inc(result='hit')
+            else:
+                call = {'event': threading.Event(), 'result': None, 'error': None, 'waiters': 0}
+                self._calls[key] = call
+                self._stats['calls'] += 1
+                leader = True
+                LOOKUPS.inc(result='miss')
+
+        if not leader:
+            call['event'].wait()
+            with self._lock:
+                call['waiters'] -= 1
+        else:
+            try:
+                call['result'] = fn()
+            except Exception as e:
+                call['error'] = e
+                with self._lock:
+                    self._stats['errors'] += 1
+            finally:
+                # Forget the key before waking waiters so later lookups start a fresh read
+                with self._lock:
+                    del self._calls[key]
+                call['event'].set()
+
+        if call['error'] is not None:
+            raise call['error']
+        return call['result']
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['in_flight'] = len(self._calls)
+            snapshot['waiting'] = sum(call['waiters'] for call in self._calls.values())
+        return snapshot
+
+price_lookups = SingleFlight()
 
+def connect():
+    return psycopg2.connect(
+        host=DB_HOST,
+        port=DB_PORT,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        database=DB_NAME
+    )
+
+def fetch_price_row(dt):
+    """Read the candle row for a single timestamp from Postgres"""
+    with DB_LATENCY.time():
+        return _query_price_row(dt)
+
+def _query_price_row(dt):
+    conn = connect()
     try:
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME
-        )
         cursor = conn.cursor()
 
         # Query the row
@@ -43,9 +121,93 @@ def get_price():
 
         row = cursor.fetchone()
         cursor.close()
+        return row
+    finally:
         conn.close()
 
-        if row:
+def fetch_candle_columns(start_dt, end_dt):
+    """
+    Read [start, end) straight into typed columns (see candle_formats.COLUMN_DTYPES).
+    A server-side cursor streams the rows FETCH_BATCH_ROWS at a time into
+    preallocated arrays, so the full result never exists as Python tuples.
+    """
+    # Candles are at most one per second, which bounds the row count up front
+    capacity = min(MAX_CANDLES_PER_RESPONSE, max(int((end_dt - start_dt).total_seconds()), 0))
+    columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in candle_formats.COLUMN_DTYPES.items()}
+    count = 0
+    with DB_LATENCY.time():
+        conn = connect()
+        try:
+            cursor = conn.cursor(name='candle_rows')
+
+            # Cast in SQL so rows arrive as plain floats instead of Decimals
+            cursor.execute("""
+                SELECT EXTRACT(EPOCH FROM timestamp)::bigint, open_price::float8, high_price::float8,
+                       low_price::float8, close_price::float8, volume::float8
+                FROM btc_price_data
+                WHERE timestamp >= %s AND timestamp < %s
+                ORDER BY timestamp
+                LIMIT %s
+            """, (start_dt, end_dt, capacity))
+
+            while True:
+                batch = cursor.fetchmany(FETCH_BATCH_ROWS)
+                if not batch:
+                    break
+                values = np.array(batch, dtype=np.float64)
+                for position, column in enumerate(columns.values()):
+                    column[count:count + len(batch)] = values[:, position]
+                count += len(batch)
+            cursor.close()
+        finally:
+            conn.close()
+    return {name: column[:count] for name, column in columns.items()}
+
+def negotiated_format():
+    return candle_formats.negotiate(request.accept_mimetypes, request.args.get('format'))
+
+def binary_response(columns, mimetype):
+    return Response(candle_formats.encode_columns(columns, mimetype), mimetype=mimetype)
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        REQUEST_LATENCY.observe(time.perf_counter() - started,
+                                endpoint=request.endpoint or 'unknown',
+                                status=str(response.status_code))
+    return response
+
+@app.route('/price', methods=['GET'])
+def get_price():
+    unix_ts = request.args.get('timestamp')
+    if not unix_ts:
+        return jsonify({"error": "Missing timestamp parameter"}), 400
+
+    try:
+        unix_ts = int(unix_ts)
+        # Convert Unix timestamp to datetime
+        dt = datetime.utcfromtimestamp(unix_ts)
+    except ValueError:
+        return jsonify({"error": "Invalid timestamp"}), 400
+
+    # Only an explicit ?format= we cannot produce is refused; any Accept header falls back to JSON
+    mimetype = negotiated_format()
+    if mimetype is None:
+        return jsonify({"error": f"Unsupported format {request.args.get('format')!r}"}), 406
+
+    try:
+        # Concurrent requests for the same timestamp share one query
+        row = price_lookups.do(('price', unix_ts), lambda: fetch_price_row(dt))
+
+        if row and mimetype != candle_formats.JSON_MIMETYPE:
+            columns = candle_formats.rows_to_columns([(unix_ts, row[2], row[3], row[4], row[5], row[6])])
+            return binary_response(columns, mimetype)
+        elif row:
             data = {
                 "id": row[0],
                 "timestamp": row[1].isoformat(),
@@ -63,5 +225,57 @@ def get_price():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/candles', methods=['GET'])
+def get_candles():
+    start_ts = request.args.get('start')
+    end_ts = request.args.get('end')
+    if not start_ts or not end_ts:
+        return jsonify({"error": "Missing start or end parameter"}), 400
+
+    try:
+        start_ts = int(start_ts)
+        end_ts = int(end_ts)
+        start_dt = datetime.utcfromtimestamp(start_ts)
+        end_dt = datetime.utcfromtimestamp(end_ts)
+    except ValueError:
+        return jsonify({"error": "Invalid timestamp"}), 400
+
+    if end_ts <= start_ts:
+        return jsonify({"error": "end must be after start"}), 400
+
+    # Only an explicit ?format= we cannot produce is refused; any Accept header falls back to JSON
+    mimetype = negotiated_format()
+    if mimetype is None:
+        return jsonify({"error": f"Unsupported format {request.args.get('format')!r}"}), 406
+
+    try:
+        columns = price_lookups.do(('candles', start_ts, end_ts), lambda: fetch_candle_columns(start_dt, end_dt))
+        count = len(columns['unix_timestamp'])
+
+        if mimetype != candle_formats.JSON_MIMETYPE:
+            return binary_response(columns, mimetype)
+        return jsonify({
+            "count": count,
+            "truncated": count == MAX_CANDLES_PER_RESPONSE,
+            "candles": {name: array.tolist() for name, array in columns.items()}
+        })
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/stats', methods=['GET'])
+def get_stats():
+    return jsonify({"price_lookups": price_lookups.stats()})
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    stats = price_lookups.stats()
+    lookups = stats['calls'] + stats['coalesced']
+    COALESCED_RATIO.set(stats['coalesced'] / lookups if lookups else 0.0)
+    IN_FLIGHT.set(stats['in_flight'])
+    WAITING.set(stats['waiting'])
+    MAX_WAITERS.set(stats['max_waiters'])
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(debug=True, host='0.0.0.0', port=5000)
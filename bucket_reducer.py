@@ -0,0 +1,122 @@
+import numpy as np
+
+# Fixed-width OHLCV bucketing over sorted unix timestamps with NumPy segmented
+# reductions. Buckets are (unix_timestamp - offset) // step; only non-empty
+# buckets are returned, which is what resample(...).agg(...).dropna() gave us.
+# Volumes use the same Kahan-compensated summation as pandas' groupby sum, so
+# results match the old resample output bit for bit.
+
+DAY_SECONDS = 86400
+
+REDUCED_COLUMNS = ['unix_timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+# step, offset and label shift reproducing the pandas frequencies used for rollups.
+# pandas 'W' (W-SUN) buckets run Monday 00:00 to Sunday 23:59 and are labelled with
+# the Sunday; 1970-01-05 (345600s) is the first Monday after the epoch.
+FREQUENCIES = {
+    '5min': (300, 0, 0),
+    '30min': (1800, 0, 0),
+    'h': (3600, 0, 0),
+    'D': (DAY_SECONDS, 0, 0),
+    'W': (7 * DAY_SECONDS, 4 * DAY_SECONDS, 6 * DAY_SECONDS),
+}
+
+def bucket_ids(unix_timestamps, step, offset=0):
+    return (np.asarray(unix_timestamps, dtype=np.int64) - offset) // step
+
+def segment_starts(ids):
+    """Index of the first row of every run of equal bucket ids"""
+    ids = np.asarray(ids)
+    if not len(ids):
+        return np.empty(0, dtype=np.int64)
+    return np.flatnonzero(np.concatenate([[True], ids[1:] != ids[:-1]]))
+
+def kahan_segment_sum(values, starts):
+    """
+    Compensated sum of each segment values[starts[i]:starts[i+1]], performed in
+    row order exactly like pandas' group_sum, vectorised across segments: step
+    k adds the k-th value of every segment longer than k. Segments are ordered
+    longest first so each step works on a prefix of them; the number of steps
+    is the length of the longest segment.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    starts = np.asarray(starts, dtype=np.int64)
+    if not len(starts):
+        return np.empty(0, dtype=np.float64)
+    # pandas skips NaNs, which is the same as summing the segments without them
+    missing = np.isnan(values)
+    if missing.any():
+        kept = np.concatenate([[0], np.cumsum(~missing)])
+        starts = kept[starts]
+        values = values[~missing]
+    lengths = np.diff(np.append(starts, len(values)))
+    if not lengths.max():
+        return np.zeros(len(starts))
+    order = np.argsort(-lengths, kind='stable')
+    positions = starts[order]
+    # active[k]: how many segments are longer than k (a prefix of the ordering)
+    active = len(lengths) - np.searchsorted(np.sort(lengths), np.arange(int(lengths.max())), side='right')
+    # An infinite value makes the compensation NaN; pandas resets it to 0
+    infinite = bool(np.isinf(values).any())
+    sums = np.zeros(len(starts))
+    compensation = np.zeros(len(starts))
+    with np.errstate(invalid='ignore'):
+        for count in active.tolist():
+            total = sums[:count]
+            y = values[positions[:count]] - compensation[:count]
+            t = total + y
+            np.subtract(t - total, y, out=compensation[:count])
+            if infinite:
+                compensation[np.isnan(compensation)] = 0.0
+            total[...] = t
+            positions += 1
+    result = np.empty(len(starts))
+    result[order] = sums
+    return result
+
+def reduce_ohlcv(columns, step, offset=0, label_shift=0):
+    """
+    Roll sorted OHLCV columns up into fixed-width buckets.
+    columns holds unix_timestamp/open/high/low/close/volume arrays; the result has
+    the same keys, with unix_timestamp set to bucket start + label_shift.
+    """
+    unix = np.asarray(columns['unix_timestamp'], dtype=np.int64)
+    ids = bucket_ids(unix, step, offset)
+    starts = segment_starts(ids)
+    if not len(starts):
+        return {name: np.asarray(columns[name])[:0] for name in REDUCED_COLUMNS}
+    ends = np.append(starts[1:], len(unix))
+    return {
+        'unix_timestamp': ids[starts] * step + offset + label_shift,
+        'open': np.asarray(columns['open'], dtype=np.float64)[starts],
+        'high': np.maximum.reduceat(np.asarray(columns['high'], dtype=np.float64), starts),
+        'low': np.minimum.reduceat(np.asarray(columns['low'], dtype=np.float64), starts),
+        'close': np.asarray(columns['close'], dtype=np.float64)[ends - 1],
+        'volume': kahan_segment_sum(columns['volume'], starts),
+    }
+
+def reduce_frequency(columns, freq):
+    """reduce_ohlcv with the step/offset/label of a pandas frequency alias ('5min', 'h', 'D', 'W')"""
+    step, offset, label_shift = FREQUENCIES[freq]
+    return reduce_ohlcv(columns, step, offset, label_shift)
+
+def iter_reduced(chunks, step, offset=0, label_shift=0):
+    """
+    reduce_ohlcv over a time-ordered stream of column chunks. The last bucket of
+    each chunk is held back until the next chunk shows it is complete, so a
+    bucket split across chunks is reduced in one piece.
+    """
+    carry = None
+    for chunk in chunks:
+        columns = {name: np.asarray(chunk[name]) for name in REDUCED_COLUMNS}
+        if carry is not None:
+            columns = {name: np.concatenate([carry[name], columns[name]]) for name in REDUCED_COLUMNS}
+        if not len(columns['unix_timestamp']):
+            continue
+        ids = bucket_ids(columns['unix_timestamp'], step, offset)
+        cut = int(np.searchsorted(ids, ids[-1]))
+        carry = {name: values[cut:] for name, values in columns.items()}
+        if cut:
+            yield reduce_ohlcv({name: values[:cut] for name, values in columns.items()}, step, offset, label_shift)
+    if carry is not None and len(carry['unix_timestamp']):
+        yield reduce_ohlcv(carry, step, offset, label_shift)
@@ -0,0 +1,266 @@
+import re
+import numpy as np
+from candle_csv import CANDLE_FIELDS, TIMESTAMP_TEXT_BYTES, format_timestamp_bytes, read_candles
+
+# Vectorised checks over the typed columns of one candle shard. Every check is
+# an array mask or a diff over the whole shard, and reports the first offending
+# row (1-based, header excluded) the way the old row-by-row validators did.
+
+# Rows per step when comparing the timestamp text with unix_timestamp
+TEXT_CHECK_ROWS = 65536
+
+# Gaps up to this many minutes are accepted when they end in the first minutes
+# of a calendar year (exchange data often starts a few minutes into Jan 1)
+ACCEPTABLE_GAP_MINUTES = 5
+
+def read_shard(filepath):
+    """
+    Raw bytes and typed columns of a candle CSV.
+    Raises ValueError for a wrong header, a row without 7 fields or a value that
+    does not parse ("Parse error at row N: ...").
+    """
+    with open(filepath, 'rb') as f:
+        raw = f.read()
+    header, _, _ = raw.partition(b'\n')
+    if header.decode('ascii', 'replace').strip().split(',') != CANDLE_FIELDS:
+        raise ValueError("Invalid header format")
+    error = column_count_error(raw)
+    if error is not None:
+        row, fields = error
+        raise ValueError(f"Row {row} has {fields} columns, expected {len(CANDLE_FIELDS)}")
+    try:
+        return raw, read_candles(raw)
+    except ValueError as e:
+        # numpy reports 0-based data rows (blank lines skipped); report 1-based rows like the other checks
+        match = re.search(r' at row (\d+), column (\d+)\.?$', str(e))
+        if match is None:
+            raise
+        raise ValueError(f"Parse error at row {int(match.group(1)) + 1}: "
+                         f"{str(e)[:match.start()]} (column {match.group(2)})") from None
+
+def _lines(data):
+    """Start offsets and non-blank mask of every line of a byte array"""
+    newlines = np.flatnonzero(data == ord('\n'))
+    starts = np.concatenate([[0], newlines + 1])
+    ends = np.concatenate([newlines, [len(data)]])
+    # Blank lines (e.g. the end of the file) are skipped like the CSV readers do
+    lengths = ends - starts
+    blank = (lengths == 0) | ((lengths == 1) & (data[np.minimum(starts, max(len(data) - 1, 0))] == ord('\r')))
+    return newlines, starts, ~blank
+
+def column_count_error(raw):
+    """(row, field count) of the first data row without 7 fields, or None"""
+    data = np.frombuffer(raw, dtype=np.uint8)
+    newlines, starts, filled = _lines(data)
+    # Fields per line from the line number of every comma (no per-byte counters)
+    line_of_comma = np.searchsorted(newlines, np.flatnonzero(data == ord(',')))
+    counts = np.bincount(line_of_comma, minlength=len(starts))
+    counts = counts[filled][1:]
+    bad = np.flatnonzero(counts != len(CANDLE_FIELDS) - 1)
+    return (int(bad[0]) + 1, int(counts[bad[0]]) + 1) if len(bad) else None
+
+def timestamp_text_error(raw, unix):
+    """
+    (row, text) of the first data row whose timestamp text is not its
+    unix_timestamp formatted as '%Y-%m-%d %H:%M:%S' UTC, or None.
+    Rows must already have 7 fields each (see column_count_error).
+    """
+    data = np.frombuffer(raw, dtype=np.uint8)
+    _, starts, filled = _lines(data)
+    starts = starts[filled][1:]
+    width = TIMESTAMP_TEXT_BYTES
+    last = len(data) - 1
+    for lo in range(0, len(starts), TEXT_CHECK_ROWS):
+        chunk = starts[lo:lo + TEXT_CHECK_ROWS]
+        text = data[np.minimum(chunk[:, None] + np.arange(width), last)]
+        wrong = ((text != format_timestamp_bytes(unix[lo:lo + TEXT_CHECK_ROWS])).any(axis=1)
+                 | (data[np.minimum(chunk + width, last)] != ord(',')))
+        rows = np.flatnonzero(wrong)
+        if len(rows):
+            start = int(chunk[rows[0]])
+            field = bytes(data[start:start + width + 16]).split(b',', 1)[0]
+            return lo + int(rows[0]) + 1, field.decode('ascii', 'replace')
+    return None
+
+def _first_row(mask):
+    rows = np.flatnonzero(mask)
+    return int(rows[0]) + 1 if len(rows) else None
+
+def row_errors(columns, raw=None):
+    """
+    (row, message) for the first failing row of each row-level check: timestamp
+    text matching unix_timestamp (when the raw bytes are given), positive
+    prices, high/low enclosing open/close and unique timestamps.
+    """
+    open_, close = columns['open'], columns['close']
+    high, low = columns['high'], columns['low']
+    unix = columns['unix_timestamp']
+    errors = []
+
+    if raw is not None:
+        error = timestamp_text_error(raw, unix)
+        if error is not None:
+            row, text = error
+            errors.append((row, f"Timestamp '{text}' does not match unix_timestamp {int(unix[row - 1])}"))
+
+    row = _first_row((open_ <= 0) | (close <= 0) | (high <= 0) | (low <= 0))
+    if row is not None:
+        errors.append((row, "Invalid price data"))
+    row = _first_row((high < np.maximum(open_, close)) | (low > np.minimum(open_, close)))
+    if row is not None:
+        errors.append((row, "Invalid OHLC relationship"))
+
+    if not np.all(np.diff(unix) > 0):
+        # Unsorted or repeated timestamps: a repeat is any row whose value appeared earlier
+        order = np.argsort(unix, kind='stable')
+        repeats = np.zeros(len(unix), dtype=bool)
+        repeats[order[1:]] = np.diff(unix[order]) == 0
+        row = _first_row(repeats)
+        if row is not None:
+            errors.append((row, f"Duplicate timestamp {int(unix[row - 1])}"))
+    return errors
+
+def first_row_error(columns, raw=None):
+    """The earliest row-level problem as (row, message), or None"""
+    errors = row_errors(columns, raw)
+    return min(errors, key=lambda error: error[0]) if errors else None
+
+def year_starts(unix_timestamps):
+    return (np.asarray(unix_timestamps, dtype=np.int64).astype('datetime64[s]')
+            .astype('datetime64[Y]').astype('datetime64[s]').astype(np.int64))
+
+def acceptable_gaps(previous, current, step=60, tolerance_minutes=ACCEPTABLE_GAP_MINUTES):
+    """
+    Mask of breaks previous -> current that are small gaps at a year boundary:
+    current falls in the first tolerance_minutes of Jan 1 and the gap is
+    positive and at most tolerance_minutes.
+    """
+    previous = np.asarray(previous, dtype=np.int64)
+    current = np.asarray(current, dtype=np.int64)
+    return _small_gap_after(previous, current, year_starts(current), step, tolerance_minutes)
+
+def _small_gap_after(previous, current, boundary, step, tolerance_minutes):
+    """Gap positive, at most tolerance_minutes and ending in the first tolerance_minutes after boundary"""
+    into_period = current - boundary
+    gap = current - previous - step
+    return ((into_period >= 0) & (into_period < (tolerance_minutes + 1) * 60)
+            & (gap > 0) & (gap <= tolerance_minutes * 60))
+
+def continuity_breaks(unix, step=60):
+    """Indices i where unix[i] does not follow unix[i-1] by exactly one step"""
+    return np.flatnonzero(np.diff(unix) != step) + 1
+
+def missing_ranges(timestamps, step=60):
+    """
+    Missing stretches of a candle series as an int64 array of
+    [first_missing, last_missing] rows, from one diff of the sorted timestamps.
+    Memory is proportional to the number of gaps, not the missing minutes.
+    """
+    unix = np.asarray(timestamps, dtype=np.int64)
+    if not np.all(np.diff(unix) > 0):
+        unix = np.unique(unix)
+    breaks = np.flatnonzero(np.diff(unix) > step)
+    return np.column_stack([unix[breaks] + step, unix[breaks + 1] - step])
+
+def shard_gap_acceptable(previous, current, shard_start=None, step=60, tolerance_minutes=ACCEPTABLE_GAP_MINUTES):
+    """
+    Rule between the last candle of one file and the first of the next: a
+    positive gap of at most tolerance_minutes, with the next file starting in
+    its first tolerance_minutes. shard_start is where the next file's range
+    begins (Jan 1 for a yearly file, midnight for a 1s day file; the start of
+    the year when None).
+    """
+    if shard_start is None:
+        shard_start = year_starts([current])[0]
+    return bool(_small_gap_after(np.int64(previous), np.int64(current), np.int64(shard_start), step, tolerance_minutes))
+
+def check_shard(filepath, step=60, tolerance_minutes=ACCEPTABLE_GAP_MINUTES, examples=3):
+    """
+    Every per-file check on one shard. Returns a dict with rows, first/last
+    timestamp, error (first parse or row-level problem, or None) and the counts
+    and first examples of acceptable and problematic gaps.
+    """
+    result = {'path': filepath, 'rows': 0, 'first': None, 'last': None, 'error': None,
+              'problems': 0, 'acceptable': 0, 'problem_examples': [], 'acceptable_examples': []}
+    try:
+        raw, columns = read_shard(filepath)
+    except (OSError, ValueError) as e:
+        result['error'] = str(e)
+        return result
+    unix = columns['unix_timestamp']
+    result['rows'] = len(unix)
+    if not len(unix):
+        result['error'] = "No data found"
+        return result
+    result['first'], result['last'] = int(unix[0]), int(unix[-1])
+    error = first_row_error(columns, raw)
+    if error is not None:
+        result['error'] = f"{error[1]} at row {error[0]}"
+        return result
+
+    breaks = continuity_breaks(unix, step)
+    ok = acceptable_gaps(unix[breaks - 1], unix[breaks], step, tolerance_minutes)
+    result['acceptable'] = int(ok.sum())
+    result['problems'] = int((~ok).sum())
+    for key, mask in (('acceptable_examples', ok), ('problem_examples', ~ok)):
+        picked = breaks[mask][:examples]
+        result[key] = list(zip(unix[picked - 1].tolist(), unix[picked].tolist()))
+    return result
+
+class ContinuityChecker:
+    """
+    Streaming continuity check over time-ordered timestamp chunks.
+    Only the last timestamp seen is carried from chunk to chunk, so memory does
+    not grow with the history. Inside a shard a gap is acceptable only at the
+    start of a year (as in validate_year_file); between shards (call
+    start_shard() with the start of the next file's range before feeding it)
+    only at the start of that range, as in shard_gap_acceptable.
+    """
+
+    def __init__(self, step=60, tolerance_minutes=ACCEPTABLE_GAP_MINUTES, examples=3):
+        self.step = step
+        self.tolerance_minutes = tolerance_minutes
+        self.examples = examples
+        self.rows = 0
+        self.first = None
+        self.last = None
+        self.problems = 0
+        self.acceptable = 0
+        self.problem_examples = []
+        self.acceptable_examples = []
+        self._shard_boundary = False
+        self._shard_start = None
+
+    def start_shard(self, shard_start=None):
+        self._shard_boundary = True
+        self._shard_start = shard_start
+
+    def feed(self, unix):
+        unix = np.asarray(unix, dtype=np.int64)
+        if not len(unix):
+            return
+        if self.last is not None and unix[0] - self.last != self.step:
+            if self._shard_boundary:
+                ok = shard_gap_acceptable(self.last, int(unix[0]), self._shard_start, self.step, self.tolerance_minutes)
+            else:
+                ok = bool(acceptable_gaps([self.last], unix[:1], self.step, self.tolerance_minutes)[0])
+            self._record(np.array([self.last]), unix[:1], np.array([ok]))
+        self._shard_boundary = False
+
+        breaks = continuity_breaks(unix, self.step)
+        if len(breaks):
+            previous, current = unix[breaks - 1], unix[breaks]
+            self._record(previous, current, acceptable_gaps(previous, current, self.step, self.tolerance_minutes))
+
+        if self.first is None:
+            self.first = int(unix[0])
+        self.last = int(unix[-1])
+        self.rows += len(unix)
+
+    def _record(self, previous, current, ok):
+        self.acceptable += int(ok.sum())
+        self.problems += int((~ok).sum())
+        for examples, mask in ((self.acceptable_examples, ok), (self.problem_examples, ~ok)):
+            room = self.examples - len(examples)
+            if room > 0:
+                examples.extend(zip(previous[mask][:room].tolist(), current[mask][:room].tolist()))
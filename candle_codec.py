@@ -0,0 +1,242 @@
+import os
+import struct
+import sys
+import zlib
+import numpy as np
+from candle_csv import read_candles
+from candle_shard import MAX_PRICE_DECIMALS, MAX_VOLUME_DECIMALS, fixed_point_decimals
+
+try:
+    import zstandard
+except ImportError:  # zlib is used when zstandard is not installed
+    zstandard = None
+
+# Block-based column codec for candle files (mainly the 1sec day files).
+# Every block holds up to BLOCK_ROWS candles and is self-contained:
+#   block header : rows, compression, raw payload size, stored payload size
+#   payload      : one encoded column after another
+#   column       : kind, decimals, byte length, bytes
+# Integer columns (unix_timestamp and fixed-point prices/volumes) are stored as
+# delta -> zigzag -> LEB128 varint; columns with no lossless fixed-point scale
+# fall back to raw float64. The payload is then zstd (or zlib) compressed.
+MAGIC = b'CNDZ'
+VERSION = 1
+FILE_HEADER = struct.Struct('<4sB3x')
+BLOCK_HEADER = struct.Struct('<IBII3x')
+COLUMN_HEADER = struct.Struct('<BBI')
+
+CODEC_COLUMNS = ['unix_timestamp', 'open', 'high', 'low', 'close', 'volume']
+BLOCK_ROWS = 65536
+
+KIND_VARINT = 0
+KIND_FLOAT64 = 1
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_ZSTD = 2
+DEFAULT_COMPRESSION = COMPRESSION_ZSTD if zstandard is not None else COMPRESSION_ZLIB
+ZSTD_LEVEL = 9
+ZLIB_LEVEL = 6
+
+CODEC_EXTENSION = '.cndz'
+
+def zigzag(values):
+    values = np.asarray(values, dtype=np.int64)
+    return ((values << 1) ^ (values >> 63)).view(np.uint64)
+
+def unzigzag(values):
+    values = np.asarray(values, dtype=np.uint64)
+    return (values >> np.uint64(1)).view(np.int64) ^ -(values & np.uint64(1)).view(np.int64)
+
+def varint_encode(values):
+    """LEB128-encode an array of uint64 values, vectorised over byte positions"""
+    values = np.asarray(values, dtype=np.uint64)
+    if not len(values):
+        return b''
+    lengths = np.ones(len(values), dtype=np.int64)
+    for k in range(1, 10):
+        lengths += values >= np.uint64(1 << (7 * k))
+    offsets = np.cumsum(lengths) - lengths
+    out = np.empty(int(lengths.sum()), dtype=np.uint8)
+    for k in range(int(lengths.max())):
+        active = lengths > k
+        chunk = (values[active] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (lengths[active] > k + 1).astype(np.uint64) << np.uint64(7)
+        out[offsets[active] + k] = (chunk | more).astype(np.uint8)
+    return out.tobytes()
+
+def varint_decode(data, count=None):
+    """Inverse of varint_encode; returns a uint64 array"""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if not len(raw):
+        return np.empty(0, dtype=np.uint64)
+    ends = np.flatnonzero(raw < 0x80)
+    if not len(ends) or ends[-1] != len(raw) - 1:
+        raise ValueError("truncated varint stream")
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    value_index = np.repeat(np.arange(len(ends)), ends - starts + 1)
+    shifts = ((np.arange(len(raw)) - starts[value_index]) * 7).astype(np.uint64)
+    parts = (raw & 0x7F).astype(np.uint64) << shifts
+    values = np.bitwise_or.reduceat(parts, starts)
+    if count is not None and len(values) != count:
+        raise ValueError(f"expected {count} varints, found {len(values)}")
+    return values
+
+def _column_decimals(name, values):
+    max_decimals = MAX_VOLUME_DECIMALS if name == 'volume' else MAX_PRICE_DECIMALS
+    try:
+        return fixed_point_decimals([values], max_decimals, name)
+    except ValueError:
+        return None
+
+def encode_column(name, values):
+    """Encode one column of a block as (column header + bytes)"""
+    values = np.asarray(values)
+    if name == 'unix_timestamp':
+        kind, decimals, ints = KIND_VARINT, 0, values.astype(np.int64)
+    else:
+        decimals = _column_decimals(name, values)
+        if decimals is None:
+            kind, decimals = KIND_FLOAT64, 0
+        else:
+            kind = KIND_VARINT
+            ints = np.round(values.astype(np.float64) * 10.0 ** decimals).astype(np.int64)
+    if kind == KIND_VARINT:
+        data = varint_encode(zigzag(np.diff(ints, prepend=np.int64(0))))
+    else:
+        data = values.astype('<f8').tobytes()
+    return COLUMN_HEADER.pack(kind, decimals, len(data)) + data
+
+def decode_column(name, kind, decimals, data, count):
+    if kind == KIND_FLOAT64:
+        return np.frombuffer(data, dtype='<f8', count=count).astype(np.float64)
+    ints = np.cumsum(unzigzag(varint_decode(data, count)))
+    if name == 'unix_timestamp':
+        return ints
+    return ints / 10.0 ** decimals
+
+def _compress(payload, compression):
+    if compression == COMPRESSION_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required for zstd compression (pip install zstandard)")
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(payload)
+    if compression == COMPRESSION_ZLIB:
+        return zlib.compress(payload, ZLIB_LEVEL)
+    return payload
+
+def _decompress(stored, compression, raw_size):
+    if compression == COMPRESSION_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed blocks (pip install zstandard)")
+        return zstandard.ZstdDecompressor().decompress(stored, max_output_size=raw_size)
+    if compression == COMPRESSION_ZLIB:
+        return zlib.decompress(stored)
+    return stored
+
+def encode_block(columns, compression=DEFAULT_COMPRESSION):
+    rows = len(columns['unix_timestamp'])
+    payload = b''.join(encode_column(name, columns[name]) for name in CODEC_COLUMNS)
+    stored = _compress(payload, compression)
+    return BLOCK_HEADER.pack(rows, compression, len(payload), len(stored)) + stored
+
+def decode_block(rows, payload):
+    columns = {}
+    offset = 0
+    for name in CODEC_COLUMNS:
+        kind, decimals, size = COLUMN_HEADER.unpack_from(payload, offset)
+        offset += COLUMN_HEADER.size
+        columns[name] = decode_column(name, kind, decimals, payload[offset:offset + size], rows)
+        offset += size
+    return columns
+
+def write_encoded(filename, chunks, compression=DEFAULT_COMPRESSION, block_rows=BLOCK_ROWS):
+    """
+    Encode columnar candle chunks into a block file.
+    Returns (rows, bytes_written).
+    """
+    total_rows = 0
+    with open(filename, 'wb') as f:
+        f.write(FILE_HEADER.pack(MAGIC, VERSION))
+        for columns in chunks:
+            rows = len(columns['unix_timestamp'])
+            for start in range(0, rows, block_rows):
+                block = {name: np.asarray(columns[name])[start:start + block_rows] for name in CODEC_COLUMNS}
+                f.write(encode_block(block, compression))
+            total_rows += rows
+        size = f.tell()
+    return total_rows, size
+
+def iter_blocks(source):
+    """
+    Stream-decode a block file (filename or binary file object), yielding one
+    dict of typed columns per block without holding the whole file in memory.
+    """
+    f = open(source, 'rb') if isinstance(source, str) else source
+    try:
+        magic, version = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError("not a candle codec file (bad magic)")
+        if version != VERSION:
+            raise ValueError(f"unsupported candle codec version {version}")
+        while True:
+            header = f.read(BLOCK_HEADER.size)
+            if not header:
+                break
+            if len(header) < BLOCK_HEADER.size:
+                raise ValueError("truncated block header")
+            rows, compression, raw_size, stored_size = BLOCK_HEADER.unpack(header)
+            stored = f.read(stored_size)
+            if len(stored) < stored_size:
+                raise ValueError("truncated block payload")
+            yield decode_block(rows, _decompress(stored, compression, raw_size))
+    finally:
+        if f is not source:
+            f.close()
+
+def read_encoded(source):
+    """Decode a whole block file into one set of columns"""
+    blocks = list(iter_blocks(source))
+    if not blocks:
+        return {name: np.empty(0, dtype=np.int64 if name == 'unix_timestamp' else np.float64) for name in CODEC_COLUMNS}
+    return {name: np.concatenate([block[name] for block in blocks]) for name in CODEC_COLUMNS}
+
+def encoded_path(csv_path):
+    return os.path.splitext(csv_path)[0] + CODEC_EXTENSION
+
+def convert_csv(csv_path, output_path=None, compression=DEFAULT_COMPRESSION):
+    output_path = output_path or encoded_path(csv_path)
+    rows, size = write_encoded(output_path, [read_candles(csv_path)], compression)
+    return output_path, rows, size
+
+def _expand(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith('.csv'):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python candle_codec.py <csv_file_or_dir> [...]")
+        print("Example: python candle_codec.py data/btc/1sec")
+        sys.exit(1)
+
+    print(f"🗜️  Compression: {'zstd' if DEFAULT_COMPRESSION == COMPRESSION_ZSTD else 'zlib'}")
+    total_csv = 0
+    total_encoded = 0
+    for csv_path in _expand(sys.argv[1:]):
+        output_path, rows, size = convert_csv(csv_path)
+        csv_size = os.path.getsize(csv_path)
+        total_csv += csv_size
+        total_encoded += size
+        print(f"💾 {output_path}: {rows:,} candles, {size:,} bytes ({csv_size / max(size, 1):.1f}x smaller)")
+
+    if total_encoded:
+        print(f"\n✅ {total_csv:,} bytes of CSV → {total_encoded:,} bytes ({total_csv / total_encoded:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+import io
+import warnings
+from datetime import date, timedelta
+import numpy as np
+
+# Fixed schema shared by every candle CSV in data/
+CANDLE_FIELDS = ['timestamp', 'open', 'close', 'volume', 'unix_timestamp', 'high', 'low']
+
+# Typed columns parsed from a candle CSV (the timestamp text is derived from unix_timestamp)
+CANDLE_DTYPE = np.dtype([
+    ('open', np.float64),
+    ('close', np.float64),
+    ('volume', np.float64),
+    ('unix_timestamp', np.int64),
+    ('high', np.float64),
+    ('low', np.float64),
+])
+CANDLE_COLUMNS = list(CANDLE_DTYPE.names)
+UNIX_TIMESTAMP_INDEX = CANDLE_FIELDS.index('unix_timestamp')
+
+# Rows per write() call when emitting CSV text
+WRITE_CHUNK_ROWS = 65536
+
+# Bytes of CSV text parsed per step by the block readers
+READ_BLOCK_BYTES = 8 << 20
+
+# Length of the '%Y-%m-%d %H:%M:%S' timestamp text
+TIMESTAMP_TEXT_BYTES = 19
+
+EPOCH_DATE = date(1970, 1, 1)
+_time_of_day_table = None
+
+def _open_text(source):
+    if isinstance(source, (bytes, bytearray)):
+        # numpy parses a bytes stream directly, without a decoded str copy
+        return io.BytesIO(source)
+    if isinstance(source, str):
+        return open(source, 'r', newline='')
+    return source
+
+def read_header(filename):
+    """Return the header of a candle CSV and raise ValueError if it is not the standard schema"""
+    with open(filename, 'r', newline='') as f:
+        header = f.readline().strip().split(',')
+    if header != CANDLE_FIELDS:
+        raise ValueError(f"{filename}: unexpected header {header}, expected {CANDLE_FIELDS}")
+    return header
+
+def _loadtxt(source, usecols, dtype, skip_header):
+    f = _open_text(source)
+    try:
+        with warnings.catch_warnings():
+            # Header-only files are valid and simply yield empty columns
+            warnings.filterwarnings('ignore', message='.*input contained no data.*')
+            return np.loadtxt(f, delimiter=',', skiprows=1 if skip_header else 0,
+                              usecols=usecols, dtype=dtype, ndmin=1)
+    finally:
+        if f is not source:
+            f.close()
+
+def read_candles(source, skip_header=True):
+    """
+    Parse a candle CSV straight into typed NumPy columns with numpy's C parser.
+    source can be a filename, an open text file or a bytes buffer of CSV lines.
+    Returns {'open', 'close', 'volume', 'unix_timestamp', 'high', 'low'} -> 1-D arrays.
+    """
+    records = _loadtxt(source, usecols=(1, 2, 3, 4, 5, 6), dtype=CANDLE_DTYPE, skip_header=skip_header)
+    return {name: np.ascontiguousarray(records[name]) for name in CANDLE_COLUMNS}
+
+def read_timestamps(source, skip_header=True):
+    """Parse only the unix_timestamp column of a candle CSV as int64"""
+    return _loadtxt(source, usecols=(UNIX_TIMESTAMP_INDEX,), dtype=np.int64, skip_header=skip_header)
+
+def iter_line_blocks(filename, block_bytes=READ_BLOCK_BYTES):
+    """
+    Consecutive byte blocks of about block_bytes of a candle CSV's data lines
+    (header skipped), each cut after a newline so no row is split.
+    """
+    with open(filename, 'rb') as f:
+        f.readline()
+        rest = b''
+        while True:
+            data = f.read(block_bytes)
+            if not data:
+                break
+            data = rest + data
+            cut = data.rfind(b'\n') + 1
+            rest = data[cut:]
+            if cut:
+                yield data[:cut]
+        if rest.strip():
+            yield rest
+
+def iter_timestamp_blocks(filename, block_bytes=READ_BLOCK_BYTES):
+    """
+    unix_timestamp arrays for consecutive blocks of about block_bytes of a
+    candle CSV, so a file of any size is scanned in constant memory.
+    """
+    for data in iter_line_blocks(filename, block_bytes):
+        yield read_timestamps(data, skip_header=False)
+
+def iter_candle_blocks(filename, block_bytes=READ_BLOCK_BYTES):
+    """Typed columns (as read_candles returns) for consecutive blocks of about block_bytes"""
+    for data in iter_line_blocks(filename, block_bytes):
+        yield read_candles(data, skip_header=False)
+
+def read_lines(filename):
+    """
+    Return (header_line, data_lines) as raw bytes without line terminators.
+    Rows are in file order and line up with the arrays from read_candles,
+    so tools can select or reorder rows without re-formatting any values.
+    """
+    with open(filename, 'rb') as f:
+        lines = [line for line in f.read().splitlines() if line]
+    if not lines:
+        return b'', []
+    return lines[0], lines[1:]
+
+def read_rows(filename):
+    """Raw data lines plus their parsed unix timestamps, checked to line up"""
+    _, lines = read_lines(filename)
+    timestamps = read_timestamps(filename)
+    if len(lines) != len(timestamps):
+        raise ValueError(f"{filename}: {len(lines)} lines but {len(timestamps)} parsed rows")
+    return lines, timestamps
+
+def tail_offset(filename, unix_ts, block_size=65536):
+    """
+    Byte offset of the first data line with unix_timestamp >= unix_ts in a
+    sorted candle CSV (the file size if there is none). The file is read
+    backwards from the end, so finding a recent cut point touches only the tail.
+    """
+    with open(filename, 'rb') as f:
+        header_end = len(f.readline())
+        size = f.seek(0, 2)
+        pos = size
+        buffer = b''
+        while True:
+            read_from = max(pos - block_size, header_end)
+            f.seek(read_from)
+            buffer = f.read(pos - read_from) + buffer
+            pos = read_from
+            block_size *= 2
+            # The first line of the buffer may be partial unless we reached the header
+            start = 0 if pos == header_end else buffer.find(b'\n') + 1
+            if pos > header_end and start == 0:
+                continue
+            entries = []
+            offset = start
+            for line in buffer[start:].split(b'\n'):
+                if line.strip():
+                    entries.append((offset, int(line.split(b',')[UNIX_TIMESTAMP_INDEX])))
+                offset += len(line) + 1
+            if pos == header_end or (entries and entries[0][1] < unix_ts):
+                break
+    for offset, ts in entries:
+        if ts >= unix_ts:
+            return pos + offset
+    return size
+
+def write_lines(filename, lines, chunk_rows=65536, lineterminator=b'\r\n'):
+    """
+    Write the standard header followed by raw data lines in large chunks.
+    The default terminator matches what csv.writer / csv.DictWriter produce.
+    """
+    with open(filename, 'wb') as f:
+        f.write(','.join(CANDLE_FIELDS).encode('ascii') + lineterminator)
+        for start in range(0, len(lines), chunk_rows):
+            f.write(lineterminator.join(lines[start:start + chunk_rows]) + lineterminator)
+    return len(lines)
+
+def merge_rows(*sources):
+    """
+    Merge (lines, timestamps) pairs sorted by unix_timestamp.
+    Earlier sources win on duplicate timestamps, like a stable sort followed by
+    keep-first deduplication. Returns (lines, duplicates_removed).
+    """
+    lines = [line for source_lines, _ in sources for line in source_lines]
+    timestamps = np.concatenate([np.asarray(ts, dtype=np.int64) for _, ts in sources]) if sources else np.empty(0, np.int64)
+    order = np.argsort(timestamps, kind='stable')
+    sorted_timestamps = timestamps[order]
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = sorted_timestamps[1:] != sorted_timestamps[:-1]
+    selected = order[keep]
+    return [lines[i] for i in selected.tolist()], int(len(order) - len(selected))
+
+def _seconds_of_day_table():
+    """(86400, 8) uint8 table of 'HH:MM:SS' for every second of a day, built once"""
+    global _time_of_day_table
+    if _time_of_day_table is None:
+        text = ''.join(f'{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}' for s in range(86400))
+        _time_of_day_table = np.frombuffer(text.encode('ascii'), dtype=np.uint8).reshape(86400, 8)
+    return _time_of_day_table
+
+def format_timestamp_bytes(unix_timestamps):
+    """
+    '%Y-%m-%d %H:%M:%S' (UTC) text of unix seconds as an (n, TIMESTAMP_TEXT_BYTES) uint8 array.
+    Dates are formatted once per distinct day and times come from a lookup table.
+    """
+    unix = np.asarray(unix_timestamps, dtype=np.int64)
+    days, seconds = np.divmod(unix, 86400)
+    unique_days, inverse = np.unique(days, return_inverse=True)
+    day_text = ''.join(f'{EPOCH_DATE + timedelta(days=int(day))} ' for day in unique_days.tolist())
+    day_table = np.frombuffer(day_text.encode('ascii'), dtype=np.uint8).reshape(-1, 11)
+
+    out = np.empty((len(unix), TIMESTAMP_TEXT_BYTES), dtype=np.uint8)
+    out[:, :11] = day_table[inverse.reshape(-1)]
+    out[:, 11:] = _seconds_of_day_table()[seconds]
+    return out
+
+def format_timestamps(unix_timestamps):
+    """Format unix seconds as '%Y-%m-%d %H:%M:%S' (UTC) without a strftime per row"""
+    text = format_timestamp_bytes(unix_timestamps)
+    return text.view(f'S{TIMESTAMP_TEXT_BYTES}').reshape(-1).astype(f'U{TIMESTAMP_TEXT_BYTES}').tolist()
+
+def _as_list(column):
+    return column.tolist() if isinstance(column, np.ndarray) else column
+
+def format_candle_lines(columns, lineterminator='\r\n'):
+    """
+    Render a columnar chunk as CSV text in the standard field order.
+    Values are written with str(), exactly like csv.DictWriter, so Python ints
+    stay ints and floats keep their shortest round-trip repr.
+    """
+    unix = columns['unix_timestamp']
+    if not len(unix):
+        return ''
+    fields = [format_timestamps(unix)]
+    for name in CANDLE_FIELDS[1:]:
+        fields.append(map(str, _as_list(columns[name])))
+    return lineterminator.join(map(','.join, zip(*fields))) + lineterminator
+
+def write_candles(filename, chunks, lineterminator='\r\n', chunk_rows=WRITE_CHUNK_ROWS):
+    """
+    Write the standard header followed by columnar candle chunks.
+    chunks is an iterable of {'unix_timestamp', 'open', 'close', 'volume', 'high', 'low'}
+    sequences (lists or arrays) already in output order. Returns the row count.
+    """
+    total_rows = 0
+    with open(filename, 'w', newline='') as f:
+        f.write(','.join(CANDLE_FIELDS) + lineterminator)
+        for columns in chunks:
+            rows = len(columns['unix_timestamp'])
+            for start in range(0, rows, chunk_rows):
+                part = {name: columns[name][start:start + chunk_rows] for name in CANDLE_COLUMNS}
+                f.write(format_candle_lines(part, lineterminator))
+            total_rows += rows
+    return total_rows
+
+def columns_from_coinbase_rows(candles):
+    """Split [time, low, high, open, close, volume] rows into writer columns"""
+    if not candles:
+        return {name: [] for name in CANDLE_COLUMNS}
+    times, lows, highs, opens, closes, volumes = map(list, zip(*candles))
+    return {
+        'open': opens,
+        'close': closes,
+        'volume': volumes,
+        'unix_timestamp': times,
+        'high': highs,
+        'low': lows,
+    }
@@ -0,0 +1,102 @@
+import io
+import numpy as np
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow IPC responses are unavailable without pyarrow
+    pa = None
+
+try:
+    import msgpack
+except ImportError:  # MessagePack responses are unavailable without msgpack
+    msgpack = None
+
+# Response formats in order of preference when the client accepts anything
+JSON_MIMETYPE = 'application/json'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+MSGPACK_MIMETYPE = 'application/msgpack'
+
+FORMAT_ALIASES = {
+    'json': JSON_MIMETYPE,
+    'arrow': ARROW_MIMETYPE,
+    'msgpack': MSGPACK_MIMETYPE,
+    'application/x-msgpack': MSGPACK_MIMETYPE,
+}
+
+# Column layout shared by every binary payload
+COLUMN_DTYPES = {
+    'unix_timestamp': np.int64,
+    'open': np.float64,
+    'high': np.float64,
+    'low': np.float64,
+    'close': np.float64,
+    'volume': np.float64,
+}
+
+def available_mimetypes():
+    """Mimetypes this process can actually produce"""
+    mimetypes = [JSON_MIMETYPE]
+    if pa is not None:
+        mimetypes.append(ARROW_MIMETYPE)
+    if msgpack is not None:
+        mimetypes.append(MSGPACK_MIMETYPE)
+    return mimetypes
+
+def negotiate(accept_mimetypes, format_param=None):
+    """
+    Pick the response mimetype from an explicit ?format= or the Accept header.
+    An Accept header that matches nothing we produce (e.g. a browser's
+    text/html) falls back to JSON, as before negotiation existed; None is
+    returned only for an explicit ?format= we cannot produce.
+    """
+    available = available_mimetypes()
+    if format_param:
+        mimetype = FORMAT_ALIASES.get(format_param, format_param)
+        return mimetype if mimetype in available else None
+    if not accept_mimetypes:
+        return JSON_MIMETYPE
+    return accept_mimetypes.best_match(available) or JSON_MIMETYPE
+
+def rows_to_columns(rows):
+    """Turn (unix_timestamp, open, high, low, close, volume) rows into typed arrays"""
+    columns = {}
+    values = list(zip(*rows)) if rows else [()] * len(COLUMN_DTYPES)
+    for (name, dtype), column in zip(COLUMN_DTYPES.items(), values):
+        columns[name] = np.fromiter(column, dtype=dtype, count=len(column))
+    return columns
+
+def encode_arrow(columns):
+    """Serialize columns as a single-batch Arrow IPC stream"""
+    batch = pa.record_batch([pa.array(array) for array in columns.values()], names=list(columns))
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue()
+
+def encode_msgpack(columns):
+    """
+    Serialize columns as a MessagePack map of raw little-endian buffers.
+    Each column is {'dtype': '<i8' | '<f8', 'data': bytes} so numpy clients can
+    load it with np.frombuffer without touching individual values.
+    """
+    payload = {
+        'count': len(columns['unix_timestamp']),
+        'columns': {
+            name: {'dtype': array.dtype.newbyteorder('<').str, 'data': array.astype(array.dtype.newbyteorder('<'), copy=False).tobytes()}
+            for name, array in columns.items()
+        }
+    }
+    return msgpack.packb(payload, use_bin_type=True)
+
+def decode_msgpack(payload):
+    """Inverse of encode_msgpack, mainly for Python consumers"""
+    unpacked = msgpack.unpackb(payload, raw=False)
+    return {name: np.frombuffer(column['data'], dtype=column['dtype'])
+            for name, column in unpacked['columns'].items()}
+
+def encode_columns(columns, mimetype):
+    if mimetype == ARROW_MIMETYPE:
+        return encode_arrow(columns)
+    if mimetype == MSGPACK_MIMETYPE:
+        return encode_msgpack(columns)
+    raise ValueError(f"Unsupported binary format: {mimetype}")
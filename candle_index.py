@@ -0,0 +1,213 @@
+import bisect
+import json
+import os
+import sys
+import numpy as np
+from candle_csv import iter_candle_blocks, read_candles, read_timestamps
+from data_layout import shard_range
+
+# Sidecar index written next to a candle CSV (<file>.csv.idx).
+# It maps the start of every day (or hour, for per-day 1sec files) to the byte
+# offset and row number of its first candle, so a reader can seek straight to a
+# time range instead of parsing the file from the top. The CSV itself is
+# untouched; the index records the file's size and mtime. Writers build it
+# (write_index) after producing or rewriting a file; readers never write it and
+# fall back to streaming the file in blocks when it is missing or stale.
+INDEX_EXTENSION = '.idx'
+INDEX_VERSION = 1
+DAY_SECONDS = 86400
+HOUR_SECONDS = 3600
+DEFAULT_CHUNK_ROWS = 65536
+CANDLE_ROW_BYTES = 72  # Rough size of one 1m candle line, to turn chunk_rows into a read size
+
+def index_path(csv_path):
+    return csv_path + INDEX_EXTENSION
+
+def default_granularity(csv_path):
+    """Hourly entries for files covering a single day, daily entries otherwise"""
+    covered = shard_range(csv_path)
+    if covered is not None and covered[1] - covered[0] <= DAY_SECONDS:
+        return HOUR_SECONDS
+    return DAY_SECONDS
+
+def _data_line_offsets(data):
+    """Byte offset of every non-empty line after the header, plus the header length"""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if not len(raw):
+        return np.empty(0, dtype=np.int64), 0
+    newlines = np.flatnonzero(raw == ord('\n'))
+    starts = np.concatenate([[0], newlines + 1])
+    ends = np.concatenate([newlines, [len(raw)]])
+    # Blank lines (including the '\r' of an empty CRLF line) are skipped, like np.loadtxt does
+    lengths = ends - starts
+    blank = (lengths == 0) | ((lengths == 1) & (raw[np.minimum(starts, len(raw) - 1)] == ord('\r')))
+    starts = starts[~blank]
+    if not len(starts):
+        return np.empty(0, dtype=np.int64), len(raw)
+    header_end = int(starts[1]) if len(starts) > 1 else len(raw)
+    return starts[1:].astype(np.int64), header_end
+
+def build_index(csv_path, granularity=None):
+    """Scan a candle CSV once and return its index as a dict"""
+    granularity = granularity or default_granularity(csv_path)
+    stat = os.stat(csv_path)
+    with open(csv_path, 'rb') as f:
+        data = f.read()
+    offsets, header_end = _data_line_offsets(data)
+    timestamps = read_timestamps(data)
+    if len(offsets) != len(timestamps):
+        raise ValueError(f"{csv_path}: {len(offsets)} lines but {len(timestamps)} parsed rows")
+
+    buckets = timestamps // granularity * granularity
+    sorted_rows = bool(np.all(np.diff(timestamps) >= 0))
+    entries = []
+    if sorted_rows and len(buckets):
+        first_rows = np.concatenate([[0], np.flatnonzero(np.diff(buckets)) + 1])
+        entries = [[int(buckets[row]), int(offsets[row]), int(row)] for row in first_rows.tolist()]
+
+    return {
+        'version': INDEX_VERSION,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'granularity': granularity,
+        'rows': int(len(timestamps)),
+        'data_offset': header_end,
+        'sorted': sorted_rows,
+        'first_timestamp': int(timestamps[0]) if len(timestamps) else None,
+        'last_timestamp': int(timestamps[-1]) if len(timestamps) else None,
+        'entries': entries,
+    }
+
+def write_index(csv_path, granularity=None):
+    index = build_index(csv_path, granularity)
+    with open(index_path(csv_path), 'w') as f:
+        json.dump(index, f, separators=(',', ':'))
+    return index
+
+def load_index(csv_path):
+    """The sidecar index, or None when it is missing or stale"""
+    try:
+        with open(index_path(csv_path), 'r') as f:
+            index = json.load(f)
+        stat = os.stat(csv_path)
+    except (OSError, ValueError):
+        return None
+    if (index.get('version') != INDEX_VERSION
+            or index.get('size') != stat.st_size
+            or index.get('mtime_ns') != stat.st_mtime_ns):
+        return None
+    return index
+
+def refresh_index(csv_path):
+    """Rebuild the sidecar index if it is missing or stale (for writers)"""
+    return load_index(csv_path) or write_index(csv_path)
+
+def byte_range(index, start_ts, end_ts):
+    """
+    [offset, end_offset) of the bytes holding every candle in [start_ts, end_ts).
+    The range is bucket-aligned, so it may include a few candles either side.
+    """
+    entries = index['entries']
+    if not entries:
+        return index['data_offset'], index['size']
+    bucket_starts = [entry[0] for entry in entries]
+    first = max(bisect.bisect_right(bucket_starts, start_ts) - 1, 0)
+    last = bisect.bisect_left(bucket_starts, end_ts)
+    end_offset = entries[last][1] if last < len(entries) else index['size']
+    return entries[first][1], end_offset
+
+def read_range(csv_path, start_ts, end_ts):
+    """
+    Typed columns (as read_candles returns) for candles in [start_ts, end_ts),
+    read with one seek and one bounded read via the sidecar index, or
+    streamed in blocks when there is no usable index.
+    """
+    index = load_index(csv_path)
+    if index is None:
+        chunks = list(_scan_range(csv_path, start_ts, end_ts, DEFAULT_CHUNK_ROWS))
+        if not chunks:
+            return read_candles(b'', skip_header=False)
+        if len(chunks) == 1:
+            return chunks[0]
+        return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+    if not index['sorted']:
+        return _filter_range(read_candles(csv_path), start_ts, end_ts)
+    offset, end_offset = byte_range(index, start_ts, end_ts)
+    with open(csv_path, 'rb') as f:
+        f.seek(offset)
+        chunk = f.read(max(end_offset - offset, 0))
+    return _filter_range(read_candles(chunk, skip_header=False), start_ts, end_ts)
+
+def _filter_range(columns, start_ts, end_ts):
+    unix = columns['unix_timestamp']
+    mask = (unix >= start_ts) & (unix < end_ts)
+    if mask.all():
+        return columns
+    return {name: values[mask] for name, values in columns.items()}
+
+def _scan_range(csv_path, start_ts, end_ts, chunk_rows):
+    """Stream the whole file in blocks of about chunk_rows rows, keeping candles in range"""
+    for columns in iter_candle_blocks(csv_path, chunk_rows * CANDLE_ROW_BYTES):
+        columns = _filter_range(columns, start_ts, end_ts)
+        if len(columns['unix_timestamp']):
+            yield columns
+
+def iter_range(csv_path, start_ts, end_ts, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Yield typed column chunks for candles in [start_ts, end_ts), reading about
+    chunk_rows rows per read so memory stays bounded for long ranges.
+    Chunks never split an index bucket, so one may exceed chunk_rows slightly.
+    Without a fresh index the whole file is streamed in blocks of about
+    chunk_rows rows and filtered; no index is written. A file the index marks
+    as unsorted is parsed whole and returned as one chunk.
+    """
+    index = load_index(csv_path)
+    if index is None:
+        yield from _scan_range(csv_path, start_ts, end_ts, chunk_rows)
+        return
+    if not index['sorted']:
+        columns = _filter_range(read_candles(csv_path), start_ts, end_ts)
+        if len(columns['unix_timestamp']):
+            yield columns
+        return
+
+    offset, end_offset = byte_range(index, start_ts, end_ts)
+    if end_offset <= offset:
+        return
+    # Cut points on bucket boundaries between offset and end_offset, every ~chunk_rows rows
+    cuts = [offset]
+    last_row = None
+    for _, entry_offset, row in index['entries']:
+        if entry_offset <= offset:
+            last_row = row
+            continue
+        if entry_offset >= end_offset:
+            break
+        if last_row is not None and row - last_row >= chunk_rows:
+            cuts.append(entry_offset)
+            last_row = row
+    cuts.append(end_offset)
+
+    with open(csv_path, 'rb') as f:
+        f.seek(offset)
+        for chunk_start, chunk_end in zip(cuts[:-1], cuts[1:]):
+            columns = _filter_range(read_candles(f.read(chunk_end - chunk_start), skip_header=False), start_ts, end_ts)
+            if len(columns['unix_timestamp']):
+                yield columns
+
+def read_day(csv_path, day_start_ts):
+    return read_range(csv_path, day_start_ts, day_start_ts + DAY_SECONDS)
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python candle_index.py <csv_file> [csv_file ...]")
+        print("Example: python candle_index.py data/btc/BTCUSD_1m_candles_2021.csv")
+        sys.exit(1)
+
+    for csv_path in sys.argv[1:]:
+        index = write_index(csv_path)
+        state = "" if index['sorted'] else " (rows not sorted - readers fall back to a full scan)"
+        print(f"🗂️  {index_path(csv_path)}: {len(index['entries']):,} entries for {index['rows']:,} candles{state}")
+
+if __name__ == "__main__":
+    main()
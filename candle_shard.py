@@ -0,0 +1,187 @@
+import os
+import struct
+import sys
+import numpy as np
+from candle_csv import read_candles
+
+# Compact binary shard for dense fixed-step series.
+# Timestamps are implicit (start_ts + i * step) and prices/volumes are stored
+# as fixed-point integers, so a 1-minute year shrinks to a handful of int arrays.
+#
+# Layout (little-endian):
+#   header   : magic, version, flags, price_decimals, volume_decimals,
+#              start_ts, step, count, one width byte per stored column, padding
+#   columns  : open, high, low, close, volume as int32/int64 fixed-point arrays
+#   bitmap   : optional packed bits marking synthetic forward-filled candles
+MAGIC = b'CNDL'
+VERSION = 1
+FLAG_SYNTHETIC_BITMAP = 0x01
+HEADER = struct.Struct('<4sBBBBqqq5s3x')
+SHARD_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+PRICE_COLUMNS = ['open', 'high', 'low', 'close']
+
+# Largest number of decimals tried when choosing a lossless fixed-point scale
+MAX_PRICE_DECIMALS = 8
+MAX_VOLUME_DECIMALS = 10
+
+# Scale used with --round for series carrying float noise (e.g. 32138.010000000002)
+ROUND_DECIMALS = 8
+
+SHARD_EXTENSION = '.cndl'
+
+def fixed_point_decimals(arrays, max_decimals, label):
+    """Smallest decimal scale at which every value round-trips exactly through int64"""
+    values = np.concatenate([np.asarray(array, dtype=np.float64) for array in arrays])
+    for decimals in range(max_decimals + 1):
+        scale = 10.0 ** decimals
+        scaled = np.round(values * scale)
+        if np.abs(scaled).max(initial=0) >= 2**62:
+            break
+        if np.array_equal(scaled / scale, values):
+            return decimals
+    raise ValueError(f"{label} values need more than {max_decimals} decimals to be stored losslessly")
+
+def _to_int(values, decimals):
+    scaled = np.round(np.asarray(values, dtype=np.float64) * 10.0 ** decimals).astype(np.int64)
+    if len(scaled) and scaled.min() >= -2**31 and scaled.max() < 2**31:
+        return scaled.astype('<i4')
+    return scaled.astype('<i8')
+
+def detect_synthetic(columns):
+    """
+    Forward-filled candles: zero volume with prices copied from the previous candle.
+    This is what fill_missing_candles and the corruption fixers write.
+    """
+    volume = np.asarray(columns['volume'])
+    synthetic = volume == 0
+    same = np.ones(len(volume), dtype=bool)
+    for name in PRICE_COLUMNS:
+        prices = np.asarray(columns[name])
+        same[1:] &= prices[1:] == prices[:-1]
+    same[0] = False
+    return synthetic & same
+
+def encode_shard(columns, step=None, synthetic=None, price_decimals=None, volume_decimals=None):
+    """
+    Encode dense candle columns as shard bytes.
+    Decimals default to the smallest lossless scale and ValueError is raised when
+    none exists; passing them explicitly rounds values to that many decimals.
+    Gaps in the series also raise ValueError.
+    """
+    unix = np.asarray(columns['unix_timestamp'], dtype=np.int64)
+    count = len(unix)
+    if step is None:
+        if count < 2:
+            raise ValueError("step is required for shards with fewer than two candles")
+        step = int(unix[1] - unix[0])
+    if step <= 0:
+        raise ValueError(f"step must be positive, got {step}")
+    start_ts = int(unix[0]) if count else 0
+    if count and not np.array_equal(unix, start_ts + step * np.arange(count, dtype=np.int64)):
+        raise ValueError(f"timestamps are not a continuous {step}s series; fill gaps before writing a shard")
+
+    if price_decimals is None:
+        price_decimals = fixed_point_decimals([columns[name] for name in PRICE_COLUMNS], MAX_PRICE_DECIMALS, 'price')
+    if volume_decimals is None:
+        volume_decimals = fixed_point_decimals([columns['volume']], MAX_VOLUME_DECIMALS, 'volume')
+
+    encoded = []
+    for name in SHARD_COLUMNS:
+        decimals = volume_decimals if name == 'volume' else price_decimals
+        encoded.append(_to_int(columns[name], decimals))
+    widths = bytes(array.dtype.itemsize for array in encoded)
+
+    if synthetic is None:
+        synthetic = detect_synthetic(columns)
+    synthetic = np.asarray(synthetic, dtype=bool)
+    flags = FLAG_SYNTHETIC_BITMAP if synthetic.any() else 0
+
+    parts = [HEADER.pack(MAGIC, VERSION, flags, price_decimals, volume_decimals, start_ts, step, count, widths)]
+    parts += [array.tobytes() for array in encoded]
+    if flags & FLAG_SYNTHETIC_BITMAP:
+        parts.append(np.packbits(synthetic, bitorder='little').tobytes())
+    return b''.join(parts)
+
+def read_header(buffer):
+    magic, version, flags, price_decimals, volume_decimals, start_ts, step, count, widths = HEADER.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ValueError("not a candle shard (bad magic)")
+    if version != VERSION:
+        raise ValueError(f"unsupported candle shard version {version}")
+    return {
+        'flags': flags,
+        'price_decimals': price_decimals,
+        'volume_decimals': volume_decimals,
+        'start_ts': start_ts,
+        'step': step,
+        'count': count,
+        'widths': list(widths),
+    }
+
+def decode_shard(buffer, with_synthetic=True):
+    """Decode shard bytes back into the same typed columns read_candles returns"""
+    header = read_header(buffer)
+    count = header['count']
+    offset = HEADER.size
+    columns = {'unix_timestamp': header['start_ts'] + header['step'] * np.arange(count, dtype=np.int64)}
+    for name, width in zip(SHARD_COLUMNS, header['widths']):
+        decimals = header['volume_decimals'] if name == 'volume' else header['price_decimals']
+        raw = np.frombuffer(buffer, dtype=f'<i{width}', count=count, offset=offset)
+        columns[name] = raw / 10.0 ** decimals
+        offset += width * count
+    if with_synthetic:
+        if header['flags'] & FLAG_SYNTHETIC_BITMAP:
+            bits = np.frombuffer(buffer, dtype=np.uint8, count=(count + 7) // 8, offset=offset)
+            columns['synthetic'] = np.unpackbits(bits, count=count, bitorder='little').astype(bool)
+        else:
+            columns['synthetic'] = np.zeros(count, dtype=bool)
+    return columns
+
+def write_shard(filename, columns, step=None, synthetic=None, price_decimals=None, volume_decimals=None):
+    data = encode_shard(columns, step=step, synthetic=synthetic,
+                        price_decimals=price_decimals, volume_decimals=volume_decimals)
+    with open(filename, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+def read_shard(filename, with_synthetic=True):
+    with open(filename, 'rb') as f:
+        return decode_shard(f.read(), with_synthetic=with_synthetic)
+
+def shard_path(csv_path):
+    return os.path.splitext(csv_path)[0] + SHARD_EXTENSION
+
+def convert_csv(csv_path, output_path=None, step=None, decimals=None):
+    """Convert a dense candle CSV into a shard next to it"""
+    output_path = output_path or shard_path(csv_path)
+    size = write_shard(output_path, read_candles(csv_path), step=step,
+                       price_decimals=decimals, volume_decimals=decimals)
+    return output_path, size
+
+def main():
+    args = sys.argv[1:]
+    decimals = None
+    if args and args[0] == '--round':
+        decimals = ROUND_DECIMALS
+        args = args[1:]
+    if not args:
+        print("Usage: python candle_shard.py [--round] <csv_file> [csv_file ...]")
+        print("Example: python candle_shard.py data/btc/BTCUSD_1m_candles_2021.csv")
+        print(f"  --round  store values rounded to {ROUND_DECIMALS} decimals instead of requiring an exact fit")
+        sys.exit(1)
+
+    failed = 0
+    for csv_path in args:
+        try:
+            output_path, size = convert_csv(csv_path, decimals=decimals)
+        except (ValueError, FileNotFoundError) as e:
+            print(f"❌ {csv_path}: {e}")
+            failed += 1
+            continue
+        csv_size = os.path.getsize(csv_path)
+        print(f"💾 {output_path}: {size:,} bytes ({csv_size / size:.1f}x smaller than CSV)")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
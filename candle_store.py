@@ -0,0 +1,108 @@
+import sys
+from datetime import datetime, timezone
+import numpy as np
+from candle_csv import CANDLE_COLUMNS, CANDLE_DTYPE
+from candle_index import DEFAULT_CHUNK_ROWS, iter_range
+from data_layout import INTERVAL_SECONDS, list_shards
+from rolling_stats import join_stats, load_stats, stat_columns
+
+# Unbounded range ends used when start/end are omitted
+MIN_TIMESTAMP = 0
+MAX_TIMESTAMP = 2**62
+
+def to_unix(value, default):
+    """
+    Unix seconds from an int, a datetime (naive means UTC) or an ISO-like string
+    such as '2017', '2017-03', '2017-03-15' or '2017-03-15 12:00:00'.
+    """
+    if value is None:
+        return default
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, str):
+        text = value.strip()
+        if len(text) == 4:
+            text += '-01-01'
+        elif len(text) == 7:
+            text += '-01'
+        value = datetime.fromisoformat(text)
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+    raise TypeError(f"unsupported time value: {value!r}")
+
+def resolve_shards(symbol, interval, start_ts, end_ts):
+    """Shard files of one interval overlapping [start_ts, end_ts), in time order"""
+    if interval not in INTERVAL_SECONDS:
+        raise ValueError(f"unknown interval {interval!r}, expected one of {list(INTERVAL_SECONDS)}")
+    return [path for shard_start, shard_end, path in list_shards(symbol, interval)
+            if shard_start is None or (shard_start < end_ts and shard_end > start_ts)]
+
+def load_candles(symbol, interval, start=None, end=None, chunk_rows=DEFAULT_CHUNK_ROWS, stats=False):
+    """
+    Lazily yield typed candle chunks for symbol/interval in [start, end).
+    Shards are resolved across the yearly 1m files, per-day 1s files and the
+    aggregated folders; each is read through its sidecar index so only the
+    byte ranges covering the request are parsed. Memory is bounded by
+    chunk_rows, not by the length of the range. Reading never writes an index;
+    shards without a fresh one (see candle_index.py) are parsed whole. With stats=True each chunk also
+    carries the materialized rolling statistics (see rolling_stats.py).
+
+    Example: for chunk in load_candles('BTCUSD', '1m', '2017-03', '2019-06'): ...
+    """
+    start_ts = to_unix(start, MIN_TIMESTAMP)
+    end_ts = to_unix(end, MAX_TIMESTAMP)
+    if end_ts <= start_ts:
+        return
+    for path in resolve_shards(symbol, interval, start_ts, end_ts):
+        if not stats:
+            yield from iter_range(path, start_ts, end_ts, chunk_rows)
+            continue
+        shard_stats = load_stats(path)
+        if shard_stats is None:
+            raise ValueError(f"{path}: rolling stats missing or stale, run: python rolling_stats.py {symbol} {interval}")
+        for columns in iter_range(path, start_ts, end_ts, chunk_rows):
+            yield join_stats(columns, shard_stats)
+
+def empty_columns(stats=False):
+    """Typed zero-length columns, as load_range returns for an empty range"""
+    columns = {name: np.empty(0, dtype=CANDLE_DTYPE[name]) for name in CANDLE_COLUMNS}
+    if stats:
+        columns.update({name: np.empty(0) for name in stat_columns()})
+    return columns
+
+def load_range(symbol, interval, start=None, end=None, stats=False):
+    """load_candles concatenated into one set of columns (for ranges that fit in memory)"""
+    chunks = list(load_candles(symbol, interval, start, end, stats=stats))
+    if not chunks:
+        return empty_columns(stats)
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: python candle_store.py <symbol> <interval> [start] [end]")
+        print("Example: python candle_store.py BTCUSD 1m 2017-03 2019-06")
+        sys.exit(1)
+
+    symbol, interval = sys.argv[1], sys.argv[2]
+    start = sys.argv[3] if len(sys.argv) > 3 else None
+    end = sys.argv[4] if len(sys.argv) > 4 else None
+
+    total = 0
+    first = last = None
+    for chunk in load_candles(symbol, interval, start, end):
+        unix = chunk['unix_timestamp']
+        total += len(unix)
+        first = int(unix[0]) if first is None else first
+        last = int(unix[-1])
+
+    if not total:
+        print(f"⚠️  No {symbol} {interval} candles in range")
+        return
+    first_time = datetime.fromtimestamp(first, timezone.utc)
+    last_time = datetime.fromtimestamp(last, timezone.utc)
+    print(f"📊 {symbol} {interval}: {total:,} candles | {first_time} → {last_time}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from candle_checks import ContinuityChecker
+from candle_csv import iter_timestamp_blocks
+from data_layout import INTERVAL_SECONDS, list_shards
+
+# Whole-history continuity check that streams every shard of an interval in
+# blocks and carries only the last timestamp across files, so it runs in
+# constant memory over the 1-minute years and the 1-second day files alike.
+SYMBOL = 'BTCUSD'
+
+def _utc(unix_ts):
+    return datetime.fromtimestamp(unix_ts, timezone.utc).replace(tzinfo=None)
+
+def _gap(previous, current, step):
+    return timedelta(seconds=current - previous - step)
+
+def check_continuity(symbol=SYMBOL, interval='1m'):
+    """Stream every shard of symbol/interval in time order; returns the checker"""
+    step = INTERVAL_SECONDS[interval]
+    checker = ContinuityChecker(step)
+    for shard_start, _, path in list_shards(symbol, interval):
+        checker.start_shard(shard_start)
+        for unix in iter_timestamp_blocks(path):
+            checker.feed(unix)
+    return checker
+
+def main():
+    interval = sys.argv[1] if len(sys.argv) > 1 else '1m'
+    if interval not in INTERVAL_SECONDS:
+        print("Usage: python continuity_check.py [1m|1s|5m|...]")
+        sys.exit(1)
+
+    print(f"🔍 Streaming continuity check: {SYMBOL} {interval}")
+    started = time.time()
+    checker = check_continuity(SYMBOL, interval)
+    if not checker.rows:
+        print(f"❌ No {interval} candles found")
+        sys.exit(1)
+
+    step = checker.step
+    for previous, current in checker.acceptable_examples:
+        print(f"⚠️  Acceptable boundary gap: {_utc(previous)} → {_utc(current)} ({_gap(previous, current, step)})")
+    for previous, current in checker.problem_examples:
+        print(f"❌ Gap at {_utc(previous)} → {_utc(current)} ({_gap(previous, current, step)})")
+
+    print(f"📊 {checker.rows:,} candles | {_utc(checker.first)} → {_utc(checker.last)} in {time.time() - started:.1f}s")
+    if checker.acceptable:
+        print(f"⚠️  {checker.acceptable} acceptable boundary gaps")
+    if checker.problems:
+        print(f"❌ Found {checker.problems} problematic gaps in continuity")
+        sys.exit(1)
+    print("✅ Continuous across all files")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import glob
+import os
+import re
+from datetime import datetime, timezone
+from candle_csv import UNIX_TIMESTAMP_INDEX
+
+# Root of the candle tree
+DATA_DIR = 'data'
+
+# Candle widths in seconds, keyed by the interval label used in filenames
+INTERVAL_SECONDS = {
+    '1s': 1,
+    '1m': 60,
+    '5m': 300,
+    '30m': 1800,
+    '1h': 3600,
+    '1d': 86400,
+    '1w': 604800,
+}
+
+# Sub-folders of data/<asset>/ holding each interval (1m years sit in the asset folder itself)
+INTERVAL_FOLDERS = {
+    '1s': '1sec',
+    '1m': '',
+    '5m': '5min',
+    '30m': '30min',
+    '1h': 'hourly',
+    '1d': 'daily',
+    '1w': 'weekly',
+}
+
+_SHARD_PATTERN = re.compile(r'_candles_(\d{4})(?:-(\d{2})-(\d{2}))?\.csv$')
+
+def asset_dir(symbol):
+    """data/btc for BTCUSD, data/eth for ETHUSD"""
+    return os.path.join(DATA_DIR, symbol[:-3].lower())
+
+def interval_dir(symbol, interval):
+    return os.path.join(asset_dir(symbol), INTERVAL_FOLDERS[interval])
+
+def yearly_path(symbol, interval, year):
+    return os.path.join(interval_dir(symbol, interval), f'{symbol}_{interval}_candles_{year}.csv')
+
+def daily_path(symbol, interval, day_str):
+    return os.path.join(interval_dir(symbol, interval), f'{symbol}_{interval}_candles_{day_str}.csv')
+
+def full_path(symbol, interval):
+    return os.path.join(interval_dir(symbol, interval), f'{symbol}_{interval}_candles_full.csv')
+
+def parquet_dir(symbol, interval, year):
+    """Hive-style partition directory: data/parquet/symbol=BTCUSD/interval=1m/year=2021"""
+    return os.path.join(DATA_DIR, 'parquet', f'symbol={symbol}', f'interval={interval}', f'year={year}')
+
+def year_start(year):
+    return int(datetime(year, 1, 1, tzinfo=timezone.utc).timestamp())
+
+def shard_range(path):
+    """
+    [start, end) unix range covered by a yearly or per-day shard, from its filename.
+    Returns None for files that are not time shards (e.g. *_full.csv).
+    """
+    match = _SHARD_PATTERN.search(os.path.basename(path))
+    if not match:
+        return None
+    year, month, day = match.groups()
+    if month is None:
+        return year_start(int(year)), year_start(int(year) + 1)
+    start = int(datetime(int(year), int(month), int(day), tzinfo=timezone.utc).timestamp())
+    return start, start + 86400
+
+def _line_year(line):
+    unix_ts = int(line.split(b',')[UNIX_TIMESTAMP_INDEX])
+    return datetime.fromtimestamp(unix_ts, timezone.utc).year
+
+def full_years(path, tail_bytes=4096):
+    """(first, last) calendar year in a _full file from its first and last rows, or None if it has no rows"""
+    with open(path, 'rb') as f:
+        f.readline()
+        first = f.readline().strip()
+        if not first:
+            return None
+        size = f.seek(0, 2)
+        f.seek(max(size - tail_bytes, 0))
+        last = f.read().strip().rsplit(b'\n', 1)[-1].strip()
+    return _line_year(first), _line_year(last)
+
+def time_shards(symbol, interval):
+    """Yearly and per-day files of one interval as (start, end, path) sorted by time, complete or not"""
+    shards = []
+    for path in glob.glob(os.path.join(interval_dir(symbol, interval), f'{symbol}_{interval}_candles_*.csv')):
+        covered = shard_range(path)
+        if covered is not None:
+            shards.append((covered[0], covered[1], path))
+    return sorted(shards, key=lambda shard: shard[0])
+
+def list_shards(symbol, interval):
+    """
+    Shards holding one interval, as (start, end, path) sorted by time.
+    Yearly and per-day files are preferred, but only when they cover every year
+    of the _full file; otherwise (no time shards, or a partial set such as a
+    single leftover year) the _full file is used, with an open-ended range.
+    """
+    shards = time_shards(symbol, interval)
+    full_file = full_path(symbol, interval)
+    if os.path.exists(full_file) and not _shards_cover(shards, full_file):
+        return [(None, None, full_file)]
+    return shards
+
+def _shards_cover(shards, full_file):
+    if not shards:
+        return False
+    years = full_years(full_file)
+    if years is None:
+        return True
+    shard_years = {datetime.fromtimestamp(start, timezone.utc).year for start, _, _ in shards}
+    return all(year in shard_years for year in range(years[0], years[1] + 1))
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import sys
+import numpy as np
+from candle_csv import read_timestamps
+from data_layout import DATA_DIR
+
+# Manifest of candle files under data/: size, mtime, sha256, row count,
+# first/last timestamp and the verdict of every validation run against each
+# file. Tools ask for a cached verdict first and only re-scan files whose
+# contents changed since it was recorded.
+MANIFEST_FILE = os.path.join(DATA_DIR, 'manifest.json')
+MANIFEST_VERSION = 1
+HASH_CHUNK_BYTES = 1 << 20
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _key(path):
+    return os.path.relpath(path).replace(os.sep, '/')
+
+class DatasetManifest:
+    """
+    JSON manifest keyed by file path (relative to the working directory).
+    A verdict is trusted while size and mtime are unchanged; if only the mtime
+    moved, the content hash decides whether the file really changed.
+    """
+
+    def __init__(self, path=MANIFEST_FILE):
+        self.path = path
+        self.files = {}
+        self.dirty = False
+        try:
+            with open(path, 'r') as f:
+                manifest = json.load(f)
+            if manifest.get('version') == MANIFEST_VERSION:
+                self.files = manifest.get('files', {})
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': MANIFEST_VERSION, 'files': self.files}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def flush(self):
+        """Save entries whose mtime was refreshed after a hash check"""
+        if self.dirty:
+            self.save()
+
+    def entry(self, path):
+        """The recorded entry if the file is unchanged since it was recorded, else None"""
+        entry = self.files.get(_key(path))
+        if entry is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if stat.st_size != entry['size']:
+            return None
+        if stat.st_mtime_ns != entry['mtime_ns']:
+            if file_sha256(path) != entry['sha256']:
+                return None
+            entry['mtime_ns'] = stat.st_mtime_ns
+            self.dirty = True
+        return entry
+
+    def cached_verdict(self, path, check):
+        """True/False from an earlier run of `check` on identical contents, or None"""
+        entry = self.entry(path)
+        if entry is None:
+            return None
+        return entry['verdicts'].get(check)
+
+    def record(self, path, check, verdict, timestamps=None, save=True):
+        """
+        Store the verdict of `check` for the file's current contents.
+        Stats are computed from `timestamps` when given, otherwise read from the file.
+        """
+        entry = self.entry(path)
+        if entry is None:
+            stat = os.stat(path)
+            if timestamps is None:
+                try:
+                    timestamps = read_timestamps(path)
+                except ValueError:
+                    timestamps = []
+            entry = {
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'sha256': file_sha256(path),
+                'rows': len(timestamps),
+                'first_timestamp': int(np.min(timestamps)) if len(timestamps) else None,
+                'last_timestamp': int(np.max(timestamps)) if len(timestamps) else None,
+                'verdicts': {},
+            }
+            self.files[_key(path)] = entry
+        entry['verdicts'][check] = bool(verdict)
+        if save:
+            self.save()
+        return entry
+
+    def forget(self, path, save=True):
+        if self.files.pop(_key(path), None) is not None and save:
+            self.save()
+
+def main():
+    manifest = DatasetManifest(sys.argv[1] if len(sys.argv) > 1 else MANIFEST_FILE)
+    if not manifest.files:
+        print(f"📭 {manifest.path}: no entries")
+        return
+    print(f"📒 {manifest.path}: {len(manifest.files)} files")
+    for key in sorted(manifest.files):
+        entry = manifest.files[key]
+        state = "unchanged" if manifest.entry(key) is not None else "CHANGED"
+        verdicts = ', '.join(f"{check}={'✅' if ok else '❌'}" for check, ok in sorted(entry['verdicts'].items()))
+        print(f"   {key}: {entry['rows']:,} rows, {state}, {verdicts}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime, timezone
+import numpy as np
+from candle_csv import read_rows
+from data_layout import shard_range
+
+# Per-day content hashes of a candle CSV, rolled up into a Merkle tree and
+# stored next to the file (<file>.csv.merkle). Leaves are the days covered by
+# the file in calendar order (empty days hash to the empty leaf), so two
+# versions of a yearly file have identically shaped trees and changed days are
+# found by descending only into differing subtrees. Rows dated outside the
+# file's span get extra leaves after the span, and their real days are stored
+# alongside (stray_days) so changes to them are reported on the right day.
+MERKLE_EXTENSION = '.merkle'
+MERKLE_VERSION = 2
+DAY_SECONDS = 86400
+
+def _leaf_hash(data):
+    return hashlib.sha256(b'\x00' + data).digest()
+
+def _node_hash(left, right):
+    return hashlib.sha256(b'\x01' + left + right).digest()
+
+EMPTY_LEAF = _leaf_hash(b'')
+
+def tree_path(csv_path):
+    return csv_path + MERKLE_EXTENSION
+
+class MerkleTree:
+    """Binary Merkle tree over day leaves, padded with empty leaves to a power of two"""
+
+    def __init__(self, start_day, leaves, stray_days=()):
+        self.start_day = start_day
+        self.leaves = list(leaves)
+        # Days of the trailing leaves that lie outside the file's span
+        self.stray_days = list(stray_days)
+        self.span = len(self.leaves) - len(self.stray_days)
+        width = 1
+        while width < len(self.leaves):
+            width *= 2
+        level = self.leaves + [EMPTY_LEAF] * (width - len(self.leaves))
+        self.levels = [level]
+        while len(level) > 1:
+            level = [_node_hash(level[i], level[i + 1]) for i in range(0, len(level), 2)]
+            self.levels.append(level)
+
+    @property
+    def root(self):
+        return self.levels[-1][0] if self.leaves else EMPTY_LEAF
+
+    def day_ts(self, leaf):
+        if leaf >= self.span:
+            return self.stray_days[leaf - self.span] * DAY_SECONDS
+        return (self.start_day + leaf) * DAY_SECONDS
+
+    def day_leaves(self):
+        """{day number: leaf hash} for every leaf, stray days included"""
+        return {self.day_ts(i) // DAY_SECONDS: leaf for i, leaf in enumerate(self.leaves)}
+
+    def changed_days(self, other):
+        """
+        Unix day starts whose contents differ from `other` (an older tree).
+        Descends only into subtrees whose hashes differ: O(k log n) for k changes.
+        """
+        if other is None:
+            return [self.day_ts(i) for i in range(len(self.leaves))]
+        if (other.start_day != self.start_day or len(other.levels) != len(self.levels)
+                or other.stray_days != self.stray_days):
+            # Different day span: compare leaf by leaf on the union of days
+            old = other.day_leaves()
+            new = self.day_leaves()
+            return [day * DAY_SECONDS for day in sorted(set(old) | set(new))
+                    if old.get(day, EMPTY_LEAF) != new.get(day, EMPTY_LEAF)]
+
+        changed = []
+        pending = [(len(self.levels) - 1, 0)]
+        while pending:
+            depth, position = pending.pop()
+            if self.levels[depth][position] == other.levels[depth][position]:
+                continue
+            if depth == 0:
+                if position < max(len(self.leaves), len(other.leaves)):
+                    changed.append(self.day_ts(position))
+                continue
+            pending.append((depth - 1, 2 * position + 1))
+            pending.append((depth - 1, 2 * position))
+        return sorted(changed)
+
+def day_hashes(csv_path):
+    """
+    (start_day, leaf hashes, stray days) for a candle CSV. Each leaf hashes the
+    raw data lines of one UTC day in file order; yearly and per-day files span
+    their whole calendar range so empty days keep their position. Days outside
+    that span are appended as extra leaves and listed in stray days.
+    """
+    lines, timestamps = read_rows(csv_path)
+    days = np.asarray(timestamps, dtype=np.int64) // DAY_SECONDS
+    covered = shard_range(csv_path)
+    if covered is not None:
+        start_day, end_day = covered[0] // DAY_SECONDS, covered[1] // DAY_SECONDS
+    elif len(days):
+        start_day, end_day = int(days.min()), int(days.max()) + 1
+    else:
+        return 0, [], []
+
+    order = np.argsort(days, kind='stable')
+    sorted_days = days[order]
+    leaves = [EMPTY_LEAF] * (end_day - start_day)
+    stray_days = []
+    bounds = np.concatenate([[0], np.flatnonzero(np.diff(sorted_days)) + 1, [len(order)]])
+    for lo, hi in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        if lo == hi:
+            continue
+        leaf = int(sorted_days[lo]) - start_day
+        data = b'\n'.join(lines[i] for i in order[lo:hi].tolist())
+        if 0 <= leaf < len(leaves):
+            leaves[leaf] = _leaf_hash(data)
+        else:
+            # Rows outside the file's nominal span still have to affect the root
+            leaves.append(_leaf_hash(str(int(sorted_days[lo])).encode('ascii') + b'|' + data))
+            stray_days.append(int(sorted_days[lo]))
+    return start_day, leaves, stray_days
+
+def build_tree(csv_path):
+    return MerkleTree(*day_hashes(csv_path))
+
+def consumer_tree_path(csv_path, consumer):
+    """Snapshot of the tree a downstream job (rollups, DB sync) last processed"""
+    return f'{csv_path}.{consumer}{MERKLE_EXTENSION}'
+
+def _read_tree(path):
+    try:
+        with open(path, 'r') as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        return None, None
+    if stored.get('version') != MERKLE_VERSION:
+        return None, None
+    return stored, MerkleTree(stored['start_day'], [bytes.fromhex(leaf) for leaf in stored['leaves']],
+                              stored['stray_days'])
+
+def write_tree(csv_path, tree=None, path=None):
+    tree = tree or build_tree(csv_path)
+    stat = os.stat(csv_path)
+    with open(path or tree_path(csv_path), 'w') as f:
+        json.dump({
+            'version': MERKLE_VERSION,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'start_day': tree.start_day,
+            'root': tree.root.hex(),
+            'leaves': [leaf.hex() for leaf in tree.leaves],
+            'stray_days': tree.stray_days,
+        }, f, separators=(',', ':'))
+    return tree
+
+def load_tree(csv_path, fresh_only=True):
+    """
+    The stored tree, or None if missing. With fresh_only=False a stale tree
+    (the file changed since it was written) is returned too, for diffing.
+    """
+    stored, tree = _read_tree(tree_path(csv_path))
+    if tree is None:
+        return None
+    if fresh_only:
+        try:
+            stat = os.stat(csv_path)
+        except OSError:
+            return None
+        if stored['size'] != stat.st_size or stored['mtime_ns'] != stat.st_mtime_ns:
+            return None
+    return tree
+
+def ensure_tree(csv_path):
+    """Current tree for the file, building and storing it if needed"""
+    return load_tree(csv_path) or write_tree(csv_path)
+
+def update_tree(csv_path, previous=None):
+    """
+    Rebuild the tree after a rewrite and return the changed day starts.
+    previous defaults to the tree stored before the rewrite (if any).
+    """
+    if previous is None:
+        previous = load_tree(csv_path, fresh_only=False)
+    tree = write_tree(csv_path)
+    return tree.changed_days(previous)
+
+def changed_since(csv_path, consumer):
+    """Day starts changed since `consumer` last called mark_consumed (all days the first time)"""
+    _, seen = _read_tree(consumer_tree_path(csv_path, consumer))
+    return ensure_tree(csv_path).changed_days(seen)
+
+def mark_consumed(csv_path, consumer):
+    """Record that `consumer` has processed the file's current contents"""
+    write_tree(csv_path, ensure_tree(csv_path), consumer_tree_path(csv_path, consumer))
+
+def diff_files(old_csv, new_csv):
+    """Changed day starts between two versions of a file"""
+    return build_tree(new_csv).changed_days(build_tree(old_csv))
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == 'diff':
+        changed = diff_files(sys.argv[2], sys.argv[3])
+        print(f"🔎 {len(changed)} changed days between {sys.argv[2]} and {sys.argv[3]}")
+        for day in changed:
+            print(f"   {datetime.fromtimestamp(day, timezone.utc).date()}")
+        return
+    if len(sys.argv) < 2 or sys.argv[1] == 'diff':
+        print("Usage: python day_merkle.py <csv_file> [csv_file ...]    (write trees)")
+        print("       python day_merkle.py diff <old_csv> <new_csv>     (list changed days)")
+        sys.exit(1)
+    for csv_path in sys.argv[1:]:
+        tree = write_tree(csv_path)
+        print(f"🌳 {tree_path(csv_path)}: {len(tree.leaves)} days, root {tree.root.hex()[:16]}")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import csv
 import os
+from candle_index import write_index
 
 def remove_duplicates_from_2011():
     """Remove duplicate entries from 2011 BTC data"""
@@ -41,6 +42,7 @@ def remove_duplicates_from_2011():
     backup_file = input_file + '.backup'
     os.rename(input_file, backup_file)
     os.rename(output_file, input_file)
+    write_index(input_file)
 
     print(f"✅ Replaced original file (backup saved as {backup_file})")
 
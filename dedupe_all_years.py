@@ -1,5 +1,8 @@
-import csv
 import os
+import numpy as np
+from candle_csv import read_rows, write_lines
+from day_merkle import ensure_tree, update_tree
+from candle_index import write_index
 
 def dedupe_year(year):
     """Remove duplicate entries from a specific year's BTC data"""
@@ -9,27 +12,16 @@ def dedupe_year(year):
 
     print(f"🔧 Removing duplicates from {year} data...")
 
-    seen_timestamps = set()
-    duplicates_removed = 0
-    total_rows = 0
+    lines, timestamps = read_rows(input_file)
+    total_rows = len(lines)
 
-    with open(input_file, 'r') as infile, open(output_file, 'w', newline='') as outfile:
-        reader = csv.reader(infile)
-        writer = csv.writer(outfile)
+    # Keep the first occurrence of each unix_timestamp, in file order
+    _, first_index = np.unique(timestamps, return_index=True)
+    keep = np.zeros(total_rows, dtype=bool)
+    keep[first_index] = True
+    duplicates_removed = int(total_rows - keep.sum())
 
-        # Write header
-        header = next(reader)
-        writer.writerow(header)
-
-        for row in reader:
-            total_rows += 1
-            unix_ts = row[4]  # unix_timestamp column
-
-            if unix_ts not in seen_timestamps:
-                seen_timestamps.add(unix_ts)
-                writer.writerow(row)
-            else:
-                duplicates_removed += 1
+    write_lines(output_file, [line for line, kept in zip(lines, keep.tolist()) if kept])
 
     print(f"📊 Processed {total_rows} rows")
     print(f"🗑️  Removed {duplicates_removed} duplicates")
@@ -37,10 +29,14 @@ def dedupe_year(year):
 
     if duplicates_removed > 0:
         # Replace original file
+        previous_tree = ensure_tree(input_file)
         backup_file = input_file + '.backup'
         os.rename(input_file, backup_file)
         os.rename(output_file, input_file)
+        changed_days = update_tree(input_file, previous_tree)
+        write_index(input_file)
         print(f"✅ Replaced original file (backup saved as {backup_file})")
+        print(f"🌳 {len(changed_days)} days changed")
     else:
         # No duplicates, just remove the temp file
         os.remove(output_file)
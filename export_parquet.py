@@ -0,0 +1,152 @@
+import os
+import sys
+import numpy as np
+from candle_csv import read_candles
+from data_layout import INTERVAL_SECONDS, list_shards, parquet_dir
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export needs pyarrow
+    pa = None
+    pq = None
+
+SYMBOL = 'BTCUSD'
+COMPRESSION = 'zstd'
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("pyarrow is required for Parquet export (pip install pyarrow)")
+
+def candle_schema():
+    _require_pyarrow()
+    return pa.schema([
+        ('timestamp', pa.timestamp('s', tz='UTC')),
+        ('open', pa.float64()),
+        ('close', pa.float64()),
+        ('volume', pa.float64()),
+        ('high', pa.float64()),
+        ('low', pa.float64()),
+    ])
+
+def candle_table(columns):
+    """Arrow table from typed candle columns (unix_timestamp becomes a UTC timestamp column)"""
+    schema = candle_schema()
+    arrays = [pa.array(np.asarray(columns['unix_timestamp'], dtype=np.int64)).cast(schema.field('timestamp').type)]
+    arrays += [pa.array(np.asarray(columns[name], dtype=np.float64)) for name in schema.names[1:]]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def month_keys(unix_timestamps):
+    """Months since 1970-01 for each unix timestamp"""
+    return np.asarray(unix_timestamps, dtype=np.int64).astype('datetime64[s]').astype('datetime64[M]').astype(np.int64)
+
+class ParquetPartitionWriter:
+    """
+    Stream sorted candle chunks into yearly Parquet partitions.
+    Each calendar month becomes one row group with min/max statistics, so
+    time-filtered reads can skip whole months; only one month is buffered.
+    """
+
+    def __init__(self, symbol, interval):
+        _require_pyarrow()
+        self.symbol = symbol
+        self.interval = interval
+        self.written = []
+        self._writer = None
+        self._path = None
+        self._rows = 0
+        self._month = None
+        self._pending = []
+
+    def write(self, columns):
+        unix = np.asarray(columns['unix_timestamp'], dtype=np.int64)
+        if not len(unix):
+            return
+        keys = month_keys(unix)
+        splits = np.concatenate([[0], np.flatnonzero(np.diff(keys)) + 1, [len(unix)]])
+        for start, end in zip(splits[:-1].tolist(), splits[1:].tolist()):
+            month = int(keys[start])
+            if month != self._month:
+                self._flush_month()
+                if self._month is None or month // 12 != self._month // 12:
+                    self._open_year(1970 + month // 12)
+                self._month = month
+            self._pending.append({name: np.asarray(values)[start:end] for name, values in columns.items()})
+
+    def close(self):
+        self._flush_month()
+        self._close_year()
+        return self.written
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _open_year(self, year):
+        self._close_year()
+        folder = parquet_dir(self.symbol, self.interval, year)
+        os.makedirs(folder, exist_ok=True)
+        self._path = os.path.join(folder, 'part-0.parquet')
+        self._writer = pq.ParquetWriter(self._path, candle_schema(), compression=COMPRESSION, write_statistics=True)
+        self._rows = 0
+
+    def _close_year(self):
+        if self._writer is not None:
+            self._writer.close()
+            self.written.append((self._path, self._rows))
+            self._writer = None
+
+    def _flush_month(self):
+        if not self._pending:
+            return
+        columns = {name: np.concatenate([chunk[name] for chunk in self._pending]) for name in self._pending[0]}
+        table = candle_table(columns)
+        self._writer.write_table(table, row_group_size=max(1, table.num_rows))
+        self._rows += table.num_rows
+        self._pending = []
+
+def write_parquet_partitions(columns, symbol, interval):
+    """Write sorted candle columns to their yearly partitions in one call"""
+    with ParquetPartitionWriter(symbol, interval) as writer:
+        writer.write(columns)
+    return writer.written
+
+def convert_interval(symbol, interval):
+    """Convert every CSV shard of one interval into yearly Parquet partitions"""
+    with ParquetPartitionWriter(symbol, interval) as writer:
+        for _, _, path in list_shards(symbol, interval):
+            writer.write(read_candles(path))
+    return writer.written
+
+def convert_tree(symbol=SYMBOL, intervals=None):
+    _require_pyarrow()
+    total_rows = 0
+    for interval in intervals or INTERVAL_SECONDS:
+        written = convert_interval(symbol, interval)
+        for path, rows in written:
+            total_rows += rows
+            print(f"💾 {path}: {rows:,} candles")
+        if not written:
+            print(f"⚠️  {symbol} {interval}: no CSV shards found")
+    return total_rows
+
+def main():
+    intervals = sys.argv[1:] or None
+    unknown = [interval for interval in intervals or [] if interval not in INTERVAL_SECONDS]
+    if unknown:
+        print(f"Usage: python export_parquet.py [{' '.join(INTERVAL_SECONDS)}]")
+        sys.exit(1)
+
+    print("🚀 CSV → Parquet Export")
+    print("="*50)
+    if pa is None:
+        print("❌ pyarrow is not installed - run: pip install pyarrow")
+        sys.exit(1)
+
+    total_rows = convert_tree(SYMBOL, intervals)
+    print(f"\n✅ Exported {total_rows:,} candles to {os.path.join('data', 'parquet')}")
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,11 @@
 import requests
 import time
 import json
-import csv
 from datetime import datetime, timezone
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import sys
+from metrics import FetchMetrics
+from candle_csv import write_candles, columns_from_coinbase_rows
 
 # Configuration - Using Binance API for better historical data coverage
 BASE_URL = 'https://api.binance.com/api/v3/klines'
@@ -15,6 +16,8 @@ MAX_WORKERS = 10  # Conservative for Binance API
 RATE_LIMIT_DELAY = 0.1
 MAX_RETRIES = 5
 RETRY_DELAY = 2
+METRICS_FILE = 'fetch_missing_data_metrics.prom'  # Prometheus textfile dump written at the end of a run
+FETCH_METRICS = FetchMetrics()
 
 def get_candles_binance(start_unix, end_unix, retry_count=0):
     """
@@ -32,7 +35,9 @@ def get_candles_binance(start_unix, end_unix, retry_count=0):
     }
     
     try:
-        response = requests.get(BASE_URL, params=params)
+        with FETCH_METRICS.time_request('binance'):
+            response = requests.get(BASE_URL, params=params)
+        FETCH_METRICS.record_response('binance', response.status_code)
         
         if response.status_code == 200:
             data = response.json()
@@ -160,28 +165,11 @@ def fetch_missing_range(range_info, range_id):
             print(f"   ❌ No data retrieved for range {range_id}")
             return None, range_info
         
-        # Convert to CSV format
-        csv_rows = []
-        for candle in all_data:
-            timestamp_unix = candle[0]
-            timestamp_iso = datetime.fromtimestamp(timestamp_unix, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
-            low = candle[1]
-            high = candle[2]
-            open_p = candle[3]
-            close = candle[4]
-            volume = candle[5]
-            csv_rows.append({
-                'timestamp': timestamp_iso,
-                'open': open_p,
-                'close': close,
-                'volume': volume,
-                'unix_timestamp': timestamp_unix,
-                'high': high,
-                'low': low
-            })
+        # Convert to columns for the bulk CSV writer
+        candles = columns_from_coinbase_rows(all_data)
         
-        print(f"   ✅ Successfully retrieved {len(csv_rows)} candles for range {range_id}")
-        return csv_rows, range_info
+        print(f"   ✅ Successfully retrieved {len(candles['unix_timestamp'])} candles for range {range_id}")
+        return candles, range_info
         
     except Exception as e:
         print(f"   ❌ Exception in range {range_id}: {e}")
@@ -227,15 +215,18 @@ def main():
             executor.submit(fetch_missing_range, range_info, i+1): (range_info, i+1)
             for i, range_info in enumerate(ranges)
         }
+        FETCH_METRICS.queue_depth.set(len(future_to_range))
         
         # Process completed tasks
         for future in as_completed(future_to_range):
             range_info, range_id = future_to_range[future]
+            FETCH_METRICS.queue_depth.dec()
             try:
-                csv_rows, _ = future.result()
-                if csv_rows is not None:
-                    all_missing_data.extend(csv_rows)
+                candles, _ = future.result()
+                if candles is not None:
+                    all_missing_data.append(candles)
                     successful_ranges += 1
+                    FETCH_METRICS.candles.inc(len(candles['unix_timestamp']))
                 
                 # Progress update
                 print(f"   📈 Progress: {successful_ranges}/{len(ranges)} ranges completed")
@@ -247,28 +238,24 @@ def main():
         print("\n❌ No missing data could be retrieved.")
         sys.exit(1)
     
-    # Sort by timestamp
-    all_missing_data.sort(key=lambda x: x['unix_timestamp'])
+    # Sort by timestamp (ranges are disjoint and each one is already in order)
+    all_missing_data.sort(key=lambda candles: candles['unix_timestamp'][0])
+    missing_count = sum(len(candles['unix_timestamp']) for candles in all_missing_data)
     
     # Save to CSV file
     output_filename = original_filename.replace('.csv', '_missing_data.csv')
     
-    print(f"\n💾 Saving {len(all_missing_data):,} missing candles to {output_filename}...")
+    print(f"\n💾 Saving {missing_count:,} missing candles to {output_filename}...")
     
-    with open(output_filename, 'w', newline='') as csvfile:
-        fieldnames = ['timestamp', 'open', 'close', 'volume', 'unix_timestamp', 'high', 'low']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        
-        for row in all_missing_data:
-            writer.writerow(row)
+    write_candles(output_filename, all_missing_data)
     
     print("\n" + "="*60)
     print("📊 MISSING DATA FETCH SUMMARY")
     print("="*60)
     print(f"✅ Successfully fetched: {successful_ranges}/{len(ranges)} ranges")
-    print(f"📈 Retrieved candles: {len(all_missing_data):,}")
+    print(f"📈 Retrieved candles: {missing_count:,}")
     print(f"💾 Saved to: {output_filename}")
+    print(f"📟 Metrics: {FETCH_METRICS.dump(METRICS_FILE)}")
     
     if successful_ranges == len(ranges):
         print("🎉 All missing data successfully retrieved!")
@@ -1,6 +1,8 @@
 import csv
 import os
 from datetime import datetime, timedelta
+from day_merkle import ensure_tree, update_tree
+from candle_index import write_index
 
 def fill_year_boundary_gaps():
     """Fill missing data points at year boundaries by copying previous prices"""
@@ -64,15 +66,18 @@ def fill_year_boundary_gaps():
                 rows.append(row)
 
         # Write back
+        previous_tree = ensure_tree(target_path)
         backup_file = target_path + '.backup5'
         os.rename(target_path, backup_file)
 
         with open(target_path, 'w', newline='') as f:
             writer = csv.writer(f)
             writer.writerows(rows)
+        changed_days = update_tree(target_path, previous_tree)
+        write_index(target_path)
 
         total_inserted += 1
-        print(f"✅ Inserted {missing_ts_str} into {target_file}")
+        print(f"✅ Inserted {missing_ts_str} into {target_file} ({len(changed_days)} days changed)")
 
     print(f"\n📊 Total rows inserted: {total_inserted}")
 
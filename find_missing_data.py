@@ -1,24 +1,20 @@
-import csv
 from datetime import datetime, timezone
 import sys
 import json
+import numpy as np
+from candle_checks import missing_ranges
+from candle_csv import read_timestamps
 
-def find_missing_timestamps(filename):
+def find_missing_ranges(filename):
     """
-    Find all missing timestamps in Bitcoin 1-minute candle data
-    Returns a list of missing timestamp ranges
+    Find missing data in Bitcoin 1-minute candle data
+    Returns a list of (first_missing, last_missing) timestamp ranges
     """
     print(f"Analyzing missing data in {filename}...")
     
-    timestamps = []
-    
     # Read all timestamps from the CSV
     try:
-        with open(filename, 'r') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                unix_timestamp = int(row['unix_timestamp'])
-                timestamps.append(unix_timestamp)
+        timestamps = read_timestamps(filename)
         
         print(f"✓ Read {len(timestamps):,} timestamps from {filename}")
         
@@ -29,81 +25,22 @@ def find_missing_timestamps(filename):
         print(f"❌ Error reading file: {e}")
         return []
     
-    if not timestamps:
+    if not len(timestamps):
         print("❌ No data found in file!")
         return []
     
-    # Sort timestamps
-    timestamps.sort()
-    
-    # Find missing timestamp ranges
-    missing_ranges = []
-    current_missing_start = None
-    current_missing_end = None
-    
-    expected_timestamp = timestamps[0]
-    
-    for timestamp in timestamps:
-        # Check if there's a gap before this timestamp
-        if expected_timestamp < timestamp:
-            # Found missing data
-            if current_missing_start is None:
-                current_missing_start = expected_timestamp
-            current_missing_end = timestamp - 60  # Last missing timestamp
-            
-            # Add all missing timestamps in this gap
-            missing_ts = expected_timestamp
-            while missing_ts < timestamp:
-                missing_ranges.append(missing_ts)
-                missing_ts += 60
-        
-        # Update expected timestamp for next iteration
-        expected_timestamp = timestamp + 60
-    
-    return missing_ranges
+    return [tuple(gap) for gap in missing_ranges(timestamps).tolist()]
 
-def group_consecutive_timestamps(missing_timestamps):
-    """
-    Group consecutive missing timestamps into ranges for efficient fetching
-    """
-    if not missing_timestamps:
-        return []
-    
-    ranges = []
-    current_start = missing_timestamps[0]
-    current_end = missing_timestamps[0]
-    
-    for i in range(1, len(missing_timestamps)):
-        if missing_timestamps[i] == current_end + 60:
-            # Consecutive timestamp, extend current range
-            current_end = missing_timestamps[i]
-        else:
-            # Gap found, save current range and start new one
-            ranges.append((current_start, current_end))
-            current_start = missing_timestamps[i]
-            current_end = missing_timestamps[i]
-    
-    # Don't forget the last range
-    ranges.append((current_start, current_end))
-    
-    return ranges
+def count_missing(ranges):
+    """Number of missing minutes covered by the ranges"""
+    return sum((end_ts - start_ts) // 60 + 1 for start_ts, end_ts in ranges)
 
-def save_missing_data_info(filename, missing_timestamps, ranges):
+def save_missing_data_info(filename, ranges):
     """
-    Save missing data information to JSON files
+    Save the missing ranges to a JSON file for fetch_missing_data.py
     """
     base_name = filename.replace('.csv', '')
     
-    # Save individual missing timestamps
-    timestamps_file = f"{base_name}_missing_timestamps.json"
-    with open(timestamps_file, 'w') as f:
-        json.dump({
-            'filename': filename,
-            'total_missing': len(missing_timestamps),
-            'missing_timestamps': missing_timestamps
-        }, f, indent=2)
-    
-    # Save ranges for efficient fetching
     ranges_file = f"{base_name}_missing_ranges.json"
     range_info = []
     for start_ts, end_ts in ranges:
@@ -122,12 +59,12 @@ def save_missing_data_info(filename, missing_timestamps, ranges):
     with open(ranges_file, 'w') as f:
         json.dump({
             'filename': filename,
-            'total_missing_timestamps': len(missing_timestamps),
+            'total_missing_timestamps': count_missing(ranges),
             'total_ranges': len(ranges),
             'ranges': range_info
         }, f, indent=2)
     
-    return timestamps_file, ranges_file
+    return ranges_file
 
 def main():
     if len(sys.argv) != 2:
@@ -140,25 +77,23 @@ def main():
     print("🔍 Missing Data Analysis Tool")
     print("="*50)
     
-    # Find missing timestamps
-    missing_timestamps = find_missing_timestamps(filename)
+    # Find missing ranges
+    ranges = find_missing_ranges(filename)
     
-    if not missing_timestamps:
+    if not ranges:
         print("✅ No missing data found!")
         sys.exit(0)
     
+    missing_count = count_missing(ranges)
     print(f"\n📊 ANALYSIS RESULTS")
     print("="*50)
-    print(f"❌ Missing timestamps: {len(missing_timestamps):,}")
-    
-    # Group into ranges
-    ranges = group_consecutive_timestamps(missing_timestamps)
+    print(f"❌ Missing timestamps: {missing_count:,}")
     print(f"📦 Missing data ranges: {len(ranges)}")
     
     # Show details of ranges
     print(f"\n📋 MISSING DATA RANGES:")
     print("-"*50)
-    total_missing_hours = len(missing_timestamps) / 60
+    total_missing_hours = missing_count / 60
     
     for i, (start_ts, end_ts) in enumerate(ranges, 1):
         start_dt = datetime.fromtimestamp(start_ts, timezone.utc)
@@ -173,10 +108,9 @@ def main():
     print(f"   Total missing time: {total_missing_hours:.1f} hours ({total_missing_hours/24:.1f} days)")
     
     # Save to files
-    timestamps_file, ranges_file = save_missing_data_info(filename, missing_timestamps, ranges)
+    ranges_file = save_missing_data_info(filename, ranges)
     
-    print(f"\n💾 SAVED FILES:")
-    print(f"   📄 Individual timestamps: {timestamps_file}")
+    print(f"\n💾 SAVED FILE:")
     print(f"   📦 Ranges for fetching: {ranges_file}")
     
     print(f"\n✅ Analysis complete! Use the ranges file to fetch missing data.")
@@ -1,4 +1,5 @@
 import csv
+from candle_index import write_index
 
 def fix_corrupted_2015_data():
     """Fix the corrupted data point in 2015"""
@@ -60,6 +61,7 @@ def fix_corrupted_2015_data():
     backup_file = input_file + '.backup'
     os.rename(input_file, backup_file)
     os.rename(output_file, input_file)
+    write_index(input_file)
     print(f"✅ Replaced original file (backup saved as {backup_file})")
 
 if __name__ == "__main__":
@@ -1,5 +1,34 @@
-import csv
 import os
+import numpy as np
+from candle_csv import read_candles, read_lines, write_lines
+from day_merkle import ensure_tree, update_tree
+from candle_index import write_index
+
+def read_prices(filepath, lines):
+    """
+    open/close/high/low columns plus a mask of rows that do not parse.
+    The whole file goes through the fast reader; only when it fails are the
+    lines parsed one by one, so a few damaged rows don't stop the repair.
+    """
+    try:
+        candles = read_candles(filepath)
+        if len(candles['open']) == len(lines):
+            return candles, np.zeros(len(lines), dtype=bool)
+    except ValueError:
+        pass
+
+    prices = {name: np.zeros(len(lines)) for name in ('open', 'close', 'high', 'low')}
+    unparseable = np.zeros(len(lines), dtype=bool)
+    for i, line in enumerate(lines):
+        try:
+            row = line.split(b',')
+            prices['open'][i] = float(row[1])
+            prices['close'][i] = float(row[2])
+            prices['high'][i] = float(row[5])
+            prices['low'][i] = float(row[6])
+        except (ValueError, IndexError):
+            unparseable[i] = True
+    return prices, unparseable
 
 def fix_corrupted_data_all_years():
     """Fix corrupted data points (all zeros) in all years"""
@@ -16,61 +45,67 @@ def fix_corrupted_data_all_years():
 
         print(f"🔍 Checking {year}...")
 
-        # Read and fix data
-        rows = []
-        with open(filepath, 'r') as f:
-            reader = csv.reader(f)
-            header = next(reader)
-            rows.append(header)
-
-            prev_valid_row = None
-            fixed_this_year = 0
-
-            for row in reader:
-                try:
-                    open_price = float(row[1])
-                    close_price = float(row[2])
-                    high_price = float(row[5])
-                    low_price = float(row[6])
-
-                    # Check if all prices are zero (corrupted)
-                    if open_price == 0 and close_price == 0 and high_price == 0 and low_price == 0:
-                        if prev_valid_row:
-                            # Fix by copying previous valid prices
-                            fixed_row = row.copy()
-                            fixed_row[1] = prev_valid_row[1]  # open
-                            fixed_row[2] = prev_valid_row[2]  # close
-                            fixed_row[5] = prev_valid_row[5]  # high
-                            fixed_row[6] = prev_valid_row[6]  # low
-                            fixed_row[3] = '0.0'             # volume = 0
-
-                            rows.append(fixed_row)
-                            fixed_this_year += 1
-                            total_fixed += 1
-                        else:
-                            # No previous data, skip this row
-                            continue
-                    else:
-                        rows.append(row)
-                        prev_valid_row = row
-
-                except (ValueError, IndexError):
-                    continue
+        # Read prices as typed columns and keep the raw lines for rewriting
+        _, lines = read_lines(filepath)
+        candles, unparseable = read_prices(filepath, lines)
+        if unparseable.any():
+            print(f"⚠️  {year}: {int(unparseable.sum())} unparseable rows (dropped if the file is rewritten)")
+
+        # Check if all prices are zero (corrupted)
+        corrupted = ((candles['open'] == 0) & (candles['close'] == 0) &
+                     (candles['high'] == 0) & (candles['low'] == 0) & ~unparseable)
+
+        if not corrupted.any():
+            print(f"✅ {year}: No corrupted data found")
+            continue
+
+        # Index of the most recent valid row at or before each row (-1 if none yet)
+        valid_index = np.where(corrupted | unparseable, -1, np.arange(len(lines)))
+        prev_valid_index = np.maximum.accumulate(valid_index)
+
+        rows = list(lines)
+        dropped = np.flatnonzero(unparseable).tolist()
+        fixed_this_year = 0
+
+        for i in np.flatnonzero(corrupted).tolist():
+            prev = prev_valid_index[i]
+            if prev < 0:
+                # No previous data, skip this row
+                dropped.append(i)
+                continue
+
+            # Fix by copying previous valid prices
+            fixed_row = lines[i].split(b',')
+            prev_valid_row = lines[prev].split(b',')
+            fixed_row[1] = prev_valid_row[1]  # open
+            fixed_row[2] = prev_valid_row[2]  # close
+            fixed_row[5] = prev_valid_row[5]  # high
+            fixed_row[6] = prev_valid_row[6]  # low
+            fixed_row[3] = b'0.0'             # volume = 0
+
+            rows[i] = b','.join(fixed_row)
+            fixed_this_year += 1
+            total_fixed += 1
+
+        for i in sorted(dropped, reverse=True):
+            del rows[i]
 
         # Write back if any fixes were made
         if fixed_this_year > 0:
+            # A file with unparseable rows has no current tree; diff against the last stored one
+            previous_tree = None if unparseable.any() else ensure_tree(filepath)
             backup_file = filepath + '.backup3'
             os.rename(filepath, backup_file)
 
-            with open(filepath, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerows(rows)
+            write_lines(filepath, rows)
+            changed_days = update_tree(filepath, previous_tree)
+            write_index(filepath)
 
-            print(f"🔧 {year}: Fixed {fixed_this_year} corrupted rows")
+            print(f"🔧 {year}: Fixed {fixed_this_year} corrupted rows ({len(changed_days)} days changed)")
         else:
             print(f"✅ {year}: No corrupted data found")
 
     print(f"\n📊 Total corrupted data points fixed across all years: {total_fixed}")
 
 if __name__ == "__main__":
-    fix_corrupted_data_all_years()
\ No newline at end of file
+    fix_corrupted_data_all_years()
@@ -4,10 +4,15 @@ import subprocess
 import os
 import json
 from datetime import datetime, timedelta, timezone
-import csv
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from collections import defaultdict
+from metrics import FetchMetrics
+import numpy as np
+from candle_csv import read_timestamps, read_rows, merge_rows, write_lines, write_candles, columns_from_coinbase_rows
+from candle_checks import missing_ranges
+from candle_index import write_index
+from dataset_manifest import DatasetManifest
 
 # Configuration
 BASE_URL = 'https://api.exchange.coinbase.com/products/ETH-USD/candles'
@@ -23,6 +28,14 @@ STARTING_YEAR = 2016  # ETH started trading on Coinbase in 2016
 CURRENT_YEAR = datetime.now().year
 ETH_START_DATE = datetime(2016, 5, 23, tzinfo=timezone.utc)  # First ETH trading date
 
+# Metrics configuration
+METRICS_FILE = 'eth_pipeline_metrics.prom'  # Prometheus textfile dump written at the end of a run
+FETCH_METRICS = FetchMetrics()
+
+# Validation cache: unchanged year files are not re-validated
+MANIFEST = DatasetManifest()
+VALIDATION_CHECK = 'main.validate_data'
+
 def get_candles(start_unix, end_unix, retry_count=0):
     params = {
         'start': datetime.fromtimestamp(start_unix, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
@@ -31,7 +44,9 @@ def get_candles(start_unix, end_unix, retry_count=0):
     }
     
     try:
-        response = requests.get(BASE_URL, params=params)
+        with FETCH_METRICS.time_request('coinbase'):
+            response = requests.get(BASE_URL, params=params)
+        FETCH_METRICS.record_response('coinbase', response.status_code)
         
         if response.status_code == 200:
             data = response.json()
@@ -114,28 +129,11 @@ def fetch_interval_data(start_unix, end_unix, interval_id):
         # Fill missing candles with zero-vol and copy last candle price
         data = fill_missing_candles(raw_data, start_unix, end_unix)
         
-        # Convert to CSV format
-        csv_rows = []
-        for candle in data:
-            timestamp_unix = candle[0]
-            timestamp_iso = datetime.fromtimestamp(timestamp_unix, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
-            low = candle[1]
-            high = candle[2]
-            open_p = candle[3]
-            close = candle[4]
-            volume = candle[5]
-            csv_rows.append({
-                'timestamp': timestamp_iso,
-                'open': open_p,
-                'close': close,
-                'volume': volume,
-                'unix_timestamp': timestamp_unix,
-                'high': high,
-                'low': low
-            })
+        # Convert to columns for the bulk CSV writer
+        candles = columns_from_coinbase_rows(data)
 
-        print(f'✓ Fetched interval {interval_id}: {datetime.fromtimestamp(start_unix, timezone.utc)} to {datetime.fromtimestamp(end_unix, timezone.utc)} ({len(csv_rows)} candles)')
-        return csv_rows, start_unix, end_unix
+        print(f'✓ Fetched interval {interval_id}: {datetime.fromtimestamp(start_unix, timezone.utc)} to {datetime.fromtimestamp(end_unix, timezone.utc)} ({len(candles["unix_timestamp"])} candles)')
+        return candles, start_unix, end_unix
         
     except Exception as e:
         print(f'✗ Error fetching interval {interval_id}: {e}')
@@ -155,7 +153,9 @@ def fetch_interval_data(start_unix, end_unix, interval_id):
     }
     
     try:
-        response = requests.get('https://api.binance.com/api/v3/klines', params=params)
+        with FETCH_METRICS.time_request('binance'):
+            response = requests.get('https://api.binance.com/api/v3/klines', params=params)
+        FETCH_METRICS.record_response('binance', response.status_code)
         
         if response.status_code == 200:
             data = response.json()
@@ -207,22 +207,16 @@ def fetch_interval_data(start_unix, end_unix, interval_id):
             print(f'   ❌ Binance request exception: {e}. Max retries reached.')
             return None
 
-def find_missing_timestamps(filename):
+def find_missing_ranges(filename):
     """
-    Find all missing timestamps in data
-    Returns a list of missing timestamp ranges
+    Find missing data in a candle file
+    Returns a list of (first_missing, last_missing) timestamp ranges
     """
     print(f"   📊 Analyzing missing timestamps in {filename}...")
     
-    timestamps = []
-    
     # Read all timestamps from the CSV
     try:
-        with open(filename, 'r') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                unix_timestamp = int(row['unix_timestamp'])
-                timestamps.append(unix_timestamp)
+        timestamps = read_timestamps(filename)
         
         print(f"   ✓ Read {len(timestamps):,} timestamps")
         
@@ -233,63 +227,11 @@ def find_missing_timestamps(filename):
         print(f"   ❌ Error reading file: {e}")
         return []
     
-    if not timestamps:
+    if not len(timestamps):
         print("   ❌ No data found in file!")
         return []
     
-    # Sort timestamps
-    timestamps.sort()
-    
-    # Find missing timestamp ranges
-    missing_ranges = []
-    current_missing_start = None
-    current_missing_end = None
-    
-    expected_timestamp = timestamps[0]
-    timestamp_set = set(timestamps)
-    
-    while expected_timestamp <= timestamps[-1]:
-        if expected_timestamp not in timestamp_set:
-            if current_missing_start is None:
-                current_missing_start = expected_timestamp
-            current_missing_end = expected_timestamp
-        else:
-            if current_missing_start is not None:
-                missing_ranges.append((current_missing_start, current_missing_end))
-                current_missing_start = None
-        expected_timestamp += 60
-    
-    # Don't forget the last range
-    if current_missing_start is not None:
-        missing_ranges.append((current_missing_start, current_missing_end))
-    
-    return missing_ranges
-
-def group_consecutive_timestamps(missing_timestamps):
-    """
-    Group consecutive missing timestamps into ranges for efficient fetching
-    """
-    if not missing_timestamps:
-        return []
-    
-    ranges = []
-    current_start = missing_timestamps[0]
-    current_end = missing_timestamps[0]
-    
-    for i in range(1, len(missing_timestamps)):
-        if missing_timestamps[i] == current_end + 60:
-            # Consecutive timestamp, extend current range
-            current_end = missing_timestamps[i]
-        else:
-            # Gap found, save current range and start new one
-            ranges.append((current_start, current_end))
-            current_start = missing_timestamps[i]
-            current_end = missing_timestamps[i]
-    
-    # Don't forget the last range
-    ranges.append((current_start, current_end))
-    
-    return ranges
+    return [tuple(gap) for gap in missing_ranges(timestamps).tolist()]
 
 def fetch_missing_range(range_info, range_id):
     """
@@ -328,28 +270,11 @@ def fetch_missing_range(range_info, range_id):
             print(f"   ❌ No data retrieved for range {range_id}")
             return None, range_info
         
-        # Convert to CSV format
-        csv_rows = []
-        for candle in all_data:
-            timestamp_unix = candle[0]
-            timestamp_iso = datetime.fromtimestamp(timestamp_unix, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
-            low = candle[1]
-            high = candle[2]
-            open_p = candle[3]
-            close = candle[4]
-            volume = candle[5]
-            csv_rows.append({
-                'timestamp': timestamp_iso,
-                'open': open_p,
-                'close': close,
-                'volume': volume,
-                'unix_timestamp': timestamp_unix,
-                'high': high,
-                'low': low
-            })
+        # Convert to columns for the bulk CSV writer
+        candles = columns_from_coinbase_rows(all_data)
         
-        print(f"   ✅ Successfully retrieved {len(csv_rows)} candles for range {range_id}")
-        return csv_rows, range_info
+        print(f"   ✅ Successfully retrieved {len(candles['unix_timestamp'])} candles for range {range_id}")
+        return candles, range_info
         
     except Exception as e:
         print(f"   ❌ Exception in range {range_id}: {e}")
@@ -361,60 +286,33 @@ def merge_csv_files(original_file, missing_data_file, output_file):
     """
     print(f"   🔄 Merging {original_file} with missing data...")
     
-    all_data = []
-    
     # Read original file
     try:
-        with open(original_file, 'r') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                all_data.append(row)
-        print(f"   ✅ Read {len(all_data):,} rows from original file")
+        original_rows = read_rows(original_file)
+        print(f"   ✅ Read {len(original_rows[0]):,} rows from original file")
     except FileNotFoundError:
         print(f"   ❌ Error: {original_file} not found!")
         return False
     
     # Read missing data file (if it exists)
-    missing_count = 0
+    sources = [original_rows]
     try:
-        with open(missing_data_file, 'r') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                all_data.append(row)
-                missing_count += 1
-        print(f"   ✅ Read {missing_count:,} rows from missing data file")
+        missing_rows = read_rows(missing_data_file)
+        sources.append(missing_rows)
+        print(f"   ✅ Read {len(missing_rows[0]):,} rows from missing data file")
     except FileNotFoundError:
         print(f"   ⚠️  Missing data file {missing_data_file} not found - using original data only")
     
-    # Sort by unix timestamp
-    all_data.sort(key=lambda x: int(x['unix_timestamp']))
-    
-    # Remove duplicates (keep first occurrence)
-    seen_timestamps = set()
-    unique_data = []
-    duplicates_removed = 0
-    
-    for row in all_data:
-        timestamp = int(row['unix_timestamp'])
-        if timestamp not in seen_timestamps:
-            seen_timestamps.add(timestamp)
-            unique_data.append(row)
-        else:
-            duplicates_removed += 1
+    # Sort by unix timestamp and remove duplicates (keep first occurrence)
+    unique_lines, duplicates_removed = merge_rows(*sources)
     
     if duplicates_removed > 0:
         print(f"   🧹 Removed {duplicates_removed} duplicate timestamps")
     
     # Write merged file
-    with open(output_file, 'w', newline='') as csvfile:
-        fieldnames = ['timestamp', 'open', 'close', 'volume', 'unix_timestamp', 'high', 'low']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        
-        for row in unique_data:
-            writer.writerow(row)
+    write_lines(output_file, unique_lines)
     
-    print(f"   💾 Saved {len(unique_data):,} rows to {output_file}")
+    print(f"   💾 Saved {len(unique_lines):,} rows to {output_file}")
     return True
 
 def validate_data(filename, expected_start=None, expected_end=None):
@@ -423,17 +321,10 @@ def validate_data(filename, expected_start=None, expected_end=None):
     """
     print(f"   🔍 Validating {filename}...")
     
-    timestamps = []
-    row_count = 0
-    
     # Read all timestamps from the CSV
     try:
-        with open(filename, 'r') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                unix_timestamp = int(row['unix_timestamp'])
-                timestamps.append(unix_timestamp)
-                row_count += 1
+        timestamps = read_timestamps(filename)
+        row_count = len(timestamps)
         
         print(f"   ✓ Successfully read {row_count:,} rows")
         
@@ -444,18 +335,18 @@ def validate_data(filename, expected_start=None, expected_end=None):
         print(f"   ❌ Error reading file: {e}")
         return False
     
-    if not timestamps:
+    if not len(timestamps):
         print("   ❌ No data found in file!")
         return False
     
     # Sort timestamps to ensure proper order
-    timestamps.sort()
+    timestamps = np.sort(timestamps)
     
     # Set expected range
     if expected_start is None:
-        expected_start = timestamps[0]
+        expected_start = int(timestamps[0])
     if expected_end is None:
-        expected_end = timestamps[-1]
+        expected_end = int(timestamps[-1])
     
     # Get date range
     start_time = datetime.fromtimestamp(expected_start, timezone.utc)
@@ -468,25 +359,34 @@ def validate_data(filename, expected_start=None, expected_end=None):
     print(f"   ⏱️  Expected candles: {expected_minutes:,}")
     print(f"   📈 Actual candles: {len(timestamps):,}")
     
-    # Check for missing timestamps (should be every 60 seconds)
-    missing_timestamps = []
-    
-    expected_timestamp = expected_start
-    timestamp_set = set(timestamps)
-    
-    while expected_timestamp <= expected_end:
-        if expected_timestamp not in timestamp_set:
-            missing_timestamps.append(expected_timestamp)
-        expected_timestamp += 60
+    # Check for missing timestamps (should be every 60 seconds); the sentinels
+    # one minute outside the expected range catch gaps at either end
+    in_range = timestamps[(timestamps >= expected_start) & (timestamps <= expected_end)]
+    gaps = missing_ranges(np.concatenate([[expected_start - 60], in_range, [expected_end + 60]]))
+    missing_count = int(((gaps[:, 1] - gaps[:, 0]) // 60 + 1).sum())
     
     # Report results
-    if not missing_timestamps:
+    if not missing_count:
         print("   ✅ SUCCESS: Data is complete with no missing timestamps!")
         return True
     else:
-        print(f"   ❌ MISSING DATA: {len(missing_timestamps)} missing timestamps found!")
+        print(f"   ❌ MISSING DATA: {missing_count} missing timestamps found ({len(gaps)} ranges)!")
         return False
 
+def validate_data_cached(filename):
+    """
+    validate_data, skipped when the manifest holds a verdict for identical contents
+    """
+    cached = MANIFEST.cached_verdict(filename, VALIDATION_CHECK)
+    if cached is not None:
+        MANIFEST.flush()
+        print(f"   📒 {filename}: unchanged since last validation ({'passed' if cached else 'failed'})")
+        return cached
+    is_valid = validate_data(filename)
+    if os.path.exists(filename):
+        MANIFEST.record(filename, VALIDATION_CHECK, is_valid)
+    return is_valid
+
 def fetch_year_data(year):
     """
     Fetch complete year data from Coinbase API
@@ -538,14 +438,16 @@ def fetch_year_data(year):
             executor.submit(fetch_interval_data, start, end, iid): (start, end, iid)
             for start, end, iid in intervals
         }
+        FETCH_METRICS.queue_depth.set(len(future_to_interval))
         
         # Process completed tasks
         for future in as_completed(future_to_interval):
             start, end, iid = future_to_interval[future]
+            FETCH_METRICS.queue_depth.dec()
             try:
-                csv_rows, start_ts, end_ts = future.result()
-                if csv_rows is not None:
-                    results[start_ts] = csv_rows
+                candles, start_ts, end_ts = future.result()
+                if candles is not None:
+                    results[start_ts] = candles
                 completed_count += 1
                 
                 # Progress update
@@ -560,18 +462,10 @@ def fetch_year_data(year):
     filename = f'ETHUSD_1m_candles_{year}.csv'
     print(f'   💾 Writing results to {filename}...')
     
-    with open(filename, 'w', newline='') as csvfile:
-        fieldnames = ['timestamp', 'open', 'close', 'volume', 'unix_timestamp', 'high', 'low']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        
-        total_candles = 0
-        for start_ts in sorted(results.keys()):
-            csv_rows = results[start_ts]
-            for row in csv_rows:
-                writer.writerow(row)
-                total_candles += 1
+    total_candles = write_candles(filename, (results[start_ts] for start_ts in sorted(results.keys())))
+    write_index(filename)
     
+    FETCH_METRICS.candles.inc(total_candles)
     print(f'   ✅ {year}: {total_candles:,} candles saved to {filename}')
     print(f'   ✅ {year}: Successfully fetched {len(results)}/{len(intervals)} intervals\n')
     
@@ -603,27 +497,14 @@ def find_and_fetch_missing_data_integrated(filename):
     
     # Step 1: Find missing data
     print("   📊 Analyzing missing timestamps...")
-    missing_ranges = find_missing_timestamps(filename)
-    
-    if not missing_ranges:
-        print("   ✅ No missing data found!")
-        return True
-    
-    # Group consecutive missing timestamps
-    all_missing_timestamps = []
-    for start_ts, end_ts in missing_ranges:
-        current_ts = start_ts
-        while current_ts <= end_ts:
-            all_missing_timestamps.append(current_ts)
-            current_ts += 60
-    
-    grouped_ranges = group_consecutive_timestamps(all_missing_timestamps)
+    grouped_ranges = find_missing_ranges(filename)
     
     if not grouped_ranges:
-        print("   ✅ No missing data ranges to fetch!")
+        print("   ✅ No missing data found!")
         return True
     
-    print(f"   📋 Found {len(grouped_ranges)} missing ranges with {len(all_missing_timestamps):,} total missing timestamps")
+    missing_count = sum((range_end - range_start) // 60 + 1 for range_start, range_end in grouped_ranges)
+    print(f"   📋 Found {len(grouped_ranges)} missing ranges with {missing_count:,} total missing timestamps")
     
     # Step 2: Fetch missing data from Binance
     print("   📡 Fetching missing data from Binance...")
@@ -638,23 +519,20 @@ def find_and_fetch_missing_data_integrated(filename):
             'duration_minutes': (range_end - range_start) // 60 + 1
         }
         
-        missing_rows, _ = fetch_missing_range(range_info, f"{os.path.basename(filename).replace('.csv', '')}-{i+1}")
+        missing_candles, _ = fetch_missing_range(range_info, f"{os.path.basename(filename).replace('.csv', '')}-{i+1}")
         
-        if missing_rows:
-            all_missing_data.extend(missing_rows)
+        if missing_candles:
+            all_missing_data.append(missing_candles)
     
     # Step 3: Save missing data if any
     if all_missing_data:
         base_name = filename.replace('.csv', '')
         missing_data_file = f"{base_name}_missing.csv"
         
-        with open(missing_data_file, 'w', newline='') as csvfile:
-            fieldnames = ['timestamp', 'open', 'close', 'volume', 'unix_timestamp', 'high', 'low']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(all_missing_data)
+        missing_count = write_candles(missing_data_file, all_missing_data)
         
-        print(f"   💾 Saved {len(all_missing_data):,} missing candles to {missing_data_file}")
+        FETCH_METRICS.candles.inc(missing_count)
+        print(f"   💾 Saved {missing_count:,} missing candles to {missing_data_file}")
         
         # Step 4: Merge original with missing data
         complete_file = f"{base_name}_complete.csv"
@@ -670,6 +548,8 @@ def find_and_fetch_missing_data_integrated(filename):
             if is_valid:
                 # Replace original file with complete file
                 os.replace(complete_file, filename)
+                write_index(filename)
+                MANIFEST.record(filename, VALIDATION_CHECK, True)
                 print(f"   ✅ Successfully fixed all missing data in {filename}")
                 
                 # Clean up temporary files
@@ -699,7 +579,7 @@ def process_single_year(year):
     filename = f'ETHUSD_1m_candles_{year}.csv'
     if os.path.exists(filename):
         print(f"📄 {filename} already exists - validating...")
-        is_valid = validate_data(filename)
+        is_valid = validate_data_cached(filename)
         if is_valid:
             print(f"✅ {year}: Already complete and validated!")
             return True
@@ -714,7 +594,7 @@ def process_single_year(year):
             return False
     
     # Step 3: Validate the data
-    is_valid = validate_data(filename)
+    is_valid = validate_data_cached(filename)
     
     # Step 4: If validation failed, fix missing data
     if not is_valid:
@@ -769,6 +649,9 @@ def main():
     else:
         print(f"\n🎉 ALL YEARS COMPLETED SUCCESSFULLY!")
         print(f"📈 Complete Ethereum dataset from 2016 to {CURRENT_YEAR}")
+    
+    print(f"\n📟 Metrics: {FETCH_METRICS.dump(METRICS_FILE)}")
+    print(f"   Saved to {METRICS_FILE}")
 
 if __name__ == "__main__":
     main()
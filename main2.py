@@ -2,9 +2,11 @@ import requests
 import time
 import os
 from datetime import datetime, timedelta, timezone
-import csv
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from metrics import FetchMetrics
+from candle_csv import write_candles
+from candle_index import write_index
 
 # Binance API configuration
 BASE_URL = 'https://api.binance.com/api/v3/klines'
@@ -20,6 +22,10 @@ RETRY_DELAY = 2  # Initial delay between retries (seconds)
 START_DATE = datetime(2024, 1, 1, tzinfo=timezone.utc)  # Start from 2024
 END_DATE = datetime(2025, 9, 24, tzinfo=timezone.utc)  # Up to current date
 
+# Metrics configuration
+METRICS_FILE = 'binance_1s_metrics.prom'  # Prometheus textfile dump written at the end of a run
+FETCH_METRICS = FetchMetrics()
+
 def get_candles_binance(start_unix, end_unix, retry_count=0):
     """
     Fetch candle data from Binance API with robust retry logic
@@ -33,7 +39,9 @@ def get_candles_binance(start_unix, end_unix, retry_count=0):
     }
 
     try:
-        response = requests.get(BASE_URL, params=params)
+        with FETCH_METRICS.time_request('binance'):
+            response = requests.get(BASE_URL, params=params)
+        FETCH_METRICS.record_response('binance', response.status_code)
 
         if response.status_code == 200:
             data = response.json()
@@ -43,14 +51,13 @@ def get_candles_binance(start_unix, end_unix, retry_count=0):
                 converted_data = []
                 for candle in data:
                     timestamp_unix = int(candle[0] / 1000)  # Convert to seconds
-                    timestamp = datetime.fromtimestamp(timestamp_unix, timezone.utc)
                     open_price = float(candle[1])
                     high_price = float(candle[2])
                     low_price = float(candle[3])
                     close_price = float(candle[4])
                     volume = float(candle[5])
 
-                    converted_data.append((timestamp, open_price, high_price, low_price, close_price, volume))
+                    converted_data.append((timestamp_unix, open_price, high_price, low_price, close_price, volume))
 
                 return converted_data
             else:
@@ -93,25 +100,21 @@ def fetch_interval_data(start_unix, end_unix, interval_id):
         raw_data = get_candles_binance(start_unix, end_unix)
         if raw_data is None:
             print(f'✗ Error fetching interval {interval_id}: No data returned')
-            return None
+            return None, start_unix, end_unix
+
+        # Convert to columns for the bulk CSV writer
+        timestamps, opens, highs, lows, closes, volumes = map(list, zip(*raw_data))
+        candles = {
+            'open': opens,
+            'close': closes,
+            'volume': volumes,
+            'unix_timestamp': timestamps,
+            'high': highs,
+            'low': lows
+        }
 
-        # Convert to CSV format
-        csv_rows = []
-        for candle in raw_data:
-            timestamp, open_price, high_price, low_price, close_price, volume = candle
-            timestamp_iso = timestamp.strftime('%Y-%m-%d %H:%M:%S')
-            csv_rows.append({
-                'timestamp': timestamp_iso,
-                'open': open_price,
-                'close': close_price,
-                'volume': volume,
-                'unix_timestamp': int(timestamp.timestamp()),
-                'high': high_price,
-                'low': low_price
-            })
-
-        print(f'✓ Fetched interval {interval_id}: {datetime.fromtimestamp(start_unix, timezone.utc)} to {datetime.fromtimestamp(end_unix, timezone.utc)} ({len(csv_rows)} candles)')
-        return csv_rows, start_unix, end_unix
+        print(f'✓ Fetched interval {interval_id}: {datetime.fromtimestamp(start_unix, timezone.utc)} to {datetime.fromtimestamp(end_unix, timezone.utc)} ({len(timestamps)} candles)')
+        return candles, start_unix, end_unix
 
     except Exception as e:
         print(f'✗ Error fetching interval {interval_id}: {e}')
@@ -152,14 +155,16 @@ def fetch_day_data(day_start, day_end, day_str):
             executor.submit(fetch_interval_data, start, end, iid): (start, end, iid)
             for start, end, iid in intervals
         }
+        FETCH_METRICS.queue_depth.set(len(future_to_interval))
 
         # Process completed tasks
         for future in as_completed(future_to_interval):
             start, end, iid = future_to_interval[future]
+            FETCH_METRICS.queue_depth.dec()
             try:
-                csv_rows, start_ts, end_ts = future.result()
-                if csv_rows is not None:
-                    results[start_ts] = csv_rows
+                candles, start_ts, end_ts = future.result()
+                if candles is not None:
+                    results[start_ts] = candles
                 completed_count += 1
 
                 # Progress update
@@ -177,18 +182,10 @@ def fetch_day_data(day_start, day_end, day_str):
     filename = f'data/btc/1sec/BTCUSD_1s_candles_{day_str}.csv'
     print(f'   💾 Writing results to {filename}...')
 
-    with open(filename, 'w', newline='') as csvfile:
-        fieldnames = ['timestamp', 'open', 'close', 'volume', 'unix_timestamp', 'high', 'low']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-
-        total_candles = 0
-        for start_ts in sorted(results.keys()):
-            csv_rows = results[start_ts]
-            for row in csv_rows:
-                writer.writerow(row)
-                total_candles += 1
+    total_candles = write_candles(filename, (results[start_ts] for start_ts in sorted(results.keys())))
+    write_index(filename)
 
+    FETCH_METRICS.candles.inc(total_candles)
     print(f'   ✅ {day_str}: {total_candles:,} candles saved to {filename}')
     print(f'   ✅ {day_str}: Successfully fetched {len(results)}/{len(intervals)} intervals\n')
 
@@ -257,5 +254,8 @@ def main():
         print(f"\n🎉 ALL DAYS COMPLETED SUCCESSFULLY!")
         print(f"📁 Check the generated CSV files in /data/btc/1sec/ for your Binance BTC/USDT 1-second data (2024-2025)")
 
+    print(f"\n📟 Metrics: {FETCH_METRICS.dump(METRICS_FILE)}")
+    print(f"   Saved to {METRICS_FILE}")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
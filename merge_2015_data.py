@@ -1,6 +1,7 @@
 import csv
 import os
 from datetime import datetime
+from candle_index import write_index
 
 def merge_2015_data():
     # File paths
@@ -69,6 +70,7 @@ def merge_2015_data():
         writer = csv.writer(f)
         writer.writerow(header)  # Write header
         writer.writerows(merged_data)
+    write_index(output_file)
 
     print(f"💾 Saved merged data to: {output_file}")
     print(f"📊 Final file size: {len(merged_data)} candles")
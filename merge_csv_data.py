@@ -1,6 +1,6 @@
-import csv
-from datetime import datetime, timezone
 import sys
+from candle_csv import read_rows, merge_rows, write_lines
+from candle_index import write_index
 
 def merge_csv_files(original_file, missing_data_file, output_file):
     """
@@ -8,60 +8,34 @@ def merge_csv_files(original_file, missing_data_file, output_file):
     """
     print(f"📋 Merging {original_file} with {missing_data_file}...")
     
-    all_data = []
-    
     # Read original file
     try:
-        with open(original_file, 'r') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                all_data.append(row)
-        print(f"✅ Read {len(all_data):,} rows from {original_file}")
+        original_rows = read_rows(original_file)
+        print(f"✅ Read {len(original_rows[0]):,} rows from {original_file}")
     except FileNotFoundError:
         print(f"❌ Error: {original_file} not found!")
         return False
     
     # Read missing data file (if it exists)
-    missing_count = 0
+    sources = [original_rows]
     try:
-        with open(missing_data_file, 'r') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                all_data.append(row)
-                missing_count += 1
-        print(f"✅ Read {missing_count:,} rows from {missing_data_file}")
+        missing_rows = read_rows(missing_data_file)
+        sources.append(missing_rows)
+        print(f"✅ Read {len(missing_rows[0]):,} rows from {missing_data_file}")
     except FileNotFoundError:
         print(f"⚠️  Missing data file {missing_data_file} not found - using original data only")
     
-    # Sort by unix timestamp
-    all_data.sort(key=lambda x: int(x['unix_timestamp']))
-    
-    # Remove duplicates (keep first occurrence)
-    seen_timestamps = set()
-    unique_data = []
-    duplicates_removed = 0
-    
-    for row in all_data:
-        timestamp = int(row['unix_timestamp'])
-        if timestamp not in seen_timestamps:
-            seen_timestamps.add(timestamp)
-            unique_data.append(row)
-        else:
-            duplicates_removed += 1
+    # Sort by unix timestamp and remove duplicates (keep first occurrence)
+    unique_lines, duplicates_removed = merge_rows(*sources)
     
     if duplicates_removed > 0:
         print(f"🧹 Removed {duplicates_removed} duplicate timestamps")
     
     # Write merged file
-    with open(output_file, 'w', newline='') as csvfile:
-        fieldnames = ['timestamp', 'open', 'close', 'volume', 'unix_timestamp', 'high', 'low']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        
-        for row in unique_data:
-            writer.writerow(row)
+    write_lines(output_file, unique_lines)
+    write_index(output_file)
     
-    print(f"💾 Saved {len(unique_data):,} rows to {output_file}")
+    print(f"💾 Saved {len(unique_lines):,} rows to {output_file}")
     return True
 
 def main():
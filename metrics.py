@@ -0,0 +1,189 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Default latency buckets in seconds (Prometheus client defaults)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(f'{key}="{value}"' for key, value in labels)
+    return '{' + pairs + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+class Counter:
+    """Monotonically increasing value, optionally split by labels"""
+    kind = 'counter'
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def total(self):
+        with self._lock:
+            return sum(self._values.values())
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in sorted(self._values.items())]
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram:
+    """Cumulative bucketed observations with sum and count"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][i] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        with self._lock:
+            state = self._values.get(tuple(sorted(labels.items())))
+            return state['count'] if state else 0
+
+    def total_count(self):
+        with self._lock:
+            return sum(state['count'] for state in self._values.values())
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state['counts']):
+                    cumulative += count
+                    samples.append((f'{self.name}_bucket', key + (('le', _format_value(float(bound))),), cumulative))
+                samples.append((f'{self.name}_sum', key, state['sum']))
+                samples.append((f'{self.name}_count', key, state['count']))
+        return samples
+
+class MetricsRegistry:
+    """Holds the metrics of one process and renders them in Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self.started_at = time.time()
+
+    def _register(self, cls, name, documentation, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, **kwargs)
+            return metric
+
+    def counter(self, name, documentation):
+        return self._register(Counter, name, documentation)
+
+    def gauge(self, name, documentation):
+        return self._register(Gauge, name, documentation)
+
+    def histogram(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, buckets=buckets)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, filename):
+        """Write a Prometheus textfile-collector compatible snapshot"""
+        with open(filename, 'w') as f:
+            f.write(self.render())
+        return filename
+
+REGISTRY = MetricsRegistry()
+
+class FetchMetrics:
+    """Standard metrics for the batch fetchers, dumped to a .prom file at the end of a run"""
+
+    def __init__(self, registry=REGISTRY):
+        self.registry = registry
+        self.request_latency = registry.histogram('fetch_request_duration_seconds', 'Exchange API request latency by source')
+        self.responses = registry.counter('fetch_responses_total', 'Exchange API responses by source and status')
+        self.rate_limited = registry.counter('fetch_rate_limited_total', 'HTTP 429 responses by source')
+        self.candles = registry.counter('fetch_candles_total', 'Candles fetched and written')
+        self.candles_per_second = registry.gauge('fetch_candles_per_second', 'Average candle throughput over the run')
+        self.queue_depth = registry.gauge('fetch_queue_depth', 'Work items submitted but not yet completed')
+        self.started_at = time.perf_counter()
+
+    def time_request(self, source):
+        return self.request_latency.time(source=source)
+
+    def record_response(self, source, status_code):
+        self.responses.inc(source=source, status=str(status_code))
+        if status_code == 429:
+            self.rate_limited.inc(source=source)
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started_at
+        candles = self.candles.total()
+        rate = candles / elapsed if elapsed > 0 else 0.0
+        self.candles_per_second.set(rate)
+        requests = self.request_latency.total_count()
+        return (f"{requests:,} requests | {self.rate_limited.total():,} rate limited | "
+                f"{candles:,} candles in {elapsed:.1f}s ({rate:,.0f} candles/s)")
+
+    def dump(self, filename):
+        summary = self.summary()
+        self.registry.dump(filename)
+        return summary
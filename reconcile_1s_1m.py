@@ -0,0 +1,155 @@
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+import numpy as np
+from bucket_reducer import DAY_SECONDS, REDUCED_COLUMNS, iter_reduced
+from candle_csv import read_candles
+from candle_index import refresh_index
+from candle_store import MAX_TIMESTAMP, MIN_TIMESTAMP, load_range, to_unix
+from data_layout import asset_dir, list_shards
+
+# Rolls the Binance 1-second day files (main2.py) up to 1-minute bars with the
+# shared bucket reducer and compares them minute by minute with the yearly
+# Coinbase/Bitstamp 1-minute files, producing one summary row per day.
+SYMBOL = 'BTCUSD'
+REPORT_FILE = os.path.join(asset_dir(SYMBOL), 'reconcile_1s_1m.csv')
+
+# One process per 1s day file
+WORKERS = os.cpu_count() or 1
+
+# Days beyond either limit are listed at the end of a run
+MAX_CLOSE_DEVIATION_BPS = 50
+MAX_MISSING_MINUTES = 5
+
+REPORT_FIELDS = [
+    'day', 'minutes_1s', 'minutes_1m', 'missing_in_1m', 'missing_in_1s',
+    'mean_close_bps', 'max_close_bps', 'max_high_bps', 'max_low_bps',
+    'volume_ratio', 'median_volume_ratio',
+]
+
+def empty_bars():
+    return {name: np.empty(0, dtype=np.int64 if name == 'unix_timestamp' else np.float64)
+            for name in REDUCED_COLUMNS}
+
+def rollup_seconds(day_file):
+    """1-minute bars of one 1s day file (read whole: a day is at most 86,400 rows)"""
+    columns = read_candles(day_file)
+    if not np.all(np.diff(columns['unix_timestamp']) > 0):
+        order = np.argsort(columns['unix_timestamp'], kind='stable')
+        columns = {name: values[order] for name, values in columns.items()}
+    parts = list(iter_reduced([columns], 60))
+    if not parts:
+        return empty_bars()
+    return {name: np.concatenate([part[name] for part in parts]) for name in REDUCED_COLUMNS}
+
+def minute_bars(day_start):
+    """
+    Stored 1-minute bars of one day, read through the yearly file's index.
+    The yearly files are not guaranteed duplicate-free, so bars are sorted and
+    only the first row of each timestamp is kept.
+    """
+    columns = load_range(SYMBOL, '1m', day_start, day_start + DAY_SECONDS)
+    _, first = np.unique(columns['unix_timestamp'], return_index=True)
+    return {name: columns[name][first] for name in REDUCED_COLUMNS}
+
+def deviation_bps(values, reference):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.abs(values - reference) / reference * 1e4
+
+def _stat(function, values):
+    return round(float(function(values)), 4) if len(values) else float('nan')
+
+def reconcile_day(shard):
+    """Summary row comparing one 1s day file with the 1m series"""
+    day_start, _, day_file = shard
+    seconds = rollup_seconds(day_file)
+    minutes = minute_bars(day_start)
+    # Both sides hold one bar per minute: the rollup by construction, the 1m bars after minute_bars()
+    common, i, j = np.intersect1d(seconds['unix_timestamp'], minutes['unix_timestamp'],
+                                  assume_unique=True, return_indices=True)
+
+    close_bps = deviation_bps(seconds['close'][i], minutes['close'][j])
+    volume_1s = seconds['volume'][i]
+    volume_1m = minutes['volume'][j]
+    traded = volume_1m > 0
+    total_1m = volume_1m.sum()
+    return {
+        'day': datetime.fromtimestamp(day_start, timezone.utc).strftime('%Y-%m-%d'),
+        'minutes_1s': len(seconds['unix_timestamp']),
+        'minutes_1m': len(minutes['unix_timestamp']),
+        'missing_in_1m': len(seconds['unix_timestamp']) - len(common),
+        'missing_in_1s': len(minutes['unix_timestamp']) - len(common),
+        'mean_close_bps': _stat(np.mean, close_bps),
+        'max_close_bps': _stat(np.max, close_bps),
+        'max_high_bps': _stat(np.max, deviation_bps(seconds['high'][i], minutes['high'][j])),
+        'max_low_bps': _stat(np.max, deviation_bps(seconds['low'][i], minutes['low'][j])),
+        'volume_ratio': round(float(volume_1s.sum() / total_1m), 4) if total_1m > 0 else float('nan'),
+        'median_volume_ratio': _stat(np.median, volume_1s[traded] / volume_1m[traded]),
+    }
+
+def flagged(row):
+    return (row['max_close_bps'] > MAX_CLOSE_DEVIATION_BPS
+            or row['missing_in_1m'] > MAX_MISSING_MINUTES
+            or row['missing_in_1s'] > MAX_MISSING_MINUTES)
+
+def reconcile(start=None, end=None, workers=WORKERS, output=REPORT_FILE):
+    """Reconcile every 1s day file in [start, end) and write the per-day report"""
+    start_ts = to_unix(start, MIN_TIMESTAMP)
+    end_ts = to_unix(end, MAX_TIMESTAMP)
+    shards = [shard for shard in list_shards(SYMBOL, '1s')
+              if shard[0] is not None and shard[0] < end_ts and shard[1] > start_ts]
+    if not shards:
+        print("⚠️  No 1-second day files in range")
+        return []
+
+    # Index the yearly 1m files once here, not lazily in every worker
+    for shard_start, shard_end, minute_file in list_shards(SYMBOL, '1m'):
+        if shard_start is None or (shard_start < shards[-1][1] and shard_end > shards[0][0]):
+            refresh_index(minute_file)
+
+    print(f"🔍 Reconciling {len(shards)} days of 1s candles against the 1m series...")
+    started = time.time()
+    if workers > 1 and len(shards) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rows = list(executor.map(reconcile_day, shards, chunksize=8))
+    else:
+        rows = [reconcile_day(shard) for shard in shards]
+
+    with open(output, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    bad_days = [row for row in rows if flagged(row)]
+    missing_1m = sum(row['missing_in_1m'] for row in rows)
+    missing_1s = sum(row['missing_in_1s'] for row in rows)
+    print(f"💾 {len(rows)} day summaries written to {output} in {time.time() - started:.1f}s")
+    print(f"   Minutes missing from 1m: {missing_1m:,} | missing from 1s: {missing_1s:,}")
+    if bad_days:
+        print(f"⚠️  {len(bad_days)} days exceed {MAX_CLOSE_DEVIATION_BPS} bps or {MAX_MISSING_MINUTES} missing minutes:")
+        for row in bad_days[:20]:
+            print(f"   {row['day']}: max close {row['max_close_bps']} bps, "
+                  f"missing 1m {row['missing_in_1m']}, missing 1s {row['missing_in_1s']}")
+        if len(bad_days) > 20:
+            print(f"   ... and {len(bad_days) - 20} more")
+    else:
+        print("✅ All days within tolerance")
+    return rows
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    workers = WORKERS
+    if '--workers' in args:
+        position = args.index('--workers')
+        value = args[position + 1] if position + 1 < len(args) else ''
+        if not value.isdigit() or int(value) < 1:
+            print("Usage: python reconcile_1s_1m.py [start] [end] [--workers N]")
+            sys.exit(1)
+        workers = int(value)
+        del args[position:position + 2]
+    start = args[0] if len(args) > 0 else None
+    end = args[1] if len(args) > 1 else None
+    reconcile(start, end, workers)
@@ -0,0 +1,204 @@
+import hashlib
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from candle_csv import read_candles
+from data_layout import list_shards
+
+# Derived series materialized next to each candle shard (<file>.csv.stats.npz):
+# simple and log returns, rolling std of log returns and EMAs of the close.
+# Windows count candles, not wall-clock time. Each file also stores the state
+# the online updates need (previous close, EMA values, the last log returns), so
+# candles appended to a shard extend its stats without recomputing the history,
+# and each shard starts from the final state of the one before it.
+STATS_EXTENSION = '.stats.npz'
+STATS_VERSION = 1
+
+# Rolling std windows and EMA spans, in candles
+STD_WINDOWS = [60, 1440]
+EMA_SPANS = [20, 200]
+
+# Bytes before the previous end of file compared to recognise an append
+TAIL_CHECK_BYTES = 4096
+
+def stats_path(csv_path):
+    return csv_path + STATS_EXTENSION
+
+def stat_columns(std_windows=STD_WINDOWS, ema_spans=EMA_SPANS):
+    return (['return', 'log_return']
+            + [f'std_{window}' for window in std_windows]
+            + [f'ema_{span}' for span in ema_spans])
+
+def empty_state(std_windows=STD_WINDOWS, ema_spans=EMA_SPANS):
+    return {
+        'prev_close': np.array(np.nan),
+        'ema': np.full(len(ema_spans), np.nan),
+        'tail': np.empty(0),
+    }
+
+def _same_state(a, b):
+    return all(np.array_equal(a[name], b[name], equal_nan=True) for name in ('prev_close', 'ema', 'tail'))
+
+def compute_stats(close, state, std_windows=STD_WINDOWS, ema_spans=EMA_SPANS):
+    """
+    Stats for the closes that follow `state`. Returns (columns, new state); the
+    result is the same as computing over the whole history in one go.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    previous = np.concatenate([[state['prev_close']], close[:-1]])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = close / previous
+        log_returns = np.log(ratio)
+    columns = {'return': ratio - 1, 'log_return': log_returns}
+
+    tail = state['tail']
+    history = pd.Series(np.concatenate([tail, log_returns]))
+    for window in std_windows:
+        columns[f'std_{window}'] = history.rolling(window).std().to_numpy()[len(tail):]
+
+    ema_state = np.empty(len(ema_spans))
+    for i, span in enumerate(ema_spans):
+        # With adjust=False, ewm applies y[i] = (1 - a) * y[i-1] + a * x[i], seeded with the carried EMA
+        series = pd.Series(np.concatenate([[state['ema'][i]], close]))
+        values = series.ewm(span=span, adjust=False).mean().to_numpy()[1:]
+        columns[f'ema_{span}'] = values
+        ema_state[i] = values[-1] if len(values) else state['ema'][i]
+
+    keep = max(std_windows, default=1) - 1
+    new_state = {
+        'prev_close': np.array(close[-1] if len(close) else state['prev_close']),
+        'ema': ema_state,
+        'tail': history.to_numpy()[len(history) - keep:] if keep else np.empty(0),
+    }
+    return columns, new_state
+
+def _tail_digest(f, end):
+    f.seek(max(end - TAIL_CHECK_BYTES, 0))
+    return hashlib.sha256(f.read(min(end, TAIL_CHECK_BYTES))).hexdigest()
+
+def _sorted(columns):
+    unix = columns['unix_timestamp']
+    if np.all(np.diff(unix) > 0):
+        return columns
+    order = np.argsort(unix, kind='stable')
+    return {name: values[order] for name, values in columns.items()}
+
+def _read_stored(path):
+    try:
+        with np.load(path) as stored:
+            return {name: stored[name] for name in stored.files}
+    except (OSError, ValueError):
+        return None
+
+def _config(std_windows, ema_spans):
+    return np.array([STATS_VERSION, len(std_windows)] + list(std_windows) + list(ema_spans), dtype=np.int64)
+
+def _save(csv_path, stored):
+    path = stats_path(csv_path)
+    temp_path = path + '.tmp.npz'
+    np.savez(temp_path, **stored)
+    os.replace(temp_path, path)
+
+def update_file(csv_path, seed, std_windows=STD_WINDOWS, ema_spans=EMA_SPANS):
+    """
+    Bring one shard's stats up to date, starting from `seed` (the previous
+    shard's final state). Returns (action, final state) with action one of
+    'fresh', 'appended' or 'rebuilt'.
+    """
+    stat = os.stat(csv_path)
+    config = _config(std_windows, ema_spans)
+    stored = _read_stored(stats_path(csv_path))
+    usable = (stored is not None
+              and np.array_equal(stored['config'], config)
+              and _same_state(seed, {name: stored['seed_' + name] for name in ('prev_close', 'ema', 'tail')}))
+
+    names = stat_columns(std_windows, ema_spans)
+    if usable:
+        state = {name: stored['state_' + name] for name in ('prev_close', 'ema', 'tail')}
+        if int(stored['size']) == stat.st_size and int(stored['mtime_ns']) == stat.st_mtime_ns:
+            return 'fresh', state
+        old_size = int(stored['size'])
+        if stat.st_size > old_size:
+            with open(csv_path, 'rb') as f:
+                if _tail_digest(f, old_size) == str(stored['tail_digest']):
+                    f.seek(old_size)
+                    added = _sorted(read_candles(f.read(), skip_header=False))
+                    unix = stored['unix_timestamp']
+                    if not len(unix) or not len(added['unix_timestamp']) or added['unix_timestamp'][0] > unix[-1]:
+                        columns, state = compute_stats(added['close'], state, std_windows, ema_spans)
+                        stored['unix_timestamp'] = np.concatenate([unix, added['unix_timestamp']])
+                        for name in names:
+                            stored[name] = np.concatenate([stored[name], columns[name]])
+                        _finish(csv_path, stored, state, f, stat)
+                        return 'appended', state
+
+    candles = _sorted(read_candles(csv_path))
+    columns, state = compute_stats(candles['close'], seed, std_windows, ema_spans)
+    stored = {'config': config, 'unix_timestamp': candles['unix_timestamp'], **columns}
+    for name in ('prev_close', 'ema', 'tail'):
+        stored['seed_' + name] = seed[name]
+    with open(csv_path, 'rb') as f:
+        _finish(csv_path, stored, state, f, stat)
+    return 'rebuilt', state
+
+def _finish(csv_path, stored, state, f, stat):
+    for name, value in state.items():
+        stored['state_' + name] = value
+    stored['size'] = np.array(stat.st_size)
+    stored['mtime_ns'] = np.array(stat.st_mtime_ns)
+    stored['tail_digest'] = np.array(_tail_digest(f, stat.st_size))
+    _save(csv_path, stored)
+
+def update_stats(symbol, interval, std_windows=STD_WINDOWS, ema_spans=EMA_SPANS):
+    """Update the stats of every shard of an interval in time order; returns the action counts"""
+    state = empty_state(std_windows, ema_spans)
+    counts = {'fresh': 0, 'appended': 0, 'rebuilt': 0}
+    for _, _, csv_path in list_shards(symbol, interval):
+        action, state = update_file(csv_path, state, std_windows, ema_spans)
+        counts[action] += 1
+    return counts
+
+def load_stats(csv_path):
+    """
+    Stats columns (plus unix_timestamp) of a shard, or None when they are
+    missing or older than the shard.
+    """
+    stored = _read_stored(stats_path(csv_path))
+    if stored is None:
+        return None
+    stat = os.stat(csv_path)
+    if int(stored['size']) != stat.st_size or int(stored['mtime_ns']) != stat.st_mtime_ns:
+        return None
+    return {name: stored[name] for name in ['unix_timestamp'] + _stored_stat_names(stored)}
+
+def _stored_stat_names(stored):
+    config = stored['config']
+    std_count = int(config[1])
+    return stat_columns(config[2:2 + std_count].tolist(), config[2 + std_count:].tolist())
+
+def join_stats(columns, stats):
+    """Add the stats rows matching a candle chunk's timestamps to the chunk"""
+    rows = np.searchsorted(stats['unix_timestamp'], columns['unix_timestamp'])
+    joined = dict(columns)
+    for name, values in stats.items():
+        if name != 'unix_timestamp':
+            joined[name] = values[rows]
+    return joined
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: python rolling_stats.py <symbol> <interval>")
+        print("Example: python rolling_stats.py BTCUSD 1m")
+        sys.exit(1)
+
+    symbol, interval = sys.argv[1], sys.argv[2]
+    started = time.time()
+    counts = update_stats(symbol, interval)
+    print(f"📈 {symbol} {interval} stats ({', '.join(stat_columns())}): "
+          f"{counts['rebuilt']} rebuilt, {counts['appended']} appended, {counts['fresh']} up to date "
+          f"in {time.time() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+import hashlib
+import os
+import re
+import sys
+from collections import OrderedDict
+from datetime import datetime, timezone
+import numpy as np
+from bucket_reducer import DAY_SECONDS, REDUCED_COLUMNS, iter_reduced
+from candle_csv import CANDLE_COLUMNS, write_candles
+from candle_store import MAX_TIMESTAMP, MIN_TIMESTAMP, load_candles, load_range, to_unix
+from data_layout import DATA_DIR, INTERVAL_SECONDS, list_shards
+
+# Rollups to arbitrary steps (15m, 4h, 3d, ...) built on demand from the
+# coarsest stored or cached level whose step divides the requested one, so 4h
+# is built from 1h and 15m from 5m rather than from the 1m history. Results are
+# kept in a small in-process LRU and in an on-disk LRU cache; both are keyed on
+# the size/mtime of the stored files they were derived from, so a changed
+# source invalidates them.
+CACHE_DIR = os.path.join(DATA_DIR, 'cache', 'rollups')
+CACHE_EXTENSION = '.npz'
+
+# Rollups kept in memory per registry, and total size of the on-disk cache
+MEMORY_ENTRIES = 8
+DISK_CACHE_BYTES = 1 << 30
+
+UNIT_SECONDS = {'w': 7 * DAY_SECONDS, 'd': DAY_SECONDS, 'h': 3600, 'm': 60, 's': 1}
+WEEK_SECONDS = UNIT_SECONDS['w']
+
+# Week buckets start on Monday (1970-01-05) and are labelled with their last day,
+# like the pandas 'W' bars in data/btc/weekly
+WEEK_OFFSET = 4 * DAY_SECONDS
+
+_INTERVAL_PATTERN = re.compile(r'^(\d+)([smhdw])$')
+
+def parse_interval(interval):
+    """Step in seconds for an interval label such as '15m', '4h', '3d' or '2w'"""
+    match = _INTERVAL_PATTERN.match(interval.strip().lower())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"invalid interval {interval!r}, expected e.g. '15m', '4h', '3d'")
+    return int(match.group(1)) * UNIT_SECONDS[match.group(2)]
+
+def interval_label(seconds):
+    """Canonical label for a step, using the largest whole unit ('60m' -> '1h')"""
+    for unit, unit_seconds in UNIT_SECONDS.items():
+        if seconds % unit_seconds == 0:
+            return f'{seconds // unit_seconds}{unit}'
+
+def bucket_layout(seconds):
+    """(step, offset, label_shift) of the buckets for a step"""
+    if seconds % WEEK_SECONDS == 0:
+        return seconds, WEEK_OFFSET, seconds - DAY_SECONDS
+    return seconds, 0, 0
+
+def compatible(source_seconds, target_seconds):
+    """True if every target bucket is a union of whole source buckets"""
+    if source_seconds >= target_seconds or target_seconds % source_seconds:
+        return False
+    _, source_offset, _ = bucket_layout(source_seconds)
+    _, target_offset, _ = bucket_layout(target_seconds)
+    return (target_offset - source_offset) % source_seconds == 0
+
+def stored_fingerprint(symbol, interval):
+    """Hash of the path, size and mtime of every stored shard of an interval (None if there are none)"""
+    digest = hashlib.sha256()
+    shards = list_shards(symbol, interval)
+    if not shards:
+        return None
+    for _, _, path in shards:
+        stat = os.stat(path)
+        digest.update(f'{path}|{stat.st_size}|{stat.st_mtime_ns}\n'.encode())
+    return digest.hexdigest()
+
+def cache_path(symbol, label, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, f'{symbol}_{label}{CACHE_EXTENSION}')
+
+def _filter_range(columns, start_ts, end_ts):
+    unix = columns['unix_timestamp']
+    lo, hi = np.searchsorted(unix, [start_ts, end_ts])
+    return {name: values[lo:hi] for name, values in columns.items()}
+
+class RollupRegistry:
+    """
+    Builds and caches rollups of stored candles.
+    registry.get('BTCUSD', '4h', '2021', '2022') returns typed columns
+    (unix_timestamp/open/high/low/close/volume) for the requested range.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, memory_entries=MEMORY_ENTRIES, disk_bytes=DISK_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.memory_entries = memory_entries
+        self.disk_bytes = disk_bytes
+        # (symbol, label) -> (root interval, fingerprint, columns), least recently used first
+        self.memory = OrderedDict()
+        self.hits = {'memory': 0, 'disk': 0, 'built': 0}
+
+    def get(self, symbol, interval, start=None, end=None):
+        seconds = parse_interval(interval)
+        label = interval_label(seconds)
+        start_ts = to_unix(start, MIN_TIMESTAMP)
+        end_ts = to_unix(end, MAX_TIMESTAMP)
+        if label in INTERVAL_SECONDS and list_shards(symbol, label):
+            # Stored interval: read just the range through the index
+            columns = load_range(symbol, label, start_ts, end_ts)
+            return {name: columns[name] for name in REDUCED_COLUMNS}
+        return _filter_range(self.series(symbol, seconds), start_ts, end_ts)
+
+    def series(self, symbol, seconds):
+        """Whole rollup for a step that is not stored, from memory, disk or a fresh build"""
+        label = interval_label(seconds)
+        cached = self._cached(symbol, label)
+        if cached is not None:
+            return cached
+        self.hits['built'] += 1
+        root, fingerprint, columns = self._build(symbol, seconds)
+        self._remember(symbol, label, root, fingerprint, columns)
+        self._store(symbol, label, root, fingerprint, columns)
+        return columns
+
+    def _cached(self, symbol, label):
+        key = (symbol, label)
+        if key in self.memory:
+            root, fingerprint, columns = self.memory[key]
+            if stored_fingerprint(symbol, root) == fingerprint:
+                self.memory.move_to_end(key)
+                self.hits['memory'] += 1
+                return columns
+            del self.memory[key]
+
+        path = cache_path(symbol, label, self.cache_dir)
+        try:
+            with np.load(path) as stored:
+                root, fingerprint = str(stored['root']), str(stored['fingerprint'])
+                if stored_fingerprint(symbol, root) != fingerprint:
+                    return None
+                columns = {name: stored[name] for name in REDUCED_COLUMNS}
+        except (OSError, KeyError, ValueError):
+            return None
+        # Bump the file's mtime: disk eviction drops the least recently used entries
+        os.utime(path)
+        self.hits['disk'] += 1
+        self._remember(symbol, label, root, fingerprint, columns)
+        return columns
+
+    def _sources(self, symbol, seconds):
+        """Compatible levels for a step as (seconds, label, stored), coarsest first"""
+        levels = {}
+        for label, source_seconds in INTERVAL_SECONDS.items():
+            if compatible(source_seconds, seconds) and list_shards(symbol, label):
+                levels[source_seconds] = (source_seconds, label, True)
+        cached = [label for cached_symbol, label in self.memory if cached_symbol == symbol]
+        if os.path.isdir(self.cache_dir):
+            prefix = f'{symbol}_'
+            cached += [name[len(prefix):-len(CACHE_EXTENSION)] for name in os.listdir(self.cache_dir)
+                       if name.startswith(prefix) and name.endswith(CACHE_EXTENSION)]
+        for label in cached:
+            try:
+                source_seconds = parse_interval(label)
+            except ValueError:
+                continue
+            if compatible(source_seconds, seconds) and source_seconds not in levels:
+                levels[source_seconds] = (source_seconds, label, False)
+        return sorted(levels.values(), reverse=True)
+
+    def _build(self, symbol, seconds):
+        step, offset, label_shift = bucket_layout(seconds)
+        for source_seconds, label, stored in self._sources(symbol, seconds):
+            if stored:
+                root, chunks = label, load_candles(symbol, label)
+            else:
+                columns = self._cached(symbol, label)
+                if columns is None:
+                    continue
+                root = self.memory[(symbol, label)][0]
+                chunks = [columns]
+            fingerprint = stored_fingerprint(symbol, root)
+            print(f"🧮 Building {symbol} {interval_label(seconds)} from {label}")
+            parts = list(iter_reduced(chunks, step, offset, label_shift))
+            if not parts:
+                raise ValueError(f"no {symbol} {label} candles to roll up")
+            columns = {name: np.concatenate([part[name] for part in parts]) for name in REDUCED_COLUMNS}
+            return root, fingerprint, columns
+        raise ValueError(f"no stored {symbol} interval divides {interval_label(seconds)}")
+
+    def _remember(self, symbol, label, root, fingerprint, columns):
+        key = (symbol, label)
+        self.memory[key] = (root, fingerprint, columns)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def _store(self, symbol, label, root, fingerprint, columns):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = cache_path(symbol, label, self.cache_dir)
+        temp_path = path + '.tmp' + CACHE_EXTENSION
+        np.savez(temp_path, root=np.array(root), fingerprint=np.array(fingerprint), **columns)
+        os.replace(temp_path, path)
+        self.evict(keep=path)
+
+    def evict(self, keep=None):
+        """Delete least recently used cache files until the cache fits in disk_bytes"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(CACHE_EXTENSION) and path != keep:
+                stat = os.stat(path)
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        if keep is not None and os.path.exists(keep):
+            total += os.path.getsize(keep)
+        for _, size, path in sorted(entries):
+            if total <= self.disk_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+_registry = None
+
+def get_rollup(symbol, interval, start=None, end=None):
+    """Rollup columns through a shared module-level registry"""
+    global _registry
+    if _registry is None:
+        _registry = RollupRegistry()
+    return _registry.get(symbol, interval, start, end)
+
+def main():
+    args = sys.argv[1:]
+    output = None
+    if '--output' in args:
+        position = args.index('--output')
+        output = args[position + 1]
+        del args[position:position + 2]
+    if len(args) < 2:
+        print("Usage: python rollup_registry.py <symbol> <interval> [start] [end] [--output file.csv]")
+        print("Example: python rollup_registry.py BTCUSD 4h 2021 2022")
+        sys.exit(1)
+
+    symbol, interval = args[0], args[1]
+    start = args[2] if len(args) > 2 else None
+    end = args[3] if len(args) > 3 else None
+    columns = get_rollup(symbol, interval, start, end)
+
+    unix = columns['unix_timestamp']
+    if not len(unix):
+        print(f"⚠️  No {symbol} {interval} candles in range")
+        return
+    first_time = datetime.fromtimestamp(int(unix[0]), timezone.utc)
+    last_time = datetime.fromtimestamp(int(unix[-1]), timezone.utc)
+    print(f"📊 {symbol} {interval}: {len(unix):,} candles | {first_time} → {last_time}")
+    if output:
+        rows = write_candles(output, [{name: columns[name] for name in CANDLE_COLUMNS}])
+        print(f"💾 {rows:,} candles written to {output}")
+
+if __name__ == "__main__":
+    main()
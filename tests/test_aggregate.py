@@ -0,0 +1,58 @@
+import filecmp
+import os
+import shutil
+import numpy as np
+import pytest
+import aggregate_btc_candles
+from candle_csv import write_candles
+
+NEW_YEAR_2022 = 1640995200
+ROLLUP_FOLDERS = ['5min', '30min', 'hourly', 'daily', 'weekly']
+
+def write_year(root, year, start, minutes):
+    """Minute bars for one yearly file, with a few minutes missing"""
+    unix = start + 60 * np.arange(minutes, dtype=np.int64)
+    unix = unix[np.arange(minutes) % 97 != 13]
+    close = 46000 + np.round(np.sin(unix / 5000.0) * 300, 2)
+    write_candles(os.path.join(root, 'data', 'btc', f'BTCUSD_1m_candles_{year}.csv'), [{
+        'unix_timestamp': unix,
+        'open': np.round(close - 1.5, 2),
+        'close': close,
+        'volume': np.round((unix % 7) * 0.25 + 0.01, 8),
+        'high': np.round(close + 2.25, 2),
+        'low': np.round(close - 3.75, 2),
+    }])
+
+def write_minute_years(root):
+    os.makedirs(os.path.join(root, 'data', 'btc'))
+    # Two partial years, so weekly bars straddle New Year
+    write_year(root, 2021, NEW_YEAR_2022 - 20 * 86400, 20 * 1440)
+    write_year(root, 2022, NEW_YEAR_2022, 25 * 1440)
+
+def aggregate(root, monkeypatch, workers):
+    monkeypatch.chdir(root)
+    monkeypatch.setattr(aggregate_btc_candles, 'EXPORT_PARQUET', False)
+    aggregate_btc_candles.aggregate_all(workers=workers)
+
+def test_serial_and_parallel_outputs_match(tmp_path, monkeypatch):
+    serial, parallel = tmp_path / 'serial', tmp_path / 'parallel'
+    write_minute_years(serial)
+    shutil.copytree(serial, parallel)
+    aggregate(serial, monkeypatch, workers=1)
+    aggregate(parallel, monkeypatch, workers=2)
+
+    for folder in ROLLUP_FOLDERS:
+        names = sorted(name for name in os.listdir(serial / 'data' / 'btc' / folder) if name.endswith('.csv'))
+        assert names == sorted(name for name in os.listdir(parallel / 'data' / 'btc' / folder) if name.endswith('.csv'))
+        _, mismatch, errors = filecmp.cmpfiles(serial / 'data' / 'btc' / folder, parallel / 'data' / 'btc' / folder,
+                                               names, shallow=False)
+        assert not mismatch and not errors, folder
+
+def test_overlapping_minute_files_are_rejected(tmp_path, monkeypatch):
+    write_minute_years(tmp_path)
+    # A 2022 candle left behind in the 2021 file
+    with open(tmp_path / 'data' / 'btc' / 'BTCUSD_1m_candles_2021.csv', 'a', newline='') as f:
+        f.write(f'2022-01-01 01:00:00,46100.0,46101.5,0.3,{NEW_YEAR_2022 + 3600},46102.0,46099.0\r\n')
+    for workers in (1, 2):
+        with pytest.raises(ValueError):
+            aggregate(tmp_path, monkeypatch, workers)
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+from candle_checks import (ContinuityChecker, acceptable_gaps, check_shard, first_row_error, read_shard,
+                           shard_gap_acceptable)
+
+YEAR = 1609459200  # 2021-01-01
+YEAR_2020 = 1577836800
+YEAR_2022 = 1640995200
+DAY = 86400
+HEADER = 'timestamp,open,close,volume,unix_timestamp,high,low\r\n'
+ROWS = [
+    '2021-01-01 00:00:00,28923.63,28961.66,4.12,1609459200,28961.67,28913.12',
+    '2021-01-01 00:01:00,28961.67,29009.91,1.5,1609459260,29017.5,28961.01',
+    '2021-01-01 00:02:00,29009.54,28989.3,0.0,1609459320,29016.71,28973.58',
+    '2021-01-01 00:03:00,28989.3,28982.69,2.25,1609459380,28994.11,28970.0',
+]
+
+def write_rows(tmp_path, rows, header=HEADER):
+    path = tmp_path / 'BTCUSD_1m_candles_2021.csv'
+    path.write_text(header + ''.join(row + '\r\n' for row in rows), newline='')
+    return str(path)
+
+def test_clean_shard(tmp_path):
+    path = write_rows(tmp_path, ROWS)
+    raw, columns = read_shard(path)
+    assert first_row_error(columns, raw) is None
+    assert check_shard(path)['error'] is None
+
+def test_bad_header(tmp_path):
+    with pytest.raises(ValueError, match='header'):
+        read_shard(write_rows(tmp_path, ROWS, header='time,open,close\r\n'))
+
+def test_short_row(tmp_path):
+    rows = ROWS[:2] + ['2021-01-01 00:02:00,29009.54,28989.3'] + ROWS[3:]
+    with pytest.raises(ValueError, match='Row 3 has 3 columns'):
+        read_shard(write_rows(tmp_path, rows))
+
+def test_parse_error_reports_row(tmp_path):
+    rows = ROWS[:3] + [ROWS[3].replace('2.25', 'n/a')]
+    with pytest.raises(ValueError, match='Parse error at row 4'):
+        read_shard(write_rows(tmp_path, rows))
+
+@pytest.mark.parametrize('row, replace, message', [
+    (1, ('29009.91', '-1.0'), 'Invalid price data'),
+    (2, ('29016.71', '29000.0'), 'Invalid OHLC relationship'),
+    (3, ('1609459380', '1609459260'), 'Duplicate timestamp'),
+])
+def test_row_checks(tmp_path, row, replace, message):
+    rows = list(ROWS)
+    rows[row] = rows[row].replace(*replace)
+    raw, columns = read_shard(write_rows(tmp_path, rows))
+    error_row, error = first_row_error(columns)
+    assert error_row == row + 1
+    assert error.startswith(message)
+
+def test_timestamp_text_must_match_unix(tmp_path):
+    rows = list(ROWS)
+    rows[2] = rows[2].replace('00:02:00', '00:12:00', 1)
+    raw, columns = read_shard(write_rows(tmp_path, rows))
+    assert first_row_error(columns) is None
+    assert first_row_error(columns, raw) == (3, "Timestamp '2021-01-01 00:12:00' does not match unix_timestamp 1609459320")
+    assert check_shard(write_rows(tmp_path, rows))['error'].endswith('at row 3')
+
+def test_acceptable_gaps_inside_a_file():
+    previous = np.array([YEAR - 60, YEAR - 60, YEAR + 10 * DAY, YEAR + 60])
+    current = np.array([YEAR + 180, YEAR + 600, YEAR + 10 * DAY + 180, YEAR])
+    assert acceptable_gaps(previous, current).tolist() == [True, False, False, False]
+
+def test_shard_gap_at_start_of_year():
+    assert shard_gap_acceptable(YEAR - 60, YEAR + 120, YEAR)
+    # Up to the tolerance, but no further
+    assert shard_gap_acceptable(YEAR - 60, YEAR + 300, YEAR)
+    assert not shard_gap_acceptable(YEAR - 60, YEAR + 360, YEAR)
+
+def test_shard_gap_overlap_and_contiguous():
+    assert not shard_gap_acceptable(YEAR + 60, YEAR, YEAR)
+    assert not shard_gap_acceptable(YEAR, YEAR, YEAR)
+    assert not shard_gap_acceptable(YEAR - 60, YEAR, YEAR)
+
+def test_shard_gap_away_from_shard_start():
+    # A small hole that does not end at the start of the next file
+    middle = YEAR + 100 * DAY
+    assert not shard_gap_acceptable(middle - 60, middle + 120, YEAR)
+    assert not shard_gap_acceptable(middle - 60, middle + 120)
+
+def test_shard_gap_between_day_files():
+    day = YEAR + 40 * DAY
+    assert shard_gap_acceptable(day - 1, day + 100, day, step=1)
+    assert not shard_gap_acceptable(day - 1, day + 100, day - DAY, step=1)
+
+def test_checker_shard_boundaries():
+    checker = ContinuityChecker()
+    checker.start_shard(YEAR_2020)
+    checker.feed(np.arange(YEAR - 600, YEAR - 120, 60))
+    checker.start_shard(YEAR)
+    checker.feed(np.arange(YEAR + 120, YEAR + 600, 60))
+    assert (checker.acceptable, checker.problems) == (1, 0)
+
+    checker.start_shard(YEAR_2022)
+    checker.feed(np.arange(YEAR + 540, YEAR + 900, 60))
+    assert checker.problems == 1
+    assert checker.problem_examples == [(YEAR + 540, YEAR + 540)]
+
+def test_checker_gap_between_chunks_of_one_shard():
+    checker = ContinuityChecker()
+    checker.start_shard(YEAR)
+    checker.feed(np.arange(YEAR, YEAR + 3600, 60))
+    checker.feed(np.arange(YEAR + 3900, YEAR + 7200, 60))
+    assert (checker.rows, checker.problems, checker.acceptable) == (115, 1, 0)
+    assert (checker.first, checker.last) == (YEAR, YEAR + 7140)
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+import candle_codec
+from candle_codec import (COMPRESSION_NONE, COMPRESSION_ZLIB, CODEC_COLUMNS, read_encoded,
+                          unzigzag, varint_decode, varint_encode, write_encoded, zigzag)
+
+def second_candles(count=3000):
+    """One-second candles whose closes move by a few ticks, as in data/btc/1sec"""
+    ticks = np.resize([1, 0, 0, -2, 3, 0, -1, 1, 0, -1], count)
+    close = (11368202 + np.cumsum(ticks)) / 100
+    return {
+        'unix_timestamp': 1758672000 + np.arange(count, dtype=np.int64),
+        'open': np.concatenate([[close[0]], close[:-1]]),
+        'high': close + 0.01,
+        'low': close - 0.02,
+        'close': close,
+        'volume': np.resize([0.0, 0.00012, 1.92657814, 0.5, 0.0], count),
+    }
+
+def test_zigzag_round_trip():
+    values = np.array([0, 1, -1, 2, -2, 2**62, -2**62, 2**63 - 1, -2**63], dtype=np.int64)
+    assert np.array_equal(unzigzag(zigzag(values)), values)
+
+def test_varint_round_trip():
+    values = np.array([0, 1, 127, 128, 300, 2**35, 2**64 - 1], dtype=np.uint64)
+    assert np.array_equal(varint_decode(varint_encode(values)), values)
+    assert varint_encode([]) == b''
+    assert len(varint_decode(b'')) == 0
+
+def test_varint_truncated():
+    with pytest.raises(ValueError):
+        varint_decode(varint_encode([2**20])[:-1])
+
+@pytest.mark.parametrize('compression', [COMPRESSION_NONE, COMPRESSION_ZLIB])
+def test_file_round_trip(tmp_path, compression):
+    candles = second_candles()
+    path = str(tmp_path / 'candles.cndz')
+    rows, _ = write_encoded(path, [candles], compression=compression, block_rows=1024)
+    assert rows == len(candles['unix_timestamp'])
+    decoded = read_encoded(path)
+    for name in CODEC_COLUMNS:
+        assert np.array_equal(decoded[name], candles[name]), name
+
+def test_float_fallback_round_trip(tmp_path):
+    # Float noise has no lossless fixed-point scale, so the column is stored as raw float64
+    candles = second_candles(500)
+    candles['close'] = candles['close'] + 1e-9 / 3
+    path = str(tmp_path / 'noisy.cndz')
+    write_encoded(path, [candles], compression=COMPRESSION_ZLIB)
+    assert np.array_equal(read_encoded(path)['close'], candles['close'])
+
+def test_empty_file(tmp_path):
+    path = str(tmp_path / 'empty.cndz')
+    write_encoded(path, [], compression=COMPRESSION_ZLIB)
+    decoded = read_encoded(path)
+    assert all(len(decoded[name]) == 0 for name in CODEC_COLUMNS)
+    assert decoded['unix_timestamp'].dtype == np.int64
+
+def test_bad_magic(tmp_path):
+    path = tmp_path / 'bogus.cndz'
+    path.write_bytes(b'XXXX' + bytes(4))
+    with pytest.raises(ValueError):
+        read_encoded(str(path))
+
+def test_zstd_requires_zstandard(monkeypatch):
+    monkeypatch.setattr(candle_codec, 'zstandard', None)
+    with pytest.raises(RuntimeError):
+        candle_codec.encode_block(second_candles(10), candle_codec.COMPRESSION_ZSTD)
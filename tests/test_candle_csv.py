@@ -0,0 +1,75 @@
+import csv
+import io
+from datetime import datetime, timezone
+import numpy as np
+from candle_csv import (CANDLE_FIELDS, format_timestamps, merge_rows, read_candles, read_rows,
+                        read_timestamps, write_candles)
+
+SAMPLE = (
+    'timestamp,open,close,volume,unix_timestamp,high,low\r\n'
+    '2021-01-01 00:00:00,28923.63,28961.66,4.12,1609459200,28961.67,28913.12\r\n'
+    '2021-01-01 00:01:00,28961.67,29009.91,1.9265781400000002,1609459260,29017.5,28961.01\r\n'
+    '\r\n'
+    '2021-01-01 00:02:00,29009.54,28989.3,0.0,1609459320,29016.71,28973.58\r\n'
+)
+
+def test_read_candles_typed_columns():
+    columns = read_candles(io.StringIO(SAMPLE))
+    assert columns['unix_timestamp'].dtype == np.int64
+    assert columns['unix_timestamp'].tolist() == [1609459200, 1609459260, 1609459320]
+    assert columns['volume'].tolist() == [4.12, 1.9265781400000002, 0.0]
+    assert columns['low'][1] == 28961.01
+
+def test_read_candles_from_bytes_without_header():
+    body = SAMPLE.split('\r\n', 1)[1].encode('ascii')
+    assert read_timestamps(body, skip_header=False).tolist() == [1609459200, 1609459260, 1609459320]
+
+def test_header_only_file(tmp_path):
+    path = tmp_path / 'empty.csv'
+    path.write_text(','.join(CANDLE_FIELDS) + '\r\n')
+    columns = read_candles(str(path))
+    assert len(columns['close']) == 0 and columns['unix_timestamp'].dtype == np.int64
+
+def test_read_rows_lines_up_with_timestamps(tmp_path):
+    path = tmp_path / 'sample.csv'
+    path.write_text(SAMPLE, newline='')
+    lines, timestamps = read_rows(str(path))
+    assert len(lines) == len(timestamps) == 3
+    assert lines[2].startswith(b'2021-01-01 00:02:00,')
+
+def test_merge_rows_sorts_and_keeps_first():
+    merged, duplicates = merge_rows(([b'b', b'a'], [120, 60]), ([b'a2', b'c'], [60, 180]))
+    assert merged == [b'a', b'b', b'c']
+    assert duplicates == 1
+
+def test_write_candles_matches_dict_writer(tmp_path):
+    rows = [
+        {'unix_timestamp': 1609459200, 'open': 28923.63, 'close': 28961.66, 'volume': 4.12, 'high': 28961.67, 'low': 28913.12},
+        {'unix_timestamp': 1609459260, 'open': 28961.67, 'close': 29009.91, 'volume': 1.9265781400000002, 'high': 29017.5, 'low': 28961.01},
+    ]
+    expected = io.StringIO()
+    writer = csv.DictWriter(expected, fieldnames=CANDLE_FIELDS)
+    writer.writeheader()
+    for row in rows:
+        stamp = datetime.fromtimestamp(row['unix_timestamp'], timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        writer.writerow(dict(row, timestamp=stamp))
+
+    path = tmp_path / 'written.csv'
+    columns = {name: [row[name] for row in rows] for name in rows[0]}
+    assert write_candles(str(path), [columns]) == 2
+    assert path.read_bytes().decode('ascii') == expected.getvalue()
+
+def test_format_timestamps_matches_strftime():
+    unix = np.array([0, 951782399, 951782400, 1709251199, 1758727740])
+    expected = [datetime.fromtimestamp(int(ts), timezone.utc).strftime('%Y-%m-%d %H:%M:%S') for ts in unix]
+    assert format_timestamps(unix) == expected
+
+def test_fix_tool_tolerates_damaged_rows(tmp_path):
+    from fix_all_corrupted_data import read_prices
+    path = tmp_path / 'damaged.csv'
+    path.write_text(SAMPLE.replace('28961.67,29009.91', '28961.67,oops', 1), newline='')
+    lines = path.read_bytes().split(b'\r\n')[1:]
+    lines = [line for line in lines if line]
+    prices, unparseable = read_prices(str(path), lines)
+    assert unparseable.tolist() == [False, True, False]
+    assert prices['close'][2] == 28989.3
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from candle_shard import SHARD_COLUMNS, decode_shard, encode_shard, read_shard, write_shard
+
+START = 1609459200  # 2021-01-01
+
+def minute_candles(count=600):
+    """A dense minute series with cent prices and 8-decimal volumes"""
+    cents = 2900000 + np.cumsum(np.tile([3, -1, 4, -1, -5, 9, -2, 6], count // 8 + 1)[:count])
+    close = cents / 100
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    return {
+        'unix_timestamp': START + 60 * np.arange(count, dtype=np.int64),
+        'open': open_,
+        'close': close,
+        'high': np.maximum(open_, close) + 0.25,
+        'low': np.minimum(open_, close) - 0.25,
+        'volume': np.round((np.arange(count) % 17) * 0.12345678 + 0.5, 8),
+    }
+
+def test_round_trip(tmp_path):
+    candles = minute_candles()
+    path = str(tmp_path / 'candles.cndl')
+    write_shard(path, candles)
+    decoded = read_shard(path)
+    for name in ['unix_timestamp'] + SHARD_COLUMNS:
+        assert np.array_equal(decoded[name], candles[name]), name
+    assert not decoded['synthetic'].any()
+
+def test_synthetic_bitmap():
+    candles = minute_candles()
+    # A forward-filled candle: zero volume and the previous candle's prices
+    for name in ('open', 'high', 'low', 'close'):
+        candles[name][10] = candles[name][9]
+    candles['volume'][10] = 0
+    decoded = decode_shard(encode_shard(candles))
+    assert np.flatnonzero(decoded['synthetic']).tolist() == [10]
+
+def test_wide_values_use_int64():
+    candles = minute_candles()
+    candles['volume'] = np.round(candles['volume'] + 100, 8)
+    decoded = decode_shard(encode_shard(candles))
+    assert np.array_equal(decoded['volume'], candles['volume'])
+
+def test_gap_is_rejected():
+    candles = {name: np.delete(values, 100) for name, values in minute_candles().items()}
+    with pytest.raises(ValueError):
+        encode_shard(candles)
+
+def test_single_candle_needs_step():
+    one = {name: values[:1] for name, values in minute_candles().items()}
+    with pytest.raises(ValueError):
+        encode_shard(one)
+    assert np.array_equal(decode_shard(encode_shard(one, step=60))['close'], one['close'])
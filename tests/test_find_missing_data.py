@@ -0,0 +1,39 @@
+import json
+import numpy as np
+from candle_checks import missing_ranges
+from find_missing_data import count_missing, find_missing_ranges, save_missing_data_info
+
+START = 1514764800  # 2018-01-01
+
+def test_missing_ranges_empty():
+    assert missing_ranges([]).shape == (0, 2)
+    assert missing_ranges([START]).shape == (0, 2)
+
+def test_missing_ranges_continuous():
+    assert missing_ranges(START + 60 * np.arange(100)).shape == (0, 2)
+
+def test_missing_ranges_gaps():
+    unix = np.concatenate([START + 60 * np.arange(10), START + 60 * np.arange(13, 20), [START + 60 * 25]])
+    assert missing_ranges(unix).tolist() == [[START + 600, START + 720], [START + 1200, START + 1440]]
+
+def test_missing_ranges_unsorted_with_duplicates():
+    unix = np.array([START + 180, START, START + 60, START + 60, START + 180])
+    assert missing_ranges(unix).tolist() == [[START + 120, START + 120]]
+
+def test_ranges_file_for_a_long_outage(tmp_path):
+    # Three months missing in the middle of the file become a single range
+    outage = 90 * 1440
+    unix = np.concatenate([START + 60 * np.arange(1440), START + 60 * np.arange(1440 + outage, 2 * 1440 + outage)])
+    path = tmp_path / 'BTCUSD_1m_candles_2018.csv'
+    path.write_text('timestamp,open,close,volume,unix_timestamp,high,low\r\n'
+                    + ''.join(f'x,1.0,1.0,0.0,{ts},1.0,1.0\r\n' for ts in unix.tolist()), newline='')
+
+    ranges = find_missing_ranges(str(path))
+    assert ranges == [(START + 60 * 1440, START + 60 * (1440 + outage - 1))]
+    assert count_missing(ranges) == outage
+
+    with open(save_missing_data_info(str(path), ranges)) as f:
+        saved = json.load(f)
+    assert saved['total_missing_timestamps'] == outage
+    assert saved['total_ranges'] == 1
+    assert saved['ranges'][0]['start_datetime'] == '2018-01-02 00:00:00 UTC'
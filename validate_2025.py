@@ -1,6 +1,7 @@
-import csv
 from datetime import datetime, timezone
 import sys
+import numpy as np
+from candle_csv import read_timestamps
 
 def validate_2025_data(filename, target_end_time):
     """
@@ -8,22 +9,15 @@ def validate_2025_data(filename, target_end_time):
     """
     print(f"🔍 Validating 2025 data in {filename} up to {target_end_time}...")
     
-    timestamps = []
-    row_count = 0
-    
     # Target end timestamp
     target_end_timestamp = int(target_end_time.timestamp())
     
     # Read all timestamps from the CSV
     try:
-        with open(filename, 'r') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                unix_timestamp = int(row['unix_timestamp'])
-                # Only include timestamps up to our target end time
-                if unix_timestamp <= target_end_timestamp:
-                    timestamps.append(unix_timestamp)
-                row_count += 1
+        all_timestamps = read_timestamps(filename)
+        row_count = len(all_timestamps)
+        # Only include timestamps up to our target end time
+        timestamps = all_timestamps[all_timestamps <= target_end_timestamp]
         
         print(f"✓ Read {row_count:,} total rows from {filename}")
         print(f"✓ Found {len(timestamps):,} rows within target range")
@@ -35,12 +29,12 @@ def validate_2025_data(filename, target_end_time):
         print(f"❌ Error reading file: {e}")
         return False
     
-    if not timestamps:
+    if not len(timestamps):
         print("❌ No data found in target range!")
         return False
     
     # Sort timestamps to ensure proper order
-    timestamps.sort()
+    timestamps = np.sort(timestamps).tolist()
     
     # Get actual date range
     start_time = datetime.fromtimestamp(timestamps[0], timezone.utc)
@@ -1,31 +1,105 @@
-import csv
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import sys
-
-def validate_btc_dataset():
+from candle_checks import ACCEPTABLE_GAP_MINUTES, acceptable_gaps, continuity_breaks, first_row_error, read_shard, shard_gap_acceptable
+from data_layout import shard_range
+from dataset_manifest import DatasetManifest
+
+# Manifest check name; years whose file is unchanged since they last passed are not re-parsed
+VALIDATION_CHECK = 'validate_btc_dataset'
+
+EXPECTED_START = {
+    'timestamp': '2011-08-18 12:37:00',
+    'unix': 1313671020,
+    'open': 10.9,
+    'close': 10.9,
+    'volume': 0.48990826,
+    'high': 10.9,
+    'low': 10.9
+}
+
+EXPECTED_END = {
+    'timestamp': '2025-09-24 15:29:00',
+    'unix': 1758727740,
+    'open': 113682.02,
+    'close': 113700.11,
+    'volume': 3.46633664,
+    'high': 113714,
+    'low': 113679.09
+}
+
+def _utc(unix_ts):
+    """Naive UTC datetime, matching the timestamps parsed from the CSV text"""
+    return datetime.fromtimestamp(int(unix_ts), timezone.utc).replace(tzinfo=None)
+
+def validate_year_file(year, filepath):
+    """
+    Parse and check one year file on typed columns.
+    Returns (unix timestamps, number of problematic gaps); the timestamps are
+    None when the file is unreadable or fails a check other than continuity.
+    The year passed when the timestamps are returned and there are no problem gaps.
+    """
+    try:
+        raw, columns = read_shard(filepath)
+    except ValueError as e:
+        print(f"❌ {year}: {e}")
+        return None, 0
+
+    unix = columns['unix_timestamp']
+    if not len(unix):
+        print(f"❌ {year}: No data found")
+        return None, 0
+
+    error = first_row_error(columns, raw)
+    if error is not None:
+        row, message = error
+        print(f"❌ {year}: {message} at row {row}")
+        return None, 0
+
+    # Check year boundaries
+    year_start = _utc(unix[0])
+    year_end = _utc(unix[-1])
+
+    print(f"📅 {year}: {len(unix):,} candles | {year_start} → {year_end}")
+
+    # Validate start/end points
+    if year == 2011:
+        if (str(year_start) != EXPECTED_START['timestamp'] or
+            abs(columns['open'][0] - EXPECTED_START['open']) > 0.01):
+            print(f"❌ 2011 start mismatch!")
+            print(f"   Expected: {EXPECTED_START['timestamp']}")
+            print(f"   Found:    {year_start}")
+            return None, 0
+        print("✅ 2011 start validated")
+
+    if year == 2025:
+        if (str(year_end) != EXPECTED_END['timestamp'] or
+            abs(columns['close'][-1] - EXPECTED_END['close']) > 0.01):
+            print(f"❌ 2025 end mismatch!")
+            print(f"   Expected: {EXPECTED_END['timestamp']}")
+            print(f"   Found:    {year_end}")
+            return None, 0
+        print("✅ 2025 end validated")
+
+    # Continuity inside the year (year-to-year boundaries are checked by the caller)
+    breaks = continuity_breaks(unix)
+    acceptable = acceptable_gaps(unix[breaks - 1], unix[breaks])
+    for i in breaks[acceptable].tolist():
+        print(f"⚠️  Acceptable year-boundary gap: {_utc(unix[i - 1])} → {_utc(unix[i])} ({timedelta(seconds=int(unix[i] - unix[i - 1] - 60))})")
+    problems = breaks[~acceptable]
+    for i in problems[:3].tolist():  # Show first few problematic gaps
+        print(f"❌ Gap at {_utc(unix[i - 1])} → {_utc(unix[i])} ({timedelta(seconds=int(unix[i] - unix[i - 1] - 60))})")
+
+    if len(problems):
+        print(f"❌ {year}: Found {len(problems)} problematic gaps in continuity")
+
+    return unix, len(problems)
+
+def validate_btc_dataset(manifest=None):
     """Comprehensive validation of BTC dataset from 2011-2025"""
 
     data_dir = 'data/btc'
-    expected_start = {
-        'timestamp': '2011-08-18 12:37:00',
-        'unix': 1313671020,
-        'open': 10.9,
-        'close': 10.9,
-        'volume': 0.48990826,
-        'high': 10.9,
-        'low': 10.9
-    }
-
-    expected_end = {
-        'timestamp': '2025-09-24 15:29:00',
-        'unix': 1758727740,
-        'open': 113682.02,
-        'close': 113700.11,
-        'volume': 3.46633664,
-        'high': 113714,
-        'low': 113679.09
-    }
+    manifest = manifest or DatasetManifest()
 
     print("🔍 VALIDATING BTC DATASET (2011-2025)")
     print("=" * 50)
@@ -49,157 +123,86 @@ def validate_btc_dataset():
 
     print("\n📊 Analyzing data continuity and format...")
 
-    all_data = []
     total_candles = 0
-    prev_timestamp = None
+    first_timestamp = None
     prev_year_end = None
+    prev_last_ts = None
+    skipped_years = 0
+    failed_years = []
+    problem_gaps = 0
 
     for year in range(2011, 2026):
         filename = f'BTCUSD_1m_candles_{year}.csv'
         filepath = os.path.join(data_dir, filename)
 
-        try:
-            with open(filepath, 'r') as f:
-                reader = csv.reader(f)
-                header = next(reader)
-
-                # Validate header
-                expected_header = ['timestamp', 'open', 'close', 'volume', 'unix_timestamp', 'high', 'low']
-                if header != expected_header:
-                    print(f"❌ {year}: Invalid header format")
-                    return False
-
-                year_data = []
-                timestamps = set()
-
-                for row_num, row in enumerate(reader, 1):
-                    if len(row) != 7:
-                        print(f"❌ {year}: Row {row_num} has {len(row)} columns, expected 7")
-                        return False
-
-                    try:
-                        # Parse data
-                        timestamp_str, open_price, close_price, volume, unix_ts, high_price, low_price = row
-
-                        # Convert to appropriate types
-                        timestamp = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
-                        open_price = float(open_price)
-                        close_price = float(close_price)
-                        volume = float(volume)
-                        unix_ts = int(unix_ts)
-                        high_price = float(high_price)
-                        low_price = float(low_price)
-
-                        # Validate data ranges
-                        if open_price <= 0 or close_price <= 0 or high_price <= 0 or low_price <= 0:
-                            print(f"❌ {year}: Invalid price data at row {row_num}")
-                            return False
-
-                        if high_price < max(open_price, close_price) or low_price > min(open_price, close_price):
-                            print(f"❌ {year}: Invalid OHLC relationship at row {row_num}")
-                            return False
-
-                        # Check for duplicate timestamps within year
-                        if unix_ts in timestamps:
-                            print(f"❌ {year}: Duplicate timestamp {unix_ts} at row {row_num}")
-                            return False
-                        timestamps.add(unix_ts)
-
-                        year_data.append({
-                            'timestamp': timestamp,
-                            'unix': unix_ts,
-                            'open': open_price,
-                            'close': close_price,
-                            'volume': volume,
-                            'high': high_price,
-                            'low': low_price
-                        })
-
-                    except (ValueError, IndexError) as e:
-                        print(f"❌ {year}: Parse error at row {row_num}: {e}")
-                        return False
-
-                if not year_data:
-                    print(f"❌ {year}: No data found")
-                    return False
-
-                # Check year boundaries
-                year_start = year_data[0]
-                year_end = year_data[-1]
-
-                print(f"📅 {year}: {len(year_data):,} candles | {year_start['timestamp']} → {year_end['timestamp']}")
-
-                # Validate start/end points
-                if year == 2011:
-                    if (year_start['timestamp'].strftime('%Y-%m-%d %H:%M:%S') != expected_start['timestamp'] or
-                        abs(year_start['open'] - expected_start['open']) > 0.01):
-                        print(f"❌ 2011 start mismatch!")
-                        print(f"   Expected: {expected_start['timestamp']}")
-                        print(f"   Found:    {year_start['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}")
-                        return False
-                    print("✅ 2011 start validated")
-
-                if year == 2025:
-                    if (year_end['timestamp'].strftime('%Y-%m-%d %H:%M:%S') != expected_end['timestamp'] or
-                        abs(year_end['close'] - expected_end['close']) > 0.01):
-                        print(f"❌ 2025 end mismatch!")
-                        print(f"   Expected: {expected_end['timestamp']}")
-                        print(f"   Found:    {year_end['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}")
-                        return False
-                    print("✅ 2025 end validated")
-
-                # Check continuity between years (allow small gaps at year boundaries)
-                if prev_year_end:
-                    expected_next = prev_year_end['timestamp'] + timedelta(minutes=1)
-                    actual_gap = year_start['timestamp'] - expected_next
-
-                    if actual_gap > timedelta(minutes=5):  # Allow up to 5 minute gaps
+        entry = manifest.entry(filepath)
+        if entry is not None and entry['verdicts'].get(VALIDATION_CHECK):
+            rows = entry['rows']
+            first_ts, last_ts = entry['first_timestamp'], entry['last_timestamp']
+            skipped_years += 1
+            print(f"📅 {year}: {rows:,} candles | {_utc(first_ts)} → {_utc(last_ts)} (unchanged, validated earlier)")
+        else:
+            try:
+                timestamps, gaps = validate_year_file(year, filepath)
+            except Exception as e:
+                print(f"❌ Error reading {year}: {e}")
+                timestamps, gaps = None, 0
+            manifest.record(filepath, VALIDATION_CHECK, timestamps is not None and not gaps, timestamps=timestamps)
+            problem_gaps += gaps
+            if timestamps is None or gaps:
+                failed_years.append(year)
+            if timestamps is None:
+                # Nothing to compare the next year against
+                prev_year_end = prev_last_ts = None
+                continue
+            rows = len(timestamps)
+            first_ts, last_ts = int(timestamps[0]), int(timestamps[-1])
+        year_start = _utc(first_ts)
+        year_end = _utc(last_ts)
+
+        # Check continuity between years (allow small gaps at the start of Jan 1)
+        if prev_year_end:
+            expected_next = prev_year_end + timedelta(minutes=1)
+            actual_gap = year_start - expected_next
+
+            if actual_gap < timedelta(minutes=0):
+                print(f"❌ {year} overlaps {year-1}!")
+                print(f"   {year-1} ends: {prev_year_end}")
+                print(f"   {year} starts: {year_start}")
+                problem_gaps += 1
+                failed_years.append(year)
+            elif actual_gap > timedelta(minutes=0):
+                if shard_gap_acceptable(prev_last_ts, first_ts, shard_range(filepath)[0]):
+                    print(f"⚠️  Small gap between {year-1} and {year}: {actual_gap} (acceptable)")
+                else:
+                    if actual_gap > timedelta(minutes=ACCEPTABLE_GAP_MINUTES):
                         print(f"❌ Large gap between {year-1} and {year}!")
-                        print(f"   {year-1} ends: {prev_year_end['timestamp']}")
-                        print(f"   {year} starts: {year_start['timestamp']}")
-                        print(f"   Gap: {actual_gap}")
-                        return False
-                    elif actual_gap > timedelta(minutes=0):
-                        print(f"⚠️  Small gap between {year-1} and {year}: {actual_gap} (acceptable)")
-
-                prev_year_end = year_end
-                all_data.extend(year_data)
-                total_candles += len(year_data)
-
-        except Exception as e:
-            print(f"❌ Error reading {year}: {e}")
-            return False
+                    else:
+                        print(f"❌ Gap between {year-1} and {year} does not end at the start of {year}!")
+                    print(f"   {year-1} ends: {prev_year_end}")
+                    print(f"   {year} starts: {year_start}")
+                    print(f"   Gap: {actual_gap}")
+                    problem_gaps += 1
+                    failed_years.append(year)
+
+        if first_timestamp is None:
+            first_timestamp = year_start
+        prev_year_end = year_end
+        prev_last_ts = last_ts
+        total_candles += rows
+
+    manifest.flush()
 
     print("\n📈 SUMMARY")
     print(f"📊 Total candles: {total_candles:,}")
-    print(f"📅 Date range: {all_data[0]['timestamp']} → {all_data[-1]['timestamp']}")
-
-    # Final continuity check (allow small gaps at year boundaries)
-    print("\n🔗 Checking overall continuity...")
-    gaps = 0
-    acceptable_gap_minutes = 5  # Allow up to 5 minute gaps
-
-    for i in range(1, len(all_data)):
-        expected_ts = all_data[i-1]['timestamp'] + timedelta(minutes=1)
-        actual_ts = all_data[i]['timestamp']
-        gap = actual_ts - expected_ts
-
-        # Check if this is a year boundary gap (small and at year start)
-        is_year_boundary = (actual_ts.day == 1 and actual_ts.month == 1 and actual_ts.hour == 0 and
-                           actual_ts.minute <= acceptable_gap_minutes)
-
-        if actual_ts != expected_ts:
-            if gap <= timedelta(minutes=acceptable_gap_minutes) and is_year_boundary:
-                print(f"⚠️  Acceptable year-boundary gap: {all_data[i-1]['timestamp']} → {actual_ts} ({gap})")
-            else:
-                gaps += 1
-                if gaps <= 3:  # Show first few problematic gaps
-                    print(f"❌ Gap at {all_data[i-1]['timestamp']} → {actual_ts} ({gap})")
-
-    if gaps == 0:
-        print("✅ No problematic gaps found - data continuity is good!")
-    else:
-        print(f"❌ Found {gaps} problematic gaps in continuity")
+    print(f"📅 Date range: {first_timestamp} → {prev_year_end}")
+    if skipped_years:
+        print(f"📒 {skipped_years} unchanged years reused from {manifest.path}")
+
+    if failed_years:
+        failed = sorted(set(failed_years))
+        print(f"\n❌ VALIDATION FAILED for {len(failed)} years: {failed}")
+        print(f"❌ Found {problem_gaps} problematic gaps across the whole history")
         return False
 
     print("\n🎉 VALIDATION COMPLETE - ALL CHECKS PASSED!")
@@ -208,4 +211,4 @@ def validate_btc_dataset():
 
 if __name__ == "__main__":
     success = validate_btc_dataset()
-    sys.exit(0 if success else 1)
\ No newline at end of file
+    sys.exit(0 if success else 1)
@@ -1,6 +1,7 @@
-import csv
 from datetime import datetime, timezone, timedelta
 import sys
+import numpy as np
+from candle_csv import read_timestamps
 
 def validate_bitcoin_data(filename):
     """
@@ -8,17 +9,10 @@ def validate_bitcoin_data(filename):
     """
     print(f"Validating data completeness in {filename}...")
     
-    timestamps = []
-    row_count = 0
-    
     # Read all timestamps from the CSV
     try:
-        with open(filename, 'r') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                unix_timestamp = int(row['unix_timestamp'])
-                timestamps.append(unix_timestamp)
-                row_count += 1
+        timestamps = read_timestamps(filename)
+        row_count = len(timestamps)
         
         print(f"✓ Successfully read {row_count:,} rows from {filename}")
         
@@ -29,12 +23,12 @@ def validate_bitcoin_data(filename):
         print(f"❌ Error reading file: {e}")
         return False
     
-    if not timestamps:
+    if not len(timestamps):
         print("❌ No data found in file!")
         return False
     
     # Sort timestamps to ensure proper order
-    timestamps.sort()
+    timestamps = np.sort(timestamps).tolist()
     
     # Get date range
     start_time = datetime.fromtimestamp(timestamps[0], timezone.utc)
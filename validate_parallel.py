@@ -0,0 +1,114 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from candle_checks import check_shard, shard_gap_acceptable
+from data_layout import INTERVAL_SECONDS, list_shards, shard_range
+
+# Validation of every yearly 1m file and every 1s day file with one worker
+# process per shard. Each worker runs the full per-file checks (format, prices,
+# OHLC, duplicates, continuity); the parent merges the results in time order
+# and checks the boundary between neighbouring shards.
+SYMBOL = 'BTCUSD'
+DEFAULT_INTERVALS = ['1m', '1s']
+WORKERS = os.cpu_count() or 1
+
+def _utc(unix_ts):
+    return datetime.fromtimestamp(unix_ts, timezone.utc).replace(tzinfo=None)
+
+def _timed_check(task):
+    path, step = task
+    started, cpu_started = time.perf_counter(), time.process_time()
+    result = check_shard(path, step)
+    result['seconds'] = time.perf_counter() - started
+    result['cpu'] = time.process_time() - cpu_started
+    return result
+
+def _label(path):
+    return os.path.basename(path).rsplit('_candles_', 1)[-1][:-len('.csv')]
+
+def validate_interval(results, interval):
+    """Print per-shard results and neighbour boundaries of one interval; returns the failure count"""
+    step = INTERVAL_SECONDS[interval]
+    failures = 0
+    previous = None
+    for result in results:
+        name = f"{interval} {_label(result['path'])}"
+        if result['error']:
+            print(f"❌ {name}: {result['error']} ({result['seconds']:.2f}s)")
+            failures += 1
+            # Keep the last good shard so the boundary across this one is still checked
+            continue
+        status = "❌" if result['problems'] else "✅"
+        print(f"{status} {name}: {result['rows']:,} candles | {_utc(result['first'])} → {_utc(result['last'])} "
+              f"({result['seconds']:.2f}s)")
+        for before, after in result['problem_examples']:
+            print(f"   ❌ Gap at {_utc(before)} → {_utc(after)} ({timedelta(seconds=after - before - step)})")
+        if result['problems']:
+            print(f"   ❌ {result['problems']} problematic gaps")
+            failures += 1
+
+        if previous is not None and result['first'] - previous['last'] != step:
+            gap = timedelta(seconds=result['first'] - previous['last'] - step)
+            boundary = f"{_utc(previous['last'])} → {_utc(result['first'])} ({gap})"
+            if shard_gap_acceptable(previous['last'], result['first'], shard_range(result['path'])[0], step):
+                print(f"   ⚠️  Small gap from {_label(previous['path'])}: {boundary} (acceptable)")
+            else:
+                print(f"   ❌ Gap from {_label(previous['path'])}: {boundary}")
+                failures += 1
+        previous = result
+    return failures
+
+def validate_parallel(symbol=SYMBOL, intervals=DEFAULT_INTERVALS, workers=WORKERS):
+    tasks = []
+    for interval in intervals:
+        tasks += [(path, INTERVAL_SECONDS[interval]) for start, _, path in list_shards(symbol, interval)
+                  if start is not None]
+    if not tasks:
+        print(f"❌ No {symbol} shards found for {', '.join(intervals)}")
+        return False
+
+    print(f"🔍 Validating {len(tasks)} files with {workers} worker processes...")
+    started = time.perf_counter()
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Largest files first so the long yearly shards don't finish last
+            order = sorted(range(len(tasks)), key=lambda i: -os.path.getsize(tasks[i][0]))
+            done = dict(zip(order, executor.map(_timed_check, [tasks[i] for i in order])))
+        results = [done[i] for i in range(len(tasks))]
+    else:
+        results = [_timed_check(task) for task in tasks]
+    elapsed = time.perf_counter() - started
+
+    failures = 0
+    position = 0
+    for interval in intervals:
+        count = sum(1 for _, step in tasks if step == INTERVAL_SECONDS[interval])
+        print(f"\n📊 {symbol} {interval}")
+        failures += validate_interval(results[position:position + count], interval)
+        position += count
+
+    busy = sum(result['cpu'] for result in results)
+    total_rows = sum(result['rows'] for result in results)
+    print(f"\n⏱️  {len(results)} files, {total_rows:,} candles in {elapsed:.1f}s "
+          f"({busy:.1f}s CPU across workers, {busy / elapsed if elapsed else 0:.1f}x parallelism)")
+    if failures:
+        print(f"❌ {failures} problems found")
+        return False
+    print("✅ All files valid")
+    return True
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    workers = WORKERS
+    if '--workers' in args:
+        position = args.index('--workers')
+        value = args[position + 1] if position + 1 < len(args) else ''
+        if not value.isdigit() or int(value) < 1:
+            print("Usage: python validate_parallel.py [interval ...] [--workers N]")
+            sys.exit(1)
+        workers = int(value)
+        del args[position:position + 2]
+    success = validate_parallel(SYMBOL, args or DEFAULT_INTERVALS, workers)
+    sys.exit(0 if success else 1)